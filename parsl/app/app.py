@@ -6,10 +6,10 @@ import logging
 import typeguard
 from abc import ABCMeta, abstractmethod
 from inspect import signature
-from typing import List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from typing_extensions import Literal
 
-from parsl.dataflow.dflow import DataFlowKernel
+from parsl.dataflow.dflow import DataFlowKernel, DataFlowKernelLoader
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +67,40 @@ class AppBase(metaclass=ABCMeta):
     def __call__(self, *args, **kwargs):
         pass
 
+    def map(self, *iterables, **kwargs):
+        """Call the app once for each set of args taken from the iterables,
+        as the builtin map does, submitting the calls together.
+
+        Args:
+             - Iterables of args, one for each positional arg of the app
+        Kwargs:
+             - Arbitrary, passed to every call
+
+        Returns:
+                   List of App_futs, in the order of the args
+
+        """
+        dfk, func, submit_kwargs = self._submission(kwargs)
+        return dfk.submit_many(func, zip(*iterables), **submit_kwargs)
+
+    def _submission(self, kwargs) -> Tuple[DataFlowKernel, Callable, Dict[str, Any]]:
+        """The DataFlowKernel to submit a call of this app to, with the function
+        and the keyword args to submit it with, given the kwargs of the call.
+        """
+        invocation_kwargs = {}
+        invocation_kwargs.update(self.kwargs)
+        invocation_kwargs.update(kwargs)
+
+        if self.data_flow_kernel is None:
+            dfk = DataFlowKernelLoader.dfk()
+        else:
+            dfk = self.data_flow_kernel
+
+        return dfk, self.func, dict(executors=self.executors,
+                                    cache=self.cache,
+                                    ignore_for_cache=self.ignore_for_cache,
+                                    app_kwargs=invocation_kwargs)
+
 
 @typeguard.typechecked
 def python_app(function=None,
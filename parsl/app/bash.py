@@ -6,7 +6,6 @@ import os
 
 from parsl.app.errors import wrap_error
 from parsl.app.app import AppBase
-from parsl.dataflow.dflow import DataFlowKernelLoader
 
 logger = logging.getLogger(__name__)
 
@@ -167,20 +166,11 @@ class BashApp(AppBase):
                    App_fut
 
         """
-        invocation_kwargs = {}
-        invocation_kwargs.update(self.kwargs)
-        invocation_kwargs.update(kwargs)
-
-        if self.data_flow_kernel is None:
-            dfk = DataFlowKernelLoader.dfk()
-        else:
-            dfk = self.data_flow_kernel
-
-        app_fut = dfk.submit(self.wrapped_remote_function,
-                             app_args=args,
-                             executors=self.executors,
-                             cache=self.cache,
-                             ignore_for_cache=self.ignore_for_cache,
-                             app_kwargs=invocation_kwargs)
+        dfk, func, submit_kwargs = self._submission(kwargs)
+        app_fut = dfk.submit(func, app_args=args, **submit_kwargs)
 
         return app_fut
+
+    def _submission(self, kwargs):
+        dfk, _, submit_kwargs = super()._submission(kwargs)
+        return dfk, self.wrapped_remote_function, submit_kwargs
@@ -7,7 +7,6 @@ from functools import wraps
 
 from parsl.app.app import AppBase
 from parsl.app.errors import wrap_error
-from parsl.dataflow.dflow import DataFlowKernelLoader
 
 
 logger = logging.getLogger(__name__)
@@ -60,26 +59,17 @@ class PythonApp(AppBase):
                    App_fut
 
         """
-        invocation_kwargs = {}
-        invocation_kwargs.update(self.kwargs)
-        invocation_kwargs.update(kwargs)
+        dfk, func, submit_kwargs = self._submission(kwargs)
+        app_fut = dfk.submit(func, app_args=args, **submit_kwargs)
 
-        if self.data_flow_kernel is None:
-            dfk = DataFlowKernelLoader.dfk()
-        else:
-            dfk = self.data_flow_kernel
+        return app_fut
 
-        walltime = invocation_kwargs.get('walltime')
-        if walltime is not None:
-            func = timeout(self.func, walltime)
-        else:
-            func = self.func
+    def _submission(self, kwargs):
+        dfk, func, submit_kwargs = super()._submission(kwargs)
 
-        app_fut = dfk.submit(func, app_args=args,
-                             executors=self.executors,
-                             cache=self.cache,
-                             ignore_for_cache=self.ignore_for_cache,
-                             app_kwargs=invocation_kwargs,
-                             join=self.join)
+        walltime = submit_kwargs['app_kwargs'].get('walltime')
+        if walltime is not None:
+            func = timeout(func, walltime)
 
-        return app_fut
+        submit_kwargs['join'] = self.join
+        return dfk, func, submit_kwargs
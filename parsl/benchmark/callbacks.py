@@ -0,0 +1,126 @@
+"""Benchmark of the time which the DataFlowKernel spends in its callback
+threads for each task, with monitoring off and on, reported as JSON so that
+results from different versions can be compared.
+
+The time measured for a task is the time spent handling the completion of
+its execution: recording its result or failure, completing its AppFuture,
+memoization, and sending monitoring messages. The largest number of
+completions waiting to be handled at once is also reported.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+import parsl
+from parsl.config import Config
+from parsl.executors.threads import ThreadPoolExecutor
+from parsl.version import VERSION
+
+MODES = ['off', 'on']
+
+
+@parsl.python_app
+def noop():
+    return None
+
+
+def timed_callbacks(n_tasks: int) -> Dict[str, Any]:
+    """Run n_tasks noop tasks on the loaded DataFlowKernel, timing its
+    handling of each task's completion
+    """
+    dfk = parsl.dfk()
+    original = dfk.handle_exec_update
+    lock = threading.Lock()
+    spent: List[float] = []
+
+    def timed_handle_exec_update(task_record, future):
+        start_t = time.perf_counter()
+        try:
+            original(task_record, future)
+        finally:
+            with lock:
+                spent.append(time.perf_counter() - start_t)
+
+    dfk.handle_exec_update = timed_handle_exec_update  # type: ignore[method-assign]
+    try:
+        concurrent.futures.wait([noop() for _ in range(n_tasks)])
+    finally:
+        del dfk.handle_exec_update
+
+    spent.sort()
+    dispatcher = dfk.completion_dispatcher
+    return {'tasks': n_tasks,
+            'callback_s_per_task': sum(spent) / len(spent),
+            'callback_s_median': spent[len(spent) // 2],
+            'max_completion_queue_length': None if dispatcher is None else dispatcher.max_queue_length}
+
+
+def config(monitoring: bool, run_dir: str) -> Config:
+    hub = None
+    if monitoring:
+        from parsl.monitoring import MonitoringHub
+        hub = MonitoringHub(hub_address="localhost",
+                            logging_endpoint='sqlite:///{}'.format(os.path.join(run_dir, 'monitoring.db')),
+                            resource_monitoring_enabled=False)
+    return Config(executors=[ThreadPoolExecutor(max_threads=4)],
+                  monitoring=hub,
+                  run_dir=run_dir,
+                  strategy='none')
+
+
+def run(*, modes: List[str], n_tasks: int, repeat: int) -> Dict[str, Any]:
+    results = []
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as run_dir:
+            parsl.load(config(mode == 'on', run_dir))
+            try:
+                timings = [timed_callbacks(n_tasks) for _ in range(repeat)]
+            finally:
+                parsl.dfk().cleanup()
+                parsl.clear()
+        best = min(timings, key=lambda r: r['callback_s_per_task'])
+        results.append({'benchmark': 'callback_time', 'params': {'monitoring': mode}, **best})
+
+    return {'parsl_version': VERSION,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'results': results}
+
+
+def cli_run(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the time the DataFlowKernel spends handling each task completion, reporting JSON",
+        epilog="""
+Example usage: python -m parsl.benchmark.callbacks --monitoring off on --tasks 5000 --output results.json
+        """)
+
+    parser.add_argument("--monitoring", nargs="+", choices=MODES, default=MODES,
+                        help="whether to measure with monitoring off, on, or both. Monitoring requires the monitoring extra")
+    parser.add_argument("--tasks", type=int, default=2000, help="number of tasks to run for each timing")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timings to take the best of")
+    parser.add_argument("--output", metavar="FILE", help="file to write the JSON report to. Default: stdout")
+
+    args = parser.parse_args(argv)
+
+    report = run(modes=args.monitoring, n_tasks=args.tasks, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    cli_run()
@@ -0,0 +1,236 @@
+"""Microbenchmarks of the serialization hot path, reported as JSON so that
+results from different versions can be compared.
+
+Each measurement records the best time per operation, in seconds, over
+``repeat`` timings of ``number`` operations.
+"""
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+
+from typing import Any, Callable, Dict, List, Optional
+
+from parsl.serialize import facade
+from parsl.serialize.facade import (deserialize, pack_apply_message, pack_buffers, serialize,
+                                    serialize_function, unpack_apply_message, unpack_buffers,
+                                    _unpack_legacy_buffers)
+from parsl.version import VERSION
+
+SUITES = ['serialize', 'apply_message', 'function_cache', 'dispatch', 'pack']
+
+
+def legacy_pack_buffers(buffers):
+    """Pack buffers in the original format, for comparison"""
+    return b''.join(bytes(str(len(buf)) + '\n', 'utf-8') + buf for buf in buffers)
+
+
+def best_time(fn, repeat, number=1):
+    """Best time in seconds for one call of fn, over repeat timings of number calls"""
+    times = []
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start_t) / number)
+    return min(times)
+
+
+def measure(name: str, fn: Callable[[], Any], *, repeat: int, number: int, **params: Any) -> Dict[str, Any]:
+    return {'benchmark': name,
+            'params': params,
+            'number': number,
+            'repeat': repeat,
+            'best_s': best_time(fn, repeat, number)}
+
+
+def number_for(nbytes: int, target_bytes: int = 2 ** 26, max_number: int = 10000) -> int:
+    """How many operations on nbytes of data to time at once, so that timings
+    of small payloads are not dominated by timer resolution
+    """
+    return max(1, min(max_number, target_bytes // max(nbytes, 1)))
+
+
+def module_function(x):
+    return x
+
+
+def sample_data() -> Dict[str, Any]:
+    data = {'int': 7,
+            'str_1KB': 'x' * 1024,
+            'bytes_1MB': b'x' * 2 ** 20,
+            'list_1000_ints': list(range(1000)),
+            'dict_100_str_int': {str(i): i for i in range(100)},
+            'function': module_function,
+            'lambda': lambda x: x}
+    try:
+        import numpy as np
+    except ImportError:
+        pass
+    else:
+        data['ndarray_1MB'] = np.zeros(2 ** 17, dtype=np.float64)
+    return data
+
+
+def serialize_suite(*, repeat: int) -> List[Dict[str, Any]]:
+    """serialize and deserialize of common types"""
+    results = []
+    for type_name, obj in sample_data().items():
+        payload = serialize(obj)
+        number = number_for(len(payload))
+        results.append(measure('serialize', lambda: serialize(obj), repeat=repeat, number=number,
+                               type=type_name, nbytes=len(payload)))
+        results.append(measure('deserialize', lambda: deserialize(payload), repeat=repeat, number=number,
+                               type=type_name, nbytes=len(payload)))
+    return results
+
+
+def apply_message_suite(*, sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    """pack_apply_message and unpack_apply_message with arguments of different
+    sizes, with large buffers packed in band and sent out of band
+    """
+    results = []
+    for nbytes in sizes:
+        args = (b'x' * nbytes,)
+        kwargs = {'option': 1}
+        number = number_for(nbytes)
+
+        packed = pack_apply_message(module_function, args, kwargs)
+        results.append(measure('pack_apply_message', lambda: pack_apply_message(module_function, args, kwargs),
+                               repeat=repeat, number=number, nbytes=nbytes, out_of_band=False))
+        results.append(measure('unpack_apply_message', lambda: unpack_apply_message(packed),
+                               repeat=repeat, number=number, nbytes=nbytes, out_of_band=False))
+
+        buffers: List[memoryview] = []
+        functions: Dict[bytes, bytes] = {}
+        packed_oob = pack_apply_message(module_function, args, kwargs, buffers=buffers, functions=functions)
+        results.append(measure('pack_apply_message',
+                               lambda: pack_apply_message(module_function, args, kwargs, buffers=[], functions={}),
+                               repeat=repeat, number=number, nbytes=nbytes, out_of_band=True))
+        results.append(measure('unpack_apply_message',
+                               lambda: unpack_apply_message(packed_oob, buffers=buffers, functions=functions),
+                               repeat=repeat, number=number, nbytes=nbytes, out_of_band=True))
+    return results
+
+
+def function_cache_suite(*, repeat: int, number: int = 1000) -> List[Dict[str, Any]]:
+    """Serializing and deserializing functions, with the caches hit and missed"""
+    results = []
+
+    serialize_function(module_function)
+    results.append(measure('serialize_function', lambda: serialize_function(module_function),
+                           repeat=repeat, number=number, cache='hit'))
+
+    # a new function object each time is a cache miss
+    functions = [eval('lambda x: x') for _ in range(number * repeat)]
+    function_iter = iter(functions)
+    results.append(measure('serialize_function', lambda: serialize_function(next(function_iter)),
+                           repeat=repeat, number=number, cache='miss'))
+
+    digest, payload = serialize_function(module_function)
+    sent = {digest: payload}
+    facade.function_cache.get(digest, sent)
+    results.append(measure('deserialize_function', lambda: facade.function_cache.get(digest, sent),
+                           repeat=repeat, number=number, cache='hit'))
+    results.append(measure('deserialize_function', lambda: deserialize(payload),
+                           repeat=repeat, number=number, cache='miss'))
+    return results
+
+
+def dispatch_suite(*, repeat: int, number: int = 10000) -> List[Dict[str, Any]]:
+    """Choosing a serializer for an object, and a deserializer for a header"""
+    results = []
+
+    # dill is only reached after pickle fails, unless the dispatch cache remembers
+    closure_args = (lambda x: x,)
+    serialize(closure_args)
+    results.append(measure('serialize_dispatch', lambda: serialize(closure_args),
+                           repeat=repeat, number=number // 10, cache='hit'))
+
+    def serialize_uncached() -> None:
+        facade.dispatch_cache.clear()
+        serialize(closure_args)
+    results.append(measure('serialize_dispatch', serialize_uncached,
+                           repeat=repeat, number=number // 10, cache='miss'))
+
+    for header, method in facade.methods_for_data.items():
+        try:
+            payload = method.serialize(1)
+        except Exception:
+            continue
+        results.append(measure('deserialize_dispatch', lambda: deserialize(payload),
+                               repeat=repeat, number=number, header=header.decode().strip()))
+    return results
+
+
+def pack_suite(*, sizes: List[int], n_buffers: int, repeat: int) -> List[Dict[str, Any]]:
+    """Packing and unpacking buffers, in the current and original formats"""
+    results = []
+    for nbytes in sizes:
+        buffers = [b'x' * (nbytes // n_buffers) for _ in range(n_buffers)]
+        packed = pack_buffers(buffers)
+        legacy_packed = legacy_pack_buffers(buffers)
+
+        results.append(measure('pack_buffers', lambda: pack_buffers(buffers),
+                               repeat=repeat, number=1, nbytes=nbytes, n_buffers=n_buffers))
+        results.append(measure('unpack_buffers', lambda: unpack_buffers(packed),
+                               repeat=repeat, number=1, nbytes=nbytes, n_buffers=n_buffers))
+        results.append(measure('unpack_legacy_buffers', lambda: _unpack_legacy_buffers(memoryview(legacy_packed)),
+                               repeat=repeat, number=1, nbytes=nbytes, n_buffers=n_buffers))
+    return results
+
+
+def run(*, suites: List[str], sizes: List[int], n_buffers: int, repeat: int) -> Dict[str, Any]:
+    results = []
+    for suite in suites:
+        if suite == 'serialize':
+            results.extend(serialize_suite(repeat=repeat))
+        elif suite == 'apply_message':
+            results.extend(apply_message_suite(sizes=sizes, repeat=repeat))
+        elif suite == 'function_cache':
+            results.extend(function_cache_suite(repeat=repeat))
+        elif suite == 'dispatch':
+            results.extend(dispatch_suite(repeat=repeat))
+        elif suite == 'pack':
+            results.extend(pack_suite(sizes=sizes, n_buffers=n_buffers, repeat=repeat))
+        else:
+            raise ValueError("Unknown benchmark suite {}".format(suite))
+
+    return {'parsl_version': VERSION,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'results': results}
+
+
+def cli_run(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure performance of Parsl serialization, reporting JSON",
+        epilog="""
+Example usage: python -m parsl.benchmark.serialization --suites serialize dispatch --output results.json
+        """)
+
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES,
+                        help="benchmark suites to run. Default: all")
+    parser.add_argument("--sizes", metavar="BYTES", nargs="+", type=int, default=[2 ** 10, 2 ** 20, 2 ** 24],
+                        help="sizes of the arguments and buffers to pack")
+    parser.add_argument("--buffers", type=int, default=3, help="number of buffers to pack")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timings to take the best of")
+    parser.add_argument("--output", metavar="FILE", help="file to write the JSON report to. Default: stdout")
+
+    args = parser.parse_args(argv)
+
+    report = run(suites=args.suites, sizes=args.sizes, n_buffers=args.buffers, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    cli_run()
@@ -0,0 +1,117 @@
+"""Benchmark of task submission from many threads at once, reported as
+JSON so that results from different versions can be compared.
+
+For each number of submitting threads, the same total number of tasks is
+submitted, split evenly between the threads, and the time taken to submit
+them all is recorded, then the time until they have all completed.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import json
+import platform
+import sys
+import threading
+import time
+
+from typing import Any, Dict, List, Optional
+
+import parsl
+from parsl.benchmark.perf import load_dfk_from_config
+from parsl.config import Config
+from parsl.dataflow.futures import AppFuture
+from parsl.executors.threads import ThreadPoolExecutor
+from parsl.version import VERSION
+
+
+@parsl.python_app
+def noop():
+    return None
+
+
+def submit_from_threads(n_threads: int, n_tasks: int) -> Dict[str, Any]:
+    """Submit n_tasks noop tasks from n_threads threads, which all start
+    submitting at the same time, and wait for the tasks to complete
+    """
+    per_thread = [n_tasks // n_threads + (1 if i < n_tasks % n_threads else 0) for i in range(n_threads)]
+    futures: List[List[AppFuture]] = [[] for _ in range(n_threads)]
+    barrier = threading.Barrier(n_threads + 1)
+
+    def submitter(i: int) -> None:
+        barrier.wait()
+        futures[i] = [noop() for _ in range(per_thread[i])]
+
+    threads = [threading.Thread(target=submitter, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+
+    barrier.wait()
+    start_t = time.perf_counter()
+    for t in threads:
+        t.join()
+    submitted_t = time.perf_counter()
+
+    all_futures = [f for fs in futures for f in fs]
+    concurrent.futures.wait(all_futures)
+    completed_t = time.perf_counter()
+
+    task_ids = {f.tid for f in all_futures}
+    assert len(task_ids) == n_tasks, "task ids were not unique"
+
+    return {'benchmark': 'submit_from_threads',
+            'params': {'threads': n_threads, 'tasks': n_tasks},
+            'submit_s': submitted_t - start_t,
+            'complete_s': completed_t - start_t,
+            'submit_tasks_per_s': n_tasks / (submitted_t - start_t)}
+
+
+def run(*, threads: List[int], n_tasks: int, repeat: int) -> Dict[str, Any]:
+    results = []
+    for n_threads in threads:
+        timings = [submit_from_threads(n_threads, n_tasks) for _ in range(repeat)]
+        results.append(min(timings, key=lambda r: r['submit_s']))
+
+    return {'parsl_version': VERSION,
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.datetime.now().isoformat(),
+            'results': results}
+
+
+def cli_run(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure how Parsl task submission scales with the number of submitting threads, reporting JSON",
+        epilog="""
+Example usage: python -m parsl.benchmark.submit --threads 1 2 4 8 --tasks 20000 --output results.json
+        """)
+
+    parser.add_argument("--config", help="path to Python file that defines a configuration. Default: a local thread pool")
+    parser.add_argument("--threads", metavar="N", nargs="+", type=int, default=[1, 2, 4, 8],
+                        help="numbers of submitting threads to measure")
+    parser.add_argument("--tasks", type=int, default=10000, help="total number of tasks to submit for each measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timings to take the best of")
+    parser.add_argument("--output", metavar="FILE", help="file to write the JSON report to. Default: stdout")
+
+    args = parser.parse_args(argv)
+
+    if args.config:
+        load_dfk_from_config(args.config)
+    else:
+        parsl.load(Config(executors=[ThreadPoolExecutor(max_threads=4)], strategy='none'))
+
+    try:
+        report = run(threads=args.threads, n_tasks=args.tasks, repeat=args.repeat)
+    finally:
+        parsl.dfk().cleanup()
+        parsl.clear()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    cli_run()
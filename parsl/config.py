@@ -8,6 +8,7 @@ from parsl.utils import RepresentationMixin
 from parsl.executors.base import ParslExecutor
 from parsl.executors.threads import ThreadPoolExecutor
 from parsl.errors import ConfigurationError
+from parsl.dataflow.executor_selection import ExecutorSelector
 from parsl.dataflow.taskrecord import TaskRecord
 from parsl.monitoring import MonitoringHub
 
@@ -31,15 +32,69 @@ class Config(RepresentationMixin):
     checkpoint_mode : str, optional
         Checkpoint mode to use, can be ``'dfk_exit'``, ``'task_exit'``, ``'periodic'`` or ``'manual'``.
         If set to `None`, checkpointing will be disabled. Default is None.
+    checkpoint_batch_size : int, optional
+        With ``checkpoint_mode='task_exit'``, the results of completed tasks are written in the background, in
+        batches of at most this many results. Default is 1000.
+    checkpoint_flush_interval : float, optional
+        With ``checkpoint_mode='task_exit'``, the longest time, in seconds, to wait for more results before writing
+        a batch. If 0, each batch holds the results of the tasks which completed while the previous batch was
+        being written. Default is 0.
+    checkpoint_fsync : bool, optional
+        Wait for each batch of checkpointed results to reach the disk, so that it survives a failure of the
+        machine, not only of the program. If False, the most recent results may be lost if the machine fails;
+        ``'sqlite'`` checkpoints are then written through a write-ahead log, so that the database itself is not
+        corrupted. Default is False.
+    checkpoint_format : str, optional
+        Format in which to write checkpoints, ``'pickle'`` or ``'sqlite'``. With ``'pickle'``, results are appended
+        to ``checkpoint/tasks.pkl``, and all of them are loaded into memory when a later run starts. With
+        ``'sqlite'``, results are written to an indexed database, ``checkpoint/tasks.db``, from which a later
+        run loads each result only when a task with the same hash is launched, so that starting does not take
+        longer or use more memory as checkpoints grow. Checkpoints in either format can be loaded.
+        Default is ``'pickle'``.
     checkpoint_period : str, optional
         Time interval (in "HH:MM:SS") at which to checkpoint completed tasks. Only has an effect if
         ``checkpoint_mode='periodic'``.
+    completion_threads : int, optional
+        Number of threads which handle the completion of tasks: recording results, retries, memoization,
+        checkpointing and launching the tasks which depend on them. The updates of each task are always
+        handled by the same thread, in order. If 0, completions are handled in the threads in which executors
+        complete tasks, which can slow down an executor's receipt of results. Default is 1.
+    critical_path_priority : bool, optional
+        Estimate, for each task when it is launched, the runtime of the longest chain of outstanding tasks
+        which depend on it, from the dependencies of submitted tasks and the runtimes of completed tasks of
+        each app. The estimate is stored in the task record as ``priority``, and passed as the ``priority``
+        resource of tasks sent to executors which can order their queued tasks, so that tasks on the
+        critical path of a workflow run first. A ``priority`` given in a task's resource specification is
+        not overridden. Default is False.
+    executor_selector : ExecutorSelector, optional
+        The policy which chooses the executor of each task whose app may run on more than one executor.
+        The choice is made again each time a task is launched, except for tasks with files to stage. See
+        :mod:`parsl.dataflow.executor_selection` for the policies provided. Default is None, which
+        chooses at random.
+    find_nested_futures : bool, optional
+        Look for Futures inside the lists, tuples, sets, frozensets and dict values passed to apps, at any depth,
+        as well as at the top level of their arguments. An app waits for each of these Futures, and is passed
+        copies of the containers which hold them with each Future replaced by its result, so that a list of
+        Futures can be passed to an app without gathering it in another app first. Default is False.
     garbage_collect : bool. optional.
-        Delete task records from DFK when tasks have completed. Default: True
+        Delete task records from DFK when tasks have completed, and release the args, kwargs and
+        dependencies held by the records of completed tasks, so that each task's result is kept only
+        as long as its AppFuture is referenced. Default: True
     internal_tasks_max_threads : int, optional
         Maximum number of threads to allocate for submit side internal tasks such as some data transfers
         or @joinapps
         Default is 10.
+    memo_max_entries : int, optional
+        The most app cache results to hold in memory. When there are more, the least recently used are
+        evicted, and tasks with the same arguments will run again unless ``memo_spill`` is set. Default is
+        None, for no limit.
+    memo_max_bytes : int, optional
+        The most memory, in bytes, that app cache results held in memory may use, estimated from the size of
+        each pickled result. Results are evicted as with ``memo_max_entries``. Default is None, for no limit.
+    memo_spill : bool, optional
+        Write the app cache results evicted from memory by ``memo_max_entries`` or ``memo_max_bytes`` to a
+        database in the run directory, from which they are reloaded when a task with the same arguments is
+        launched. The database is removed when the DataFlowKernel is cleaned up. Default is False.
     monitoring : MonitoringHub, optional
         The config to use for database monitoring. Default is None which does not log to a database.
     retries : int, optional
@@ -81,9 +136,20 @@ class Config(RepresentationMixin):
                                         Literal['periodic'],
                                         Literal['dfk_exit'],
                                         Literal['manual']] = None,
+                 checkpoint_format: Literal['pickle', 'sqlite'] = 'pickle',
+                 checkpoint_batch_size: int = 1000,
+                 checkpoint_flush_interval: float = 0,
+                 checkpoint_fsync: bool = False,
                  checkpoint_period: Optional[str] = None,
+                 completion_threads: int = 1,
+                 critical_path_priority: bool = False,
+                 executor_selector: Optional[ExecutorSelector] = None,
+                 find_nested_futures: bool = False,
                  garbage_collect: bool = True,
                  internal_tasks_max_threads: int = 10,
+                 memo_max_entries: Optional[int] = None,
+                 memo_max_bytes: Optional[int] = None,
+                 memo_spill: bool = False,
                  retries: int = 0,
                  retry_handler: Optional[Callable[[Exception, TaskRecord], float]] = None,
                  run_dir: str = 'runinfo',
@@ -98,6 +164,10 @@ class Config(RepresentationMixin):
         self.app_cache = app_cache
         self.checkpoint_files = checkpoint_files
         self.checkpoint_mode = checkpoint_mode
+        self.checkpoint_format = checkpoint_format
+        self.checkpoint_batch_size = checkpoint_batch_size
+        self.checkpoint_flush_interval = checkpoint_flush_interval
+        self.checkpoint_fsync = checkpoint_fsync
         if checkpoint_period is not None:
             if checkpoint_mode is None:
                 logger.debug('The requested `checkpoint_period={}` will have no effect because `checkpoint_mode=None`'.format(
@@ -110,8 +180,17 @@ class Config(RepresentationMixin):
         if checkpoint_mode == 'periodic' and checkpoint_period is None:
             checkpoint_period = "00:30:00"
         self.checkpoint_period = checkpoint_period
+        self.completion_threads = completion_threads
+        self.critical_path_priority = critical_path_priority
+        self.executor_selector = executor_selector
+        self.find_nested_futures = find_nested_futures
         self.garbage_collect = garbage_collect
         self.internal_tasks_max_threads = internal_tasks_max_threads
+        if memo_spill and memo_max_entries is None and memo_max_bytes is None:
+            logger.debug("memo_spill has no effect unless memo_max_entries or memo_max_bytes is set")
+        self.memo_max_entries = memo_max_entries
+        self.memo_max_bytes = memo_max_bytes
+        self.memo_spill = memo_spill
         self.retries = retries
         self.retry_handler = retry_handler
         self.run_dir = run_dir
@@ -0,0 +1,93 @@
+"""Indexed checkpoint storage
+
+Checkpoints written with ``Config(checkpoint_format='sqlite')`` are stored in
+an SQLite database, ``checkpoint/tasks.db`` in the run directory, with the
+memoization hash of each task as its primary key. When a later run loads
+such a checkpoint, only the database is opened: results are read, and
+unpickled, when a task with a matching hash is launched, so the time and
+memory needed to start do not grow with the number of checkpointed tasks.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import urllib.parse
+
+from concurrent.futures import Future
+from typing import Any, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DB = 'tasks.db'
+
+
+class SQLiteCheckpointStore:
+    """Results of tasks stored by memoization hash in an SQLite database.
+
+    Parameters
+    ----------
+    path : str
+        The database file, which is created if it does not exist and
+        readonly is False.
+    readonly : bool
+        Open an existing database for lookups only.
+    sync : bool
+        Wait for each write to reach the disk before it is complete. If
+        False, the database is written ahead to a log, which is only synced to
+        the disk when it is copied into the database, so the most recent writes
+        may be lost if the machine fails, but the database is not corrupted.
+    """
+
+    def __init__(self, path: str, readonly: bool = False, sync: bool = True) -> None:
+        self.path = path
+        self.readonly = readonly
+        if readonly:
+            uri = 'file:{}?mode=ro'.format(urllib.parse.quote(os.path.abspath(path)))
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            if sync:
+                self._conn.execute("PRAGMA journal_mode = DELETE")
+                self._conn.execute("PRAGMA synchronous = FULL")
+            else:
+                self._conn.execute("PRAGMA journal_mode = WAL")
+                self._conn.execute("PRAGMA synchronous = NORMAL")
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS results (hash TEXT PRIMARY KEY, result BLOB NOT NULL)")
+        # one connection is shared between the threads which launch tasks
+        self._lock = threading.Lock()
+
+    def get(self, hashsum: str) -> Optional[Future]:
+        """A completed Future holding the result stored for hashsum, or None
+        if there is none, or it cannot be loaded.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM results WHERE hash = ?", (hashsum,)).fetchone()
+        if row is None:
+            return None
+        try:
+            result = pickle.loads(row[0])
+        except Exception:
+            logger.exception("Could not load checkpointed result {} from {}".format(hashsum, self.path))
+            return None
+        fu: Future = Future()
+        fu.set_result(result)
+        return fu
+
+    def put(self, items: Iterable[Tuple[str, Any]]) -> int:
+        """Store (hashsum, result) pairs in one transaction, replacing any
+        results already stored for those hashes. Returns the number stored.
+        """
+        rows = [(hashsum, pickle.dumps(result)) for hashsum, result in items]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO results (hash, result) VALUES (?, ?)", rows)
+        return len(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,108 @@
+"""Background writing of task_exit checkpoints
+
+With ``checkpoint_mode='task_exit'``, the result of each task is checkpointed
+when it completes. Rather than writing each result in the thread which
+handles the task's completion, the DataFlowKernel queues it for a
+CheckpointWriter, which writes the results queued while it was busy in one
+batch.
+"""
+import logging
+import queue
+import threading
+import time
+
+from typing import Any, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+CheckpointRecord = Tuple[str, Any]
+"""The memoization hash and result of a task."""
+
+_STOP = object()
+
+
+class CheckpointWriter:
+    """Writes checkpoint records in batches in a background thread.
+
+    The writer waits for a record, then collects the records queued after
+    it, for up to flush_interval seconds or until there are batch_size, and
+    passes them to write together.
+
+    Parameters
+    ----------
+    write : callable
+        Writes a list of records to the checkpoint.
+    batch_size : int
+        The largest number of records to write at once.
+    flush_interval : float
+        The longest time, in seconds, to wait for more records before
+        writing a batch. If 0, a batch holds the records which were queued
+        while the previous batch was being written.
+    """
+
+    def __init__(self, write: Callable[[List[CheckpointRecord]], Any], batch_size: int = 1000, flush_interval: float = 0) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1, not {}".format(batch_size))
+        self._write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._cond = threading.Condition()
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="Checkpoint-Writer", daemon=True)
+        self._thread.start()
+
+    def put(self, record: CheckpointRecord) -> None:
+        """Queue a record to be written."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Cannot queue a checkpoint record on a closed CheckpointWriter")
+            self._queued += 1
+            self._queue.put(record)
+
+    def flush(self) -> None:
+        """Wait until the records queued so far have been written."""
+        with self._cond:
+            target = self._queued
+            self._cond.wait_for(lambda: self._written >= target)
+
+    def close(self) -> None:
+        """Write the records queued so far, then stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    timeout = deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Failed to write {} checkpoint records".format(len(batch)))
+
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
@@ -0,0 +1,94 @@
+"""Handling of task completions away from executor threads
+
+Executors complete the Futures of launched tasks from their own threads -
+for the high throughput executor, the single thread which receives results
+from the interchange. The DataFlowKernel's handling of each completion
+(recording the result, retries, memoization, checkpointing and launching
+dependent tasks) is passed to a CompletionDispatcher, so that it does not
+slow down the receipt of further results.
+"""
+import logging
+import queue
+import threading
+
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_Item = Optional[Tuple[Callable[..., Any], Tuple[Any, ...]]]
+
+
+class CompletionDispatcher:
+    """Runs handlers in a fixed number of threads, keeping the handlers
+    dispatched with the same key in the order they were dispatched.
+
+    Each key is always handled by the same thread, so the handlers for one
+    task run one at a time, in order. Once the dispatcher is closed,
+    handlers run in the thread which dispatches them.
+
+    Parameters
+    ----------
+    threads : int
+        The number of threads to run handlers in.
+    """
+
+    def __init__(self, threads: int) -> None:
+        if threads < 1:
+            raise ValueError("A CompletionDispatcher needs at least one thread, not {}".format(threads))
+        self._queues: List["queue.SimpleQueue[_Item]"] = [queue.SimpleQueue() for _ in range(threads)]
+        self._threads = [threading.Thread(target=self._run, args=(q,), name="Completion-Dispatcher-{}".format(i), daemon=True)
+                         for i, q in enumerate(self._queues)]
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue_length = 0
+        self.max_queue_length = 0
+        """The largest number of handlers which have been waiting or running at once."""
+
+        for t in self._threads:
+            t.start()
+
+    @property
+    def queue_length(self) -> int:
+        """The number of handlers waiting or running."""
+        return self._queue_length
+
+    def dispatch(self, key: int, handler: Callable[..., Any], *args: Any) -> None:
+        """Run handler(*args) in the thread for key.
+        """
+        with self._lock:
+            if not self._closed:
+                self._queue_length += 1
+                if self._queue_length > self.max_queue_length:
+                    self.max_queue_length = self._queue_length
+                self._queues[key % len(self._queues)].put((handler, args))
+                return
+        handler(*args)
+
+    def _run(self, q: "queue.SimpleQueue[_Item]") -> None:
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            handler, args = item
+            try:
+                handler(*args)
+            except Exception:
+                logger.exception("Completion handler {} raised an exception, which will be ignored".format(handler))
+            finally:
+                with self._lock:
+                    self._queue_length -= 1
+
+    def close(self) -> None:
+        """Run the handlers already dispatched, then stop the threads.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for q in self._queues:
+                q.put(None)
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join()
+        logger.info("Completion dispatcher closed; its queue reached a maximum length of {}".format(self.max_queue_length))
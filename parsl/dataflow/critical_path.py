@@ -0,0 +1,127 @@
+"""Estimates of the remaining critical path of tasks
+
+When enabled with ``Config(critical_path_priority=True)``, the DataFlowKernel
+records the dependency graph of its outstanding tasks and the runtimes of the
+tasks of each app which have completed. When a task is launched, the length
+of the longest chain of outstanding tasks which starts with it, measured in
+estimated runtime, is attached to it as its priority, so that executors which
+can order their queued tasks run the tasks on the critical path of the
+workflow first.
+"""
+import logging
+import threading
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CriticalPathEstimator:
+    """Tracks the dependency graph of outstanding tasks and the runtime of
+    each app, and estimates the remaining path length of tasks.
+
+    The runtime of an app is estimated as the mean runtime of its completed
+    tasks; apps with no completed tasks are estimated with the mean over all
+    apps, or ``default_runtime`` before any task has completed. With no
+    runtime history, the remaining path length is therefore the number of
+    tasks on the longest chain of dependents.
+
+    Path lengths are cached until a new dependency is registered, so the
+    estimates of cached tasks do not follow changes in app runtimes made in
+    the meantime.
+
+    Parameters
+    ----------
+    default_runtime : float
+        The runtime, in seconds, assumed for tasks before any runtimes have
+        been recorded.
+    """
+
+    def __init__(self, default_runtime: float = 1.0) -> None:
+        self.default_runtime = default_runtime
+        self._lock = threading.Lock()
+
+        # task id -> func_name, for outstanding tasks
+        self._func_names: Dict[int, str] = {}
+        # task id -> ids of outstanding tasks which depend on it
+        self._dependents: Dict[int, List[int]] = {}
+
+        # func_name -> (total runtime, number of tasks)
+        self._runtimes: Dict[str, Tuple[float, int]] = {}
+        self._total_runtime = 0.0
+        self._total_count = 0
+
+        # the cache holds (graph version, path length) for each task
+        self._version = 0
+        self._cache: Dict[int, Tuple[int, float]] = {}
+
+    def add_task(self, task_id: int, func_name: str, depends: Sequence[int]) -> None:
+        """Register an outstanding task and the ids of the tasks it depends on.
+        """
+        with self._lock:
+            self._func_names[task_id] = func_name
+            registered = False
+            for parent in depends:
+                if parent in self._func_names:
+                    self._dependents.setdefault(parent, []).append(task_id)
+                    registered = True
+            if registered:
+                self._version += 1
+
+    def task_done(self, task_id: int, runtime: Optional[float] = None) -> None:
+        """Forget a task which is no longer outstanding, recording the runtime
+        of its app if it ran to completion.
+        """
+        with self._lock:
+            func_name = self._func_names.pop(task_id, None)
+            self._dependents.pop(task_id, None)
+            self._cache.pop(task_id, None)
+            if func_name is not None and runtime is not None:
+                total, count = self._runtimes.get(func_name, (0.0, 0))
+                self._runtimes[func_name] = (total + runtime, count + 1)
+                self._total_runtime += runtime
+                self._total_count += 1
+
+    def estimated_runtime(self, func_name: str) -> float:
+        """The estimated runtime, in seconds, of a task of the named app.
+        """
+        if func_name in self._runtimes:
+            total, count = self._runtimes[func_name]
+            return total / count
+        elif self._total_count > 0:
+            return self._total_runtime / self._total_count
+        else:
+            return self.default_runtime
+
+    def remaining_path(self, task_id: int) -> float:
+        """The estimated runtime of the longest chain of outstanding tasks
+        starting with the given task, including the task itself.
+        """
+        with self._lock:
+            version = self._version
+            cache = self._cache
+
+            def cached(t: int) -> bool:
+                entry = cache.get(t)
+                return entry is not None and entry[0] == version
+
+            # depth first, without recursion so that long chains of
+            # dependents do not exhaust the stack
+            stack = [task_id]
+            while stack:
+                t = stack[-1]
+                if cached(t):
+                    stack.pop()
+                    continue
+                dependents = self._dependents.get(t, [])
+                uncached = [d for d in dependents if not cached(d)]
+                if uncached:
+                    stack.extend(uncached)
+                    continue
+                stack.pop()
+                longest = max((cache[d][1] for d in dependents), default=0.0)
+                func_name = self._func_names.get(t)
+                own = self.estimated_runtime(func_name) if func_name is not None else 0.0
+                cache[t] = (version, own + longest)
+
+            return cache[task_id][1]
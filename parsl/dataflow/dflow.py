@@ -4,16 +4,15 @@ import logging
 import os
 import pathlib
 import pickle
-import random
-import time
 import typeguard
 import inspect
+import itertools
 import threading
 import sys
 import datetime
 from getpass import getuser
 from typeguard import typechecked
-from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 from uuid import uuid4
 from socket import gethostname
 from concurrent.futures import Future
@@ -26,10 +25,16 @@ from parsl.channels import Channel
 from parsl.config import Config
 from parsl.data_provider.data_manager import DataManager
 from parsl.data_provider.files import File
+from parsl.dataflow.checkpoint_store import CHECKPOINT_DB, SQLiteCheckpointStore
+from parsl.dataflow.checkpoint_writer import CheckpointRecord, CheckpointWriter
+from parsl.dataflow.completion import CompletionDispatcher
+from parsl.dataflow.critical_path import CriticalPathEstimator
 from parsl.dataflow.errors import BadCheckpoint, DependencyError, JoinError
+from parsl.dataflow.executor_selection import ExecutorSelector, RandomSelector
 from parsl.dataflow.futures import AppFuture
 from parsl.dataflow.job_status_poller import JobStatusPoller
-from parsl.dataflow.memoization import Memoizer
+from parsl.dataflow.memoization import MEMO_SPILL_DB, Memoizer
+from parsl.dataflow.nested_futures import find_futures, replace_futures
 from parsl.dataflow.rundirs import make_rundir
 from parsl.dataflow.states import States, FINAL_STATES, FINAL_FAILURE_STATES
 from parsl.dataflow.taskrecord import TaskRecord
@@ -41,7 +46,8 @@ from parsl.executors.threads import ThreadPoolExecutor
 from parsl.monitoring import MonitoringHub
 from parsl.process_loggers import wrap_with_logs
 from parsl.providers.base import ExecutionProvider, JobStatus, JobState
-from parsl.utils import get_version, get_std_fname_mode, get_all_checkpoints, Timer
+from parsl.serialize.proxy import ResultProxy, has_proxies, resolving_proxies
+from parsl.utils import get_version, get_all_checkpoints, AtomicIDCounter, Timer
 
 from parsl.monitoring.message_type import MessageType
 
@@ -161,25 +167,66 @@ class DataFlowKernel:
             self.monitoring.send(MessageType.WORKFLOW_INFO,
                                  workflow_info)
 
+        checkpoint_dirs: Sequence[str]
         if config.checkpoint_files is not None:
-            checkpoints = self.load_checkpoints(config.checkpoint_files)
+            checkpoint_dirs = config.checkpoint_files
         elif config.checkpoint_files is None and config.checkpoint_mode is not None:
-            checkpoints = self.load_checkpoints(get_all_checkpoints(self.run_dir))
+            checkpoint_dirs = get_all_checkpoints(self.run_dir)
         else:
-            checkpoints = {}
+            checkpoint_dirs = []
+        checkpoints = self.load_checkpoints(checkpoint_dirs)
+        checkpoint_stores = self._open_checkpoint_stores(checkpoint_dirs)
+
+        self.memoizer = Memoizer(self, memoize=config.app_cache, checkpoint=checkpoints,
+                                 checkpoint_stores=checkpoint_stores,
+                                 max_entries=config.memo_max_entries, max_bytes=config.memo_max_bytes,
+                                 spill_path=os.path.join(self.run_dir, MEMO_SPILL_DB) if config.memo_spill else None)
+        self._checkpoint_db: Optional[SQLiteCheckpointStore] = None
+
+        self.critical_path: Optional[CriticalPathEstimator] = None
+        if config.critical_path_priority:
+            self.critical_path = CriticalPathEstimator()
+
+        self.executor_selector: ExecutorSelector
+        if config.executor_selector is None:
+            self.executor_selector = RandomSelector()
+        else:
+            self.executor_selector = config.executor_selector
+
+        self.completion_dispatcher: Optional[CompletionDispatcher] = None
+        if config.completion_threads > 0:
+            self.completion_dispatcher = CompletionDispatcher(config.completion_threads)
 
-        self.memoizer = Memoizer(self, memoize=config.app_cache, checkpoint=checkpoints)
+        # the futures whose results were passed in shared storage to tasks
+        # depending on them, which keep the files of those results
+        self._proxy_futures: Set[AppFuture] = set()
+        self._proxy_futures_lock = threading.Lock()
+
+        # the number of tries launched on each executor which have not yet returned
+        self._launched_tasks: Dict[str, int] = {}
+        self._launched_tasks_lock = threading.Lock()
         self.checkpointed_tasks = 0
         self._checkpoint_timer = None
         self.checkpoint_mode = config.checkpoint_mode
         self.checkpointable_tasks: List[TaskRecord] = []
 
+        # task_exit checkpoints are written in the background, in batches
+        self._checkpoint_writer: Optional[CheckpointWriter] = None
+        if self.checkpoint_mode == 'task_exit':
+            self._checkpoint_writer = CheckpointWriter(self._write_checkpoint,
+                                                       batch_size=config.checkpoint_batch_size,
+                                                       flush_interval=config.checkpoint_flush_interval)
+
         # this must be set before executors are added since add_executors calls
         # job_status_poller.add_executors.
         self.job_status_poller = JobStatusPoller(self)
 
         self.executors: Dict[str, ParslExecutor] = {}
 
+        # Executors need not be safe to submit to from several threads at
+        # once, so submissions to each executor are serialized by its own lock
+        self._submitter_locks: Dict[str, threading.Lock] = {}
+
         self.data_manager = DataManager(self)
         parsl_internal_executor = ThreadPoolExecutor(max_threads=config.internal_tasks_max_threads, label='_parsl_internal')
         self.add_executors(config.executors)
@@ -196,76 +243,79 @@ class DataFlowKernel:
                 checkpoint_period = (h * 3600) + (m * 60) + s
                 self._checkpoint_timer = Timer(self.checkpoint, interval=checkpoint_period, name="Checkpoint")
 
-        self.task_count = 0
+        self._task_id_counter = AtomicIDCounter()
         self.tasks: Dict[int, TaskRecord] = {}
-        self.submitter_lock = threading.Lock()
+
+        # The number of tasks for each executor which have been submitted but
+        # whose completion has not yet been handled. Waiters are notified when
+        # any of these reaches zero.
+        self._outstanding_tasks: Dict[str, int] = {}
+        self._outstanding_tasks_cond = threading.Condition()
 
         atexit.register(self.atexit_cleanup)
 
-    def _send_task_log_info(self, task_record: TaskRecord) -> None:
+    @property
+    def task_count(self) -> int:
+        """The number of tasks submitted to this DataFlowKernel"""
+        return self._task_id_counter.count
+
+    def _send_task_log_info(self, task_record: TaskRecord, first: bool = False) -> None:
         if self.monitoring:
-            task_log_info = self._create_task_log_info(task_record)
+            task_log_info = self._create_task_log_info(task_record, first)
             self.monitoring.send(MessageType.TASK_INFO, task_log_info)
 
-    def _create_task_log_info(self, task_record):
+    def _create_task_log_info(self, task_record: TaskRecord, first: bool = False) -> Tuple[Any, ...]:
         """
-        Create the dictionary that will be included in the log.
-        """
-        info_to_monitor = ['func_name', 'memoize', 'hashsum', 'fail_count', 'fail_cost', 'status',
-                           'id', 'time_invoked', 'try_time_launched', 'time_returned', 'try_time_returned', 'executor']
-
-        task_log_info = {"task_" + k: task_record[k] for k in info_to_monitor}
-        task_log_info['run_id'] = self.run_id
-        task_log_info['try_id'] = task_record['try_id']
-        task_log_info['timestamp'] = datetime.datetime.now()
-        task_log_info['task_status_name'] = task_record['status'].name
-        task_log_info['tasks_failed_count'] = self.task_state_counts[States.failed]
-        task_log_info['tasks_completed_count'] = self.task_state_counts[States.exec_done]
-        task_log_info['tasks_memo_completed_count'] = self.task_state_counts[States.memo_done]
-        task_log_info['from_memo'] = task_record['from_memo']
-        task_log_info['task_inputs'] = str(task_record['kwargs'].get('inputs', None))
-        task_log_info['task_outputs'] = str(task_record['kwargs'].get('outputs', None))
-        task_log_info['task_stdin'] = task_record['kwargs'].get('stdin', None)
-        stdout_spec = task_record['kwargs'].get('stdout', None)
-        stderr_spec = task_record['kwargs'].get('stderr', None)
-        try:
-            stdout_name, _ = get_std_fname_mode('stdout', stdout_spec)
-        except Exception as e:
-            logger.warning("Incorrect stdout format {} for Task {}".format(stdout_spec, task_record['id']))
-            stdout_name = str(e)
-        try:
-            stderr_name, _ = get_std_fname_mode('stderr', stderr_spec)
-        except Exception as e:
-            logger.warning("Incorrect stderr format {} for Task {}".format(stderr_spec, task_record['id']))
-            stderr_name = str(e)
-        task_log_info['task_stdout'] = stdout_name
-        task_log_info['task_stderr'] = stderr_name
-        task_log_info['task_fail_history'] = ",".join(task_record['fail_history'])
-        task_log_info['task_depends'] = None
-        if task_record['depends'] is not None:
-            task_log_info['task_depends'] = ",".join([str(t.tid) for t in task_record['depends']
-                                                      if isinstance(t, AppFuture) or isinstance(t, DataFuture)])
-        task_log_info['task_joins'] = None
-
-        if isinstance(task_record['joins'], list):
-            task_log_info['task_joins'] = ",".join([str(t.tid) for t in task_record['joins']
-                                                    if isinstance(t, AppFuture) or isinstance(t, DataFuture)])
-        elif isinstance(task_record['joins'], Future):
-            task_log_info['task_joins'] = ",".join([str(t.tid) for t in [task_record['joins']]
-                                                    if isinstance(t, AppFuture) or isinstance(t, DataFuture)])
-
-        return task_log_info
-
-    def _count_deps(self, depends: Sequence[Future]) -> int:
-        """Count the number of unresolved futures in the list depends.
-        """
-        count = 0
-        for dep in depends:
-            if isinstance(dep, Future):
-                if not dep.done():
-                    count += 1
+        Create the tuple of task information, in the order of TASK_INFO_FIELDS,
+        which the monitoring router expands into the message to record.
 
-        return count
+        The fields recorded only when the task is first seen are included
+        only if first is set.
+        """
+        if first:
+            kwargs = task_record['kwargs']
+            depends = tuple(d.tid for d in task_record['depends']
+                            if isinstance(d, AppFuture) or isinstance(d, DataFuture))
+            submission_info: Optional[Tuple[Any, ...]]
+            submission_info = (str(kwargs.get('inputs', None)),
+                               str(kwargs.get('outputs', None)),
+                               kwargs.get('stdin', None),
+                               kwargs.get('stdout', None),
+                               kwargs.get('stderr', None),
+                               depends)
+        else:
+            submission_info = None
+
+        joins = task_record['joins']
+        joins_ids: Optional[Tuple[int, ...]]
+        if isinstance(joins, list):
+            joins_ids = tuple(t.tid for t in joins if isinstance(t, AppFuture) or isinstance(t, DataFuture))
+        elif isinstance(joins, Future):
+            joins_ids = tuple(t.tid for t in [joins] if isinstance(t, AppFuture) or isinstance(t, DataFuture))
+        else:
+            joins_ids = None
+
+        return (task_record['id'],
+                task_record['try_id'],
+                task_record['status'],
+                datetime.datetime.now(),
+                task_record['func_name'],
+                task_record['memoize'],
+                task_record['hashsum'],
+                task_record['fail_count'],
+                task_record['fail_cost'],
+                task_record['fail_history'],
+                task_record['time_invoked'],
+                task_record['try_time_launched'],
+                task_record['time_returned'],
+                task_record['try_time_returned'],
+                task_record['executor'],
+                task_record['from_memo'],
+                joins_ids,
+                self.task_state_counts[States.failed],
+                self.task_state_counts[States.exec_done],
+                self.task_state_counts[States.memo_done],
+                submission_info)
 
     @property
     def config(self) -> Config:
@@ -296,6 +346,10 @@ class DataFlowKernel:
         if not future.done():
             raise RuntimeError("done callback called, despite future not reporting itself as done")
 
+        if task_record['status'] == States.launched:
+            with self._launched_tasks_lock:
+                self._launched_tasks[task_record['executor']] -= 1
+
         try:
             res = self._unwrap_remote_exception_wrapper(future)
 
@@ -379,14 +433,14 @@ class DataFlowKernel:
                         task_record['joins'] = joinable
                         task_record['join_lock'] = threading.Lock()
                         self._send_task_log_info(task_record)
-                        joinable.add_done_callback(partial(self.handle_join_update, task_record))
+                        joinable.add_done_callback(self._completion_callback(self.handle_join_update, task_record))
                     elif isinstance(joinable, list) and [j for j in joinable if not isinstance(j, Future)] == []:
                         self.update_task_state(task_record, States.joining)
                         task_record['joins'] = joinable
                         task_record['join_lock'] = threading.Lock()
                         self._send_task_log_info(task_record)
                         for inner_future in joinable:
-                            inner_future.add_done_callback(partial(self.handle_join_update, task_record))
+                            inner_future.add_done_callback(self._completion_callback(self.handle_join_update, task_record))
                     else:
                         task_record['time_returned'] = datetime.datetime.now()
                         self.update_task_state(task_record, States.failed)
@@ -402,6 +456,8 @@ class DataFlowKernel:
         # pending - in which case, we should consider ourself for relaunch
         if task_record['status'] == States.pending:
             self.launch_if_ready(task_record)
+        elif task_record['status'] in FINAL_STATES:
+            self._retire_task(task_record)
 
     def handle_join_update(self, task_record: TaskRecord, inner_app_future: AppFuture) -> None:
         with task_record['join_lock']:
@@ -493,6 +549,8 @@ class DataFlowKernel:
 
             self._send_task_log_info(task_record)
 
+            self._retire_task(task_record)
+
     def handle_app_update(self, task_record: TaskRecord, future: AppFuture) -> None:
         """This function is called as a callback when an AppFuture
         is in its final state.
@@ -513,25 +571,38 @@ class DataFlowKernel:
         if not task_record['app_fu'] == future:
             logger.error("Internal consistency error: callback future is not the app_fu in task structure, for task {}".format(task_id))
 
-        self.memoizer.update_memo(task_record, future)
-
-        # Cover all checkpointing cases here:
-        # Do we need to checkpoint now, or queue for later,
-        # or do nothing?
-        if self.checkpoint_mode == 'task_exit':
-            self.checkpoint(tasks=[task_record])
-        elif self.checkpoint_mode == 'manual' or \
-                self.checkpoint_mode == 'periodic' or \
-                self.checkpoint_mode == 'dfk_exit':
-            with self.checkpoint_lock:
-                self.checkpointable_tasks.append(task_record)
-        elif self.checkpoint_mode is None:
-            pass
-        else:
-            raise RuntimeError(f"Invalid checkpoint mode {self.checkpoint_mode}")
+        runtime = self._task_runtime(task_record)
+        try:
+            self.executor_selector.task_done(task_record, runtime)
+
+            self.memoizer.update_memo(task_record, future)
+
+            # Cover all checkpointing cases here:
+            # Do we need to checkpoint now, or queue for later,
+            # or do nothing?
+            if self.checkpoint_mode == 'task_exit':
+                assert self._checkpoint_writer is not None
+                record = self._checkpoint_record(task_record)
+                if record is not None:
+                    self._checkpoint_writer.put(record)
+            elif self.checkpoint_mode == 'manual' or \
+                    self.checkpoint_mode == 'periodic' or \
+                    self.checkpoint_mode == 'dfk_exit':
+                with self.checkpoint_lock:
+                    self.checkpointable_tasks.append(task_record)
+            elif self.checkpoint_mode is None:
+                pass
+            else:
+                raise RuntimeError(f"Invalid checkpoint mode {self.checkpoint_mode}")
 
-        self.wipe_task(task_id)
-        return
+            self.wipe_task(task_id)
+        finally:
+            if self.critical_path is not None:
+                self.critical_path.task_done(task_id, runtime)
+            with self._outstanding_tasks_cond:
+                self._outstanding_tasks[task_record['executor']] -= 1
+                if self._outstanding_tasks[task_record['executor']] == 0:
+                    self._outstanding_tasks_cond.notify_all()
 
     def _complete_task(self, task_record: TaskRecord, new_state: States, result: Any) -> None:
         """Set a task into a completed state
@@ -572,6 +643,26 @@ class DataFlowKernel:
         if self.config.garbage_collect:
             del self.tasks[task_id]
 
+    def _retire_task(self, task_record: TaskRecord) -> None:
+        """Release the parts of a completed task's record which were only
+        needed to run it: its args and kwargs, and the futures it depended
+        on or joined. Otherwise a user holding the task's AppFuture would
+        keep alive the inputs of the task and, through its dependencies,
+        the records and results of all the tasks upstream of it.
+
+        The outcome of the task stays on its AppFuture, and the standard
+        stream names stay in its kwargs. The counts of tasks in each state
+        are kept separately, so are not affected.
+        """
+        if not self.config.garbage_collect:
+            return
+
+        kwargs = task_record['kwargs']
+        task_record['args'] = ()
+        task_record['kwargs'] = {kw: kwargs[kw] for kw in ('stdout', 'stderr') if kw in kwargs}
+        task_record['depends'] = []
+        task_record['joins'] = None
+
     @staticmethod
     def check_staging_inhibited(kwargs: Dict[str, Any]) -> bool:
         return kwargs.get('_parsl_staging_inhibit', False)
@@ -594,6 +685,10 @@ class DataFlowKernel:
 
         launch_if_ready is thread safe, so may be called from any thread
         or callback.
+
+        Whether dependencies are outstanding is read from the task's
+        outstanding_deps counter, which _dependency_done decrements, so this
+        does not scan the task's dependencies.
         """
         exec_fu = None
 
@@ -604,34 +699,37 @@ class DataFlowKernel:
                 logger.debug(f"Task {task_id} is not pending, so launch_if_ready skipping")
                 return
 
-            if self._count_deps(task_record['depends']) != 0:
+            if task_record['outstanding_deps'] != 0:
                 logger.debug(f"Task {task_id} has outstanding dependencies, so launch_if_ready skipping")
                 return
 
             # We can now launch the task or handle any dependency failures
 
-            new_args, kwargs, exceptions_tids = self._unwrap_futures(task_record['args'],
-                                                                     task_record['kwargs'])
-            task_record['args'] = new_args
-            task_record['kwargs'] = kwargs
+            exceptions_tids: List[Tuple[Exception, str]] = []
+            try:
+                new_args, kwargs, exceptions_tids = self._unwrap_futures(task_record['args'],
+                                                                         task_record['kwargs'])
+                task_record['args'] = new_args
+                task_record['kwargs'] = kwargs
 
-            if not exceptions_tids:
-                # There are no dependency errors
-                try:
+                if not exceptions_tids:
+                    # There are no dependency errors
                     exec_fu = self.launch_task(task_record)
                     assert isinstance(exec_fu, Future)
-                except Exception as e:
-                    # task launched failed somehow. the execution might
-                    # have been launched and an exception raised after
-                    # that, though. that's hard to detect from here.
-                    # we don't attempt retries here. This is an error with submission
-                    # even though it might come from user code such as a plugged-in
-                    # executor or memoization hash function.
-
-                    logger.debug("Got an exception launching task", exc_info=True)
-                    exec_fu = Future()
-                    exec_fu.set_exception(e)
-            else:
+            except Exception as e:
+                # task launched failed somehow. the execution might
+                # have been launched and an exception raised after
+                # that, though. that's hard to detect from here.
+                # we don't attempt retries here. This is an error with submission
+                # even though it might come from user code such as a plugged-in
+                # executor or memoization hash function, or from rebuilding
+                # an argument with the results of the futures nested in it.
+
+                logger.debug("Got an exception launching task", exc_info=True)
+                exec_fu = Future()
+                exec_fu.set_exception(e)
+
+            if exceptions_tids:
                 logger.info(
                     "Task {} failed due to dependency failure".format(task_id))
                 # Raise a dependency exception
@@ -644,29 +742,53 @@ class DataFlowKernel:
                                                       task_id))
 
         if exec_fu:
-            assert isinstance(exec_fu, Future)
-            try:
-                exec_fu.add_done_callback(partial(self.handle_exec_update, task_record))
-            except Exception:
-                # this exception is ignored here because it is assumed that exception
-                # comes from directly executing handle_exec_update (because exec_fu is
-                # done already). If the callback executes later, then any exception
-                # coming out of the callback will be ignored and not propate anywhere,
-                # so this block attempts to keep the same behaviour here.
-                logger.error("add_done_callback got an exception which will be ignored", exc_info=True)
+            self._set_exec_future(task_record, exec_fu)
 
-            task_record['exec_fu'] = exec_fu
+    def _set_exec_future(self, task_record: TaskRecord, exec_fu: Future) -> None:
+        """Record the Future for a launched try of a task, and arrange for
+        the task to be updated when it completes.
+        """
+        assert isinstance(exec_fu, Future)
+        try:
+            exec_fu.add_done_callback(self._completion_callback(self.handle_exec_update, task_record))
+        except Exception:
+            # this exception is ignored here because it is assumed that exception
+            # comes from directly executing handle_exec_update (because exec_fu is
+            # done already). If the callback executes later, then any exception
+            # coming out of the callback will be ignored and not propate anywhere,
+            # so this block attempts to keep the same behaviour here.
+            logger.error("add_done_callback got an exception which will be ignored", exc_info=True)
+
+        task_record['exec_fu'] = exec_fu
+
+    def _completion_callback(self, handler: Callable[..., None], task_record: TaskRecord) -> Callable[[Future], None]:
+        """A done callback which passes the completed future to handler, with
+        the task record, in the completion dispatcher's thread for the task.
+        """
+        if self.completion_dispatcher is None:
+            return partial(handler, task_record)
+        return partial(self.completion_dispatcher.dispatch, task_record['id'], handler, task_record)
+
+    def _dependency_done(self, task_record: TaskRecord) -> None:
+        """Count one completed dependency of a task, and launch the task
+        if that was its last outstanding dependency.
+        """
+        with task_record['task_launch_lock']:
+            task_record['outstanding_deps'] -= 1
+            ready = task_record['outstanding_deps'] == 0
+
+        if ready:
+            self.launch_if_ready(task_record)
 
     def launch_task(self, task_record: TaskRecord) -> Future:
         """Handle the actual submission of the task to the executor layer.
 
         If the app task has the executors attributes not set (default=='all')
-        the task is launched on a randomly selected executor from the
-        list of executors. This behavior could later be updated to support
-        binding to executors based on user specified criteria.
-
-        If the app task specifies a particular set of executors, it will be
-        targeted at those specific executors.
+        the task may be launched on any of the configured executors, otherwise
+        on one of those the app specifies. When there is a choice, the
+        executor is chosen by the configured executor selector, which is
+        asked again here unless the task has files staged for the executor
+        chosen when it was submitted.
 
         Args:
             task_record : The task record
@@ -674,21 +796,46 @@ class DataFlowKernel:
         Returns:
             Future that tracks the execution of the submitted executable
         """
-        task_id = task_record['id']
-        executable = task_record['func']
-        args = task_record['args']
-        kwargs = task_record['kwargs']
+        memo_fu = self._check_memo(task_record)
+        if memo_fu:
+            return memo_fu
+
+        executor, (executable, resource_specification, args, kwargs) = self._executor_call(task_record)
+
+        with self._submitter_locks[executor.label]:
+            exec_fu = executor.submit(executable, resource_specification, *args, **kwargs)
 
+        self._task_launched(task_record, executor, exec_fu)
+        return exec_fu
+
+    def _check_memo(self, task_record: TaskRecord) -> Optional[Future]:
+        """Start a try of a task, returning a Future for its result if the
+        result has been memoized.
+        """
         task_record['try_time_launched'] = datetime.datetime.now()
 
         memo_fu = self.memoizer.check_memo(task_record)
         if memo_fu:
-            logger.info("Reusing cached result for task {}".format(task_id))
+            logger.info("Reusing cached result for task {}".format(task_record['id']))
             task_record['from_memo'] = True
             assert isinstance(memo_fu, Future)
             return memo_fu
 
         task_record['from_memo'] = False
+        return None
+
+    def _executor_call(self, task_record: TaskRecord) -> Tuple[ParslExecutor, Tuple[Callable, Dict[str, Any], Sequence[Any], Dict[str, Any]]]:
+        """The executor for a task, and the function, resource specification,
+        args and kwargs to submit to it.
+        """
+        task_id = task_record['id']
+        executable = task_record['func']
+        args = task_record['args']
+        kwargs = task_record['kwargs']
+
+        if task_record['executor_choices'] is not None:
+            self._select_executor(task_record, task_record['executor_choices'])
+
         executor_label = task_record["executor"]
         try:
             executor = self.executors[executor_label]
@@ -698,6 +845,9 @@ class DataFlowKernel:
 
         try_id = task_record['fail_count']
 
+        if has_proxies(args, kwargs):
+            executable = resolving_proxies(executable)
+
         if self.monitoring is not None and self.monitoring.resource_monitoring_enabled:
             wrapper_logging_level = logging.DEBUG if self.monitoring.monitoring_debug else logging.INFO
             (executable, args, kwargs) = self.monitoring.monitor_wrapper(executable, args, kwargs, try_id, task_id,
@@ -709,8 +859,51 @@ class DataFlowKernel:
                                                                          executor.monitor_resources(),
                                                                          self.run_dir)
 
-        with self.submitter_lock:
-            exec_fu = executor.submit(executable, task_record['resource_specification'], *args, **kwargs)
+        resource_specification = task_record['resource_specification']
+        if self.critical_path is not None:
+            priority = self.critical_path.remaining_path(task_id)
+            task_record['priority'] = priority
+            if executor.supports_priority and 'priority' not in resource_specification:
+                resource_specification = dict(resource_specification, priority=priority)
+
+        return executor, (executable, resource_specification, args, kwargs)
+
+    def _select_executor(self, task_record: TaskRecord, choices: Sequence[str]) -> None:
+        """Choose the executor of a task again, moving the task's count of
+        outstanding tasks to the chosen executor.
+        """
+        label = self.executor_selector.select(task_record, choices, self._launched_tasks)
+        if label == task_record['executor']:
+            return
+        logger.debug("Task {} moved from executor {} to executor {}".format(task_record['id'], task_record['executor'], label))
+        with self._outstanding_tasks_cond:
+            previous = task_record['executor']
+            self._outstanding_tasks[previous] -= 1
+            if self._outstanding_tasks[previous] == 0:
+                self._outstanding_tasks_cond.notify_all()
+            self._outstanding_tasks[label] = self._outstanding_tasks.get(label, 0) + 1
+            task_record['executor'] = label
+
+    @staticmethod
+    def _task_runtime(task_record: TaskRecord) -> Optional[float]:
+        """The runtime in seconds of the try of a task which completed it, or
+        None if the task did not run to completion on an executor.
+        """
+        if task_record['status'] != States.exec_done or task_record['from_memo']:
+            return None
+        launched = task_record['try_time_launched']
+        returned = task_record['try_time_returned']
+        if launched is None or returned is None:
+            return None
+        return (returned - launched).total_seconds()
+
+    def _task_launched(self, task_record: TaskRecord, executor: ParslExecutor, exec_fu: Future) -> None:
+        task_id = task_record['id']
+        try_id = task_record['fail_count']
+
+        with self._launched_tasks_lock:
+            self._launched_tasks[executor.label] = self._launched_tasks.get(executor.label, 0) + 1
+
         self.update_task_state(task_record, States.launched)
 
         self._send_task_log_info(task_record)
@@ -722,8 +915,6 @@ class DataFlowKernel:
 
         self._log_std_streams(task_record)
 
-        return exec_fu
-
     def _add_input_deps(self, executor: str, args: Sequence[Any], kwargs: Dict[str, Any], func: Callable) -> Tuple[Sequence[Any], Dict[str, Any], Callable]:
         """Look for inputs of the app that are files. Give the data manager
         the opportunity to replace a file with a data future for that file,
@@ -799,10 +990,13 @@ class DataFlowKernel:
 
         """
         depends: List[Future] = []
+        nested = self.config.find_nested_futures
 
         def check_dep(d: Any) -> None:
             if isinstance(d, Future):
                 depends.extend([d])
+            elif nested:
+                depends.extend(find_futures(d))
 
         # Check the positional args
         for dep in args:
@@ -813,9 +1007,11 @@ class DataFlowKernel:
             dep = kwargs[key]
             check_dep(dep)
 
-        # Check for futures in inputs=[<fut>...]
-        for dep in kwargs.get('inputs', []):
-            check_dep(dep)
+        # Check for futures in inputs=[<fut>...], which have been found
+        # already if nested futures are searched for
+        if not nested:
+            for dep in kwargs.get('inputs', []):
+                check_dep(dep)
 
         return depends
 
@@ -826,7 +1022,8 @@ class DataFlowKernel:
         with the result of that future.
 
         If the user hid futures a level below, we will not catch
-        it, and will (most likely) result in a type error.
+        it, and will (most likely) result in a type error, unless
+        find_nested_futures is set in the config.
 
         Args:
              args (List) : Positional args to app function
@@ -839,19 +1036,22 @@ class DataFlowKernel:
             exceptions rather than results.
         """
         dep_failures = []
+        nested = self.config.find_nested_futures
 
         # Replace item in args
         new_args = []
         for dep in args:
             if isinstance(dep, Future):
                 try:
-                    new_args.extend([dep.result()])
+                    new_args.extend([self._dependency_result(dep)])
                 except Exception as e:
                     if hasattr(dep, 'task_def'):
                         tid = dep.task_def['id']
                     else:
                         tid = None
                     dep_failures.extend([(e, tid)])
+            elif nested:
+                new_args.extend([replace_futures(dep, dep_failures)])
             else:
                 new_args.extend([dep])
 
@@ -860,21 +1060,24 @@ class DataFlowKernel:
             dep = kwargs[key]
             if isinstance(dep, Future):
                 try:
-                    kwargs[key] = dep.result()
+                    kwargs[key] = self._dependency_result(dep)
                 except Exception as e:
                     if hasattr(dep, 'task_def'):
                         tid = dep.task_def['id']
                     else:
                         tid = None
                     dep_failures.extend([(e, tid)])
+            elif nested:
+                kwargs[key] = replace_futures(dep, dep_failures)
 
-        # Check for futures in inputs=[<fut>...]
-        if 'inputs' in kwargs:
+        # Check for futures in inputs=[<fut>...], which have been replaced
+        # already if nested futures are searched for
+        if 'inputs' in kwargs and not nested:
             new_inputs = []
             for dep in kwargs['inputs']:
                 if isinstance(dep, Future):
                     try:
-                        new_inputs.extend([dep.result()])
+                        new_inputs.extend([self._dependency_result(dep)])
                     except Exception as e:
                         if hasattr(dep, 'task_def'):
                             tid = dep.task_def['id']
@@ -888,37 +1091,38 @@ class DataFlowKernel:
 
         return new_args, kwargs, dep_failures
 
-    def submit(self,
-               func: Callable,
-               app_args: Sequence[Any],
-               executors: Union[str, Sequence[str]] = 'all',
-               cache: bool = False,
-               ignore_for_cache: Optional[Sequence[str]] = None,
-               app_kwargs: Dict[str, Any] = {},
-               join: bool = False) -> AppFuture:
-        """Add task to the dataflow system.
-
-        If the app task has the executors attributes not set (default=='all')
-        the task will be launched on a randomly selected executor from the
-        list of executors. If the app task specifies a particular set of
-        executors, it will be targeted at the specified executors.
-
-        Args:
-            - func : A function object
-
-        KWargs :
-            - app_args : Args to the function
-            - executors (list or string) : List of executors this call could go to.
-                    Default='all'
-            - cache (Bool) : To enable memoization or not
-            - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
-            - app_kwargs (dict) : Rest of the kwargs to the fn passed as dict.
-
-        Returns:
-               (AppFuture) [DataFutures,]
+    def _dependency_result(self, dep: Future) -> Any:
+        """The result of a completed dependency, to pass to the task which
+        depends on it.
 
+        A result which a worker wrote to shared storage, and which has not been
+        loaded here, is passed on as its ResultProxy, to be loaded where the
+        dependent task runs. Its file is kept until the DFK is cleaned up.
         """
+        if not isinstance(dep, AppFuture):
+            return dep.result()
+        result = dep._result_or_proxy()
+        if isinstance(result, ResultProxy):
+            with self._proxy_futures_lock:
+                self._proxy_futures.add(dep)
+        return result
 
+    def _create_task(self,
+                     func: Callable,
+                     app_args: Sequence[Any],
+                     executors: Union[str, Sequence[str]],
+                     cache: bool,
+                     ignore_for_cache: Optional[Sequence[str]],
+                     app_kwargs: Dict[str, Any],
+                     join: bool,
+                     stage: bool = True) -> TaskRecord:
+        """Create the record and AppFuture of a new task, and leave the task
+        in pending state with its dependencies counted but not yet waited on.
+
+        If stage is False, the task must have no File or Future arguments:
+        input and output staging, and the search for dependencies, are
+        skipped.
+        """
         if ignore_for_cache is None:
             ignore_for_cache = []
         else:
@@ -928,16 +1132,15 @@ class DataFlowKernel:
         if self.cleanup_called:
             raise RuntimeError("Cannot submit to a DFK that has been cleaned up")
 
-        task_id = self.task_count
-        self.task_count += 1
+        task_id = self._task_id_counter.get_id()
         if isinstance(executors, str) and executors.lower() == 'all':
             choices = list(e for e in self.executors if e != '_parsl_internal')
         elif isinstance(executors, list):
             choices = executors
         else:
             raise ValueError("Task {} supplied invalid type for executors: {}".format(task_id, type(executors)))
-        executor = random.choice(choices)
-        logger.debug("Task {} will be sent to executor {}".format(task_id, executor))
+        # chosen by the executor selector below when there is a choice
+        executor = choices[0]
 
         # The below uses func.__name__ before it has been wrapped by any staging code.
 
@@ -980,16 +1183,28 @@ class DataFlowKernel:
                     'time_returned': None,
                     'try_time_launched': None,
                     'try_time_returned': None,
-                    'resource_specification': resource_specification}
+                    'resource_specification': resource_specification,
+                    'priority': None,
+                    'executor_choices': None}
+
+        if len(choices) > 1:
+            executor = self.executor_selector.select(task_def, choices, self._launched_tasks)
+            task_def['executor'] = executor
+            # files are staged for the executor chosen now, so tasks with
+            # files keep it; others are placed again when they are launched
+            if not (stage and self._uses_files(app_args, app_kwargs)):
+                task_def['executor_choices'] = choices
+        logger.debug("Task {} will be sent to executor {}".format(task_id, executor))
 
         self.update_task_state(task_def, States.unsched)
 
         app_fu = AppFuture(task_def)
 
-        # Transform remote input files to data futures
-        app_args, app_kwargs, func = self._add_input_deps(executor, app_args, app_kwargs, func)
+        if stage:
+            # Transform remote input files to data futures
+            app_args, app_kwargs, func = self._add_input_deps(executor, app_args, app_kwargs, func)
 
-        func = self._add_output_deps(executor, app_args, app_kwargs, app_fu, func)
+            func = self._add_output_deps(executor, app_args, app_kwargs, app_fu, func)
 
         task_def.update({
                     'args': app_args,
@@ -1002,7 +1217,7 @@ class DataFlowKernel:
         self.tasks[task_id] = task_def
 
         # Get the list of dependencies for the task
-        depends = self._gather_all_deps(app_args, app_kwargs)
+        depends = self._gather_all_deps(app_args, app_kwargs) if stage else []
         task_def['depends'] = depends
 
         depend_descs = []
@@ -1021,39 +1236,215 @@ class DataFlowKernel:
                                                               task_def['func_name'],
                                                               waiting_message))
 
+        if self.critical_path is not None:
+            self.critical_path.add_task(task_id, task_def['func_name'],
+                                        [d.tid for d in depends if isinstance(d, (AppFuture, DataFuture))])
+
         task_def['task_launch_lock'] = threading.Lock()
 
+        # One for each dependency, plus one which is released below once the
+        # callbacks on the dependencies have been added
+        task_def['outstanding_deps'] = len(depends) + 1
+
+        # handle_app_update counts the task as no longer outstanding
+        with self._outstanding_tasks_cond:
+            self._outstanding_tasks[executor] = self._outstanding_tasks.get(executor, 0) + 1
         app_fu.add_done_callback(partial(self.handle_app_update, task_def))
         self.update_task_state(task_def, States.pending)
         logger.debug("Task {} set to pending state with AppFuture: {}".format(task_id, task_def['app_fu']))
 
-        self._send_task_log_info(task_def)
+        self._send_task_log_info(task_def, first=True)
+        return task_def
 
-        # at this point add callbacks to all dependencies to do a launch_if_ready
-        # call whenever a dependency completes.
+    def submit(self,
+               func: Callable,
+               app_args: Sequence[Any],
+               executors: Union[str, Sequence[str]] = 'all',
+               cache: bool = False,
+               ignore_for_cache: Optional[Sequence[str]] = None,
+               app_kwargs: Dict[str, Any] = {},
+               join: bool = False) -> AppFuture:
+        """Add task to the dataflow system.
 
-        # we need to be careful about the order of setting the state to pending,
-        # adding the callbacks, and caling launch_if_ready explicitly once always below.
+        If the app task has the executors attributes not set (default=='all')
+        the task will be launched on a randomly selected executor from the
+        list of executors. If the app task specifies a particular set of
+        executors, it will be targeted at the specified executors.
 
-        # I think as long as we call launch_if_ready once after setting pending, then
-        # we can add the callback dependencies at any point: if the callbacks all fire
-        # before then, they won't cause a launch, but the one below will. if they fire
-        # after we set it pending, then the last one will cause a launch, and the
-        # explicit one won't.
+        Args:
+            - func : A function object
 
-        for d in depends:
+        KWargs :
+            - app_args : Args to the function
+            - executors (list or string) : List of executors this call could go to.
+                    Default='all'
+            - cache (Bool) : To enable memoization or not
+            - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
+            - app_kwargs (dict) : Rest of the kwargs to the fn passed as dict.
+
+        Returns:
+               (AppFuture) [DataFutures,]
+
+        """
 
-            def callback_adapter(dep_fut: Future) -> None:
-                self.launch_if_ready(task_def)
+        task_def = self._create_task(func, app_args, executors, cache, ignore_for_cache, app_kwargs, join)
+
+        # at this point add callbacks to all dependencies to do a launch_if_ready
+        # call whenever a dependency completes.
 
+        # Each callback decrements outstanding_deps, and whichever decrement
+        # reaches zero launches the task. The extra count held by submit is
+        # released only after all the callbacks have been added, so the task
+        # cannot launch before then, however quickly its dependencies complete.
+
+        def callback_adapter(dep_fut: Future) -> None:
+            self._dependency_done(task_def)
+
+        for d in task_def['depends']:
             try:
                 d.add_done_callback(callback_adapter)
             except Exception as e:
                 logger.error("add_done_callback got an exception {} which will be ignored".format(e))
 
-        self.launch_if_ready(task_def)
+        self._dependency_done(task_def)
+
+        return task_def['app_fu']
 
-        return app_fu
+    def submit_many(self,
+                    func: Callable,
+                    app_args_iterable: Iterable[Sequence[Any]],
+                    executors: Union[str, Sequence[str]] = 'all',
+                    cache: bool = False,
+                    ignore_for_cache: Optional[Sequence[str]] = None,
+                    app_kwargs: Dict[str, Any] = {},
+                    join: bool = False,
+                    batch_size: int = 1000) -> List[AppFuture]:
+        """Add one task to the dataflow system for each set of args, all
+        calling the same function with the same kwargs.
+
+        Tasks without Future or File arguments, and without outputs, are
+        created without looking for dependencies or staging, and are handed
+        to their executors in batches of up to batch_size tasks, through
+        submit_batch on executors which have it. Any other task is added as
+        if by submit.
+
+        Args:
+            - func : A function object
+            - app_args_iterable : Args to the function, for each task
+
+        KWargs :
+            - executors (list or string) : List of executors these calls could go to.
+                    Default='all'
+            - cache (Bool) : To enable memoization or not
+            - ignore_for_cache (list) : List of kwargs to be ignored for memoization/checkpointing
+            - app_kwargs (dict) : Rest of the kwargs to the fn passed as dict, shared by all the tasks.
+            - batch_size (int) : Largest number of tasks to create before launching them.
+
+        Returns:
+               List of AppFutures, in the order of app_args_iterable
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1, not {}".format(batch_size))
+
+        app_futures = []
+        batch: List[TaskRecord] = []
+        for app_args in app_args_iterable:
+            # each task gets its own kwargs, which staging and AUTO_LOGNAME may modify
+            kwargs = dict(app_kwargs)
+            for kw in ['inputs', 'outputs']:
+                if kw in kwargs:
+                    kwargs[kw] = list(kwargs[kw])
+
+            if self._needs_dependencies_or_staging(app_args, kwargs, self.config.find_nested_futures):
+                app_futures.append(self.submit(func, app_args, executors, cache, ignore_for_cache, kwargs, join))
+                continue
+
+            task_def = self._create_task(func, app_args, executors, cache, ignore_for_cache, kwargs, join, stage=False)
+            app_futures.append(task_def['app_fu'])
+            batch.append(task_def)
+            if len(batch) >= batch_size:
+                self._launch_batch(batch)
+                batch = []
+
+        if batch:
+            self._launch_batch(batch)
+
+        return app_futures
+
+    @staticmethod
+    def _uses_files(args: Sequence[Any], kwargs: Dict[str, Any]) -> bool:
+        """Whether a task has input or output files, which may be staged.
+        """
+        if kwargs.get('outputs'):
+            return True
+        values = itertools.chain(args, kwargs.values(), kwargs.get('inputs', []))
+        return any(isinstance(v, (File, DataFuture)) for v in values)
+
+    @staticmethod
+    def _needs_dependencies_or_staging(args: Sequence[Any], kwargs: Dict[str, Any], nested: bool = False) -> bool:
+        """Whether a task must go through submit: when it might depend on
+        other tasks or need files staged. If nested is set, Futures inside
+        containers are looked for too.
+        """
+        if kwargs.get('outputs'):
+            return True
+        values = itertools.chain(args, kwargs.values(), kwargs.get('inputs', []))
+        if nested:
+            return any(isinstance(v, File) or find_futures(v) for v in values)
+        return any(isinstance(v, (Future, File)) for v in values)
+
+    def _launch_batch(self, task_records: Sequence[TaskRecord]) -> None:
+        """Launch pending tasks which have no dependencies, submitting them
+        to each executor together.
+        """
+        calls: Dict[str, List[Tuple[TaskRecord, ParslExecutor, Tuple[Callable, Dict[str, Any], Sequence[Any], Dict[str, Any]]]]] = {}
+        for task_record in task_records:
+            with task_record['task_launch_lock']:
+                # released here rather than by _dependency_done, as this launches the task
+                task_record['outstanding_deps'] = 0
+            try:
+                memo_fu = self._check_memo(task_record)
+                if memo_fu:
+                    self._set_exec_future(task_record, memo_fu)
+                    continue
+                executor, call = self._executor_call(task_record)
+            except Exception as e:
+                logger.debug("Got an exception launching task", exc_info=True)
+                self._set_exec_future(task_record, self._failed_future(e))
+                continue
+            calls.setdefault(executor.label, []).append((task_record, executor, call))
+
+        for executor_calls in calls.values():
+            executor = executor_calls[0][1]
+            if hasattr(executor, 'submit_batch'):
+                try:
+                    with self._submitter_locks[executor.label]:
+                        exec_futures = executor.submit_batch([call for (_, _, call) in executor_calls])
+                except Exception as e:
+                    logger.debug("Got an exception submitting a batch of tasks", exc_info=True)
+                    for (task_record, _, _) in executor_calls:
+                        self._set_exec_future(task_record, self._failed_future(e))
+                    continue
+                for (task_record, _, _), exec_fu in zip(executor_calls, exec_futures):
+                    self._task_launched(task_record, executor, exec_fu)
+                    self._set_exec_future(task_record, exec_fu)
+            else:
+                for (task_record, _, (func, resource_specification, args, kwargs)) in executor_calls:
+                    try:
+                        with self._submitter_locks[executor.label]:
+                            exec_fu = executor.submit(func, resource_specification, *args, **kwargs)
+                    except Exception as e:
+                        logger.debug("Got an exception launching task", exc_info=True)
+                        self._set_exec_future(task_record, self._failed_future(e))
+                        continue
+                    self._task_launched(task_record, executor, exec_fu)
+                    self._set_exec_future(task_record, exec_fu)
+
+    @staticmethod
+    def _failed_future(e: Exception) -> Future:
+        fu: Future = Future()
+        fu.set_exception(e)
+        return fu
 
     # it might also be interesting to assert that all DFK
     # tasks are in a "final" state (3,4,5) when the DFK
@@ -1113,6 +1504,7 @@ class DataFlowKernel:
                         self._create_remote_dirs_over_channel(executor.provider, executor.provider.channel)
 
             self.executors[executor.label] = executor
+            self._submitter_locks[executor.label] = threading.Lock()
             block_ids = executor.start()
             if self.monitoring and block_ids:
                 new_status = {}
@@ -1130,24 +1522,25 @@ class DataFlowKernel:
         else:
             logger.info("python process is exiting, but DFK has already been cleaned up")
 
-    def wait_for_current_tasks(self) -> None:
-        """Waits for all tasks in the task list to be completed, by waiting for their
-        AppFuture to be completed. This method will not necessarily wait for any tasks
-        added after cleanup has started (such as data stageout?)
+    def wait_for_current_tasks(self, executors: Optional[Sequence[str]] = None) -> None:
+        """Waits for all tasks to be completed, returning as soon as the
+        completion of the last one has been handled. This includes any tasks
+        submitted while waiting.
+
+        Kwargs:
+            - executors (list of str) : Only wait for tasks sent to the executors
+                    with these labels. Default=None, to wait for all tasks.
         """
 
         logger.info("Waiting for all remaining tasks to complete")
 
-        items = list(self.tasks.items())
-        for task_id, task_record in items:
-            # .exception() is a less exception throwing way of
-            # waiting for completion than .result()
-            fut = task_record['app_fu']
-            if not fut.done():
-                fut.exception()
-            # now app future is done, poll until DFK state is final: a DFK state being final and the app future being done do not imply each other.
-            while task_record['status'] not in FINAL_STATES:
-                time.sleep(0.1)
+        def done() -> bool:
+            if executors is None:
+                return not any(self._outstanding_tasks.values())
+            return not any(self._outstanding_tasks.get(label) for label in executors)
+
+        with self._outstanding_tasks_cond:
+            self._outstanding_tasks_cond.wait_for(done)
 
         logger.info("All remaining tasks completed")
 
@@ -1209,6 +1602,25 @@ class DataFlowKernel:
                 logger.warning(f"Not shutting down executor {executor.label} because it is in bad state")
 
         logger.info("Terminated executors")
+
+        if self.completion_dispatcher is not None:
+            logger.info("Closing completion dispatcher")
+            self.completion_dispatcher.close()
+            logger.info("Closed completion dispatcher")
+
+        if self._checkpoint_writer is not None:
+            logger.info("Closing checkpoint writer")
+            self._checkpoint_writer.close()
+
+        # no more tasks will load the results passed to them in shared storage
+        for fu in self._proxy_futures:
+            fu._release_proxy()
+        self._proxy_futures.clear()
+
+        self.memoizer.close()
+        if self._checkpoint_db is not None:
+            self._checkpoint_db.close()
+
         self.time_completed = datetime.datetime.now()
 
         if self.monitoring:
@@ -1245,6 +1657,9 @@ class DataFlowKernel:
             By default the checkpoints are written to the RUNDIR of the current
             run under RUNDIR/checkpoints/{tasks.pkl, dfk.pkl}
         """
+        if self._checkpoint_writer is not None:
+            self._checkpoint_writer.flush()
+
         with self.checkpoint_lock:
             if tasks:
                 checkpoint_queue = tasks
@@ -1252,6 +1667,36 @@ class DataFlowKernel:
                 checkpoint_queue = self.checkpointable_tasks
                 self.checkpointable_tasks = []
 
+        records = []
+        for task_record in checkpoint_queue:
+            record = self._checkpoint_record(task_record)
+            if record is not None:
+                records.append(record)
+
+        return self._write_checkpoint(records)
+
+    def _checkpoint_record(self, task_record: TaskRecord) -> Optional[CheckpointRecord]:
+        """The hash and result to checkpoint for a task, or None if the task
+        did not succeed or is not memoized.
+        """
+        if task_record['app_fu'] is None:
+            return None
+
+        app_fu = task_record['app_fu']
+
+        if app_fu.done() and app_fu.exception() is None:
+            hashsum = task_record['hashsum']
+            if not hashsum:
+                return None
+            logger.debug("Task {} checkpointed".format(task_record['id']))
+            return (hashsum, app_fu.result())
+        return None
+
+    def _write_checkpoint(self, records: Sequence[CheckpointRecord]) -> str:
+        """Write the state of the DFK and the given records to the checkpoint,
+        returning the checkpoint directory.
+        """
+        with self.checkpoint_lock:
             checkpoint_dir = '{0}/checkpoint'.format(self.run_dir)
             checkpoint_dfk = checkpoint_dir + '/dfk.pkl'
             checkpoint_tasks = checkpoint_dir + '/tasks.pkl'
@@ -1265,33 +1710,26 @@ class DataFlowKernel:
                          }
                 pickle.dump(state, f)
 
-            count = 0
-
-            with open(checkpoint_tasks, 'ab') as f:
-                for task_record in checkpoint_queue:
-                    task_id = task_record['id']
-
-                    if task_record['app_fu'] is None:
-                        continue
-
-                    app_fu = task_record['app_fu']
-
-                    if app_fu.done() and app_fu.exception() is None:
-                        hashsum = task_record['hashsum']
-                        if not hashsum:
-                            continue
+            if self._config.checkpoint_format == 'sqlite':
+                if self._checkpoint_db is None:
+                    self._checkpoint_db = SQLiteCheckpointStore(os.path.join(checkpoint_dir, CHECKPOINT_DB),
+                                                                sync=self._config.checkpoint_fsync)
+                self._checkpoint_db.put(records)
+            else:
+                with open(checkpoint_tasks, 'ab') as f:
+                    for hashsum, result in records:
                         t = {'hash': hashsum,
                              'exception': None,
-                             'result': None}
-
-                        t['result'] = app_fu.result()
+                             'result': result}
 
                         # We are using pickle here since pickle dumps to a file in 'ab'
                         # mode behave like a incremental log.
                         pickle.dump(t, f)
-                        count += 1
-                        logger.debug("Task {} checkpointed".format(task_id))
+                    if self._config.checkpoint_fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
 
+            count = len(records)
             self.checkpointed_tasks += count
 
             if count == 0:
@@ -1323,6 +1761,9 @@ class DataFlowKernel:
         memo_lookup_table = {}
 
         for checkpoint_dir in checkpointDirs:
+            if os.path.exists(os.path.join(checkpoint_dir, CHECKPOINT_DB)):
+                logger.info("Checkpoint {} is indexed, so its results will be read as tasks are launched".format(checkpoint_dir))
+                continue
             logger.info("Loading checkpoints from {}".format(checkpoint_dir))
             checkpoint_file = os.path.join(checkpoint_dir, 'tasks.pkl')
             try:
@@ -1354,6 +1795,25 @@ class DataFlowKernel:
                                                                                   len(memo_lookup_table.keys())))
         return memo_lookup_table
 
+    def _open_checkpoint_stores(self, checkpointDirs: Sequence[str]) -> List[SQLiteCheckpointStore]:
+        """Open the indexed checkpoints in the given checkpoint directories,
+        latest first, so that later results take precedence as they do when
+        pickled checkpoints are loaded.
+        """
+        stores = []
+        for checkpoint_dir in reversed(checkpointDirs):
+            checkpoint_file = os.path.join(checkpoint_dir, CHECKPOINT_DB)
+            if not os.path.exists(checkpoint_file):
+                continue
+            try:
+                stores.append(SQLiteCheckpointStore(checkpoint_file, readonly=True))
+            except Exception:
+                reason = "Failed to open checkpoint: {}".format(checkpoint_file)
+                logger.exception(reason)
+                raise BadCheckpoint(reason)
+            logger.info("Opened indexed checkpoint {}".format(checkpoint_file))
+        return stores
+
     @typeguard.typechecked
     def load_checkpoints(self, checkpointDirs: Optional[Sequence[str]]) -> Dict[str, Future]:
         """Load checkpoints from the checkpoint files into a dictionary.
@@ -1418,12 +1878,11 @@ class DataFlowKernelLoader:
         return cls._dfk
 
     @classmethod
-    def wait_for_current_tasks(cls) -> None:
-        """Waits for all tasks in the task list to be completed, by waiting for their
-        AppFuture to be completed. This method will not necessarily wait for any tasks
-        added after cleanup has started such as data stageout.
+    def wait_for_current_tasks(cls, executors: Optional[Sequence[str]] = None) -> None:
+        """Waits for all tasks to be completed, or only those sent to the
+        executors with the given labels.
         """
-        cls.dfk().wait_for_current_tasks()
+        cls.dfk().wait_for_current_tasks(executors)
 
     @classmethod
     def dfk(cls) -> DataFlowKernel:
@@ -0,0 +1,128 @@
+"""Policies for choosing the executor of each task
+
+When an app may run on several executors, the DataFlowKernel asks the
+`ExecutorSelector` given as ``Config(executor_selector=...)`` to choose one.
+The choice is made when the task is submitted, and made again each time the
+task is launched, so that it reflects the load on the executors at that
+time. Tasks with files to stage keep the executor chosen at submission,
+because the staging of their files depends on the executor.
+"""
+import random
+import threading
+
+from abc import ABCMeta, abstractmethod
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+from parsl.dataflow.taskrecord import TaskRecord
+
+
+class ExecutorSelector(metaclass=ABCMeta):
+    """Chooses the executor for a task from those its app allows.
+    """
+
+    @abstractmethod
+    def select(self, task_record: TaskRecord, choices: Sequence[str], load: Mapping[str, int]) -> str:
+        """Choose the label of the executor for a task.
+
+        Parameters
+        ----------
+        task_record : TaskRecord
+            The record of the task.
+        choices : sequence of str
+            The labels of the executors the task may run on. There is always
+            more than one.
+        load : mapping of str to int
+            The number of tries of tasks which have been launched on each
+            executor and have not yet returned. Executors with none may be
+            missing.
+        """
+        pass
+
+    def task_done(self, task_record: TaskRecord, runtime: Optional[float]) -> None:
+        """Called when a task has completed on the executor recorded in
+        task_record, with the runtime in seconds of its final try, or None if
+        it did not run to completion on that executor.
+        """
+        pass
+
+
+class RandomSelector(ExecutorSelector):
+    """Chooses an executor uniformly at random. This is the default.
+    """
+
+    def select(self, task_record: TaskRecord, choices: Sequence[str], load: Mapping[str, int]) -> str:
+        return random.choice(choices)
+
+
+class LeastOutstandingSelector(ExecutorSelector):
+    """Chooses the executor with the fewest launched tasks which have not
+    yet returned, at random between executors with equally few.
+    """
+
+    def select(self, task_record: TaskRecord, choices: Sequence[str], load: Mapping[str, int]) -> str:
+        fewest = min(load.get(c, 0) for c in choices)
+        return random.choice([c for c in choices if load.get(c, 0) == fewest])
+
+
+class WeightedSelector(ExecutorSelector):
+    """Chooses the executor with the fewest outstanding tasks for its weight,
+    so that executors receive tasks in proportion to their weights when
+    tasks take similar times to run on each.
+
+    Parameters
+    ----------
+    weights : dict of str to float
+        The weight of each executor, by label, such as its number of
+        workers. Executors which are not listed have a weight of 1.
+    """
+
+    def __init__(self, weights: Dict[str, float]) -> None:
+        if any(w <= 0 for w in weights.values()):
+            raise ValueError("Executor weights must be positive: {}".format(weights))
+        self.weights = weights
+
+    def select(self, task_record: TaskRecord, choices: Sequence[str], load: Mapping[str, int]) -> str:
+        return min(choices, key=lambda c: (load.get(c, 0) + 1) / self.weights.get(c, 1.0))
+
+
+class RuntimeSelector(ExecutorSelector):
+    """Chooses the executor expected to complete a task soonest, learning
+    the mean runtime of each app on each executor from completed tasks.
+
+    The time to complete a task on an executor is estimated as the mean
+    runtime of the app there, multiplied by one more than the number of
+    outstanding tasks on the executor. An app which has not yet completed on
+    an executor is assumed to take its mean runtime on the other executors
+    there, and an app with no runtimes yet is sent to the executor with the
+    fewest outstanding tasks.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (func_name, executor label) -> (total runtime, number of tasks)
+        self._runtimes: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+    def select(self, task_record: TaskRecord, choices: Sequence[str], load: Mapping[str, int]) -> str:
+        func_name = task_record['func_name']
+        with self._lock:
+            known = {c: self._runtimes[(func_name, c)] for c in choices if (func_name, c) in self._runtimes}
+
+        if not known:
+            return min(choices, key=lambda c: load.get(c, 0))
+
+        total = sum(t for t, _ in known.values())
+        count = sum(n for _, n in known.values())
+
+        def expected(c: str) -> float:
+            t, n = known.get(c, (total, count))
+            return (load.get(c, 0) + 1) * t / n
+
+        return min(choices, key=expected)
+
+    def task_done(self, task_record: TaskRecord, runtime: Optional[float]) -> None:
+        if runtime is None:
+            return
+        key = (task_record['func_name'], task_record['executor'])
+        with self._lock:
+            total, count = self._runtimes.get(key, (0.0, 0))
+            self._runtimes[key] = (total + runtime, count + 1)
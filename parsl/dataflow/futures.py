@@ -8,11 +8,13 @@ We have two basic types of futures:
 
 from concurrent.futures import Future
 import logging
+import os
 import threading
-from typing import Optional, Sequence
+from typing import Any, Optional, Sequence, Tuple
 
 from parsl.app.futures import DataFuture
 from parsl.dataflow.taskrecord import TaskRecord
+from parsl.serialize.proxy import ResultProxy
 
 logger = logging.getLogger(__name__)
 
@@ -74,6 +76,10 @@ class AppFuture(Future):
         self._outputs = []
         self.task_def = task_def
 
+        # The result loaded from shared storage, if the task returned a ResultProxy
+        self._proxy_lock = threading.Lock()
+        self._resolved_proxy: Optional[Tuple[Any]] = None
+
     @property
     def stdout(self) -> Optional[str]:
         return self.task_def['kwargs'].get('stdout')
@@ -86,6 +92,57 @@ class AppFuture(Future):
     def tid(self) -> int:
         return self.task_def['id']
 
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Return the result of the task, as `concurrent.futures.Future.result` does.
+
+        A result which the worker wrote to shared storage, leaving a `ResultProxy`
+        in its place, is loaded by the first call.
+        """
+        result = super().result(timeout=timeout)
+        if not isinstance(result, ResultProxy):
+            return result
+
+        with self._proxy_lock:
+            if self._resolved_proxy is None:
+                logger.debug("Loading result of task {} from {}".format(self.tid, result.path))
+                self._resolved_proxy = (result.resolve(),)
+            return self._resolved_proxy[0]
+
+    def _result_or_proxy(self) -> Any:
+        """The result of the completed task without loading it, if the worker
+        wrote it to shared storage: the result loaded already, or otherwise
+        its `ResultProxy`, which is retained so that loading the result here
+        leaves the file for the holder of the proxy.
+        """
+        result = super().result()
+        if not isinstance(result, ResultProxy):
+            return result
+
+        with self._proxy_lock:
+            if self._resolved_proxy is not None:
+                return self._resolved_proxy[0]
+            result.retained = True
+            return result
+
+    def _release_proxy(self) -> None:
+        """Stop retaining the file of a result left in shared storage, once
+        nothing else will load it: the file is removed now if the result has
+        been loaded here already, or otherwise when it is.
+        """
+        result = super().result()
+        if not isinstance(result, ResultProxy):
+            return
+
+        with self._proxy_lock:
+            if not result.retained:
+                return
+            result.retained = False
+            if self._resolved_proxy is not None:
+                try:
+                    os.remove(result.path)
+                except OSError:
+                    logger.warning("Could not remove result file {}".format(result.path), exc_info=True)
+
     def cancel(self) -> bool:
         raise NotImplementedError("Cancel not implemented")
 
@@ -1,21 +1,31 @@
 from __future__ import annotations
 import hashlib
+from collections import OrderedDict
 from functools import lru_cache, singledispatch
 import logging
+import os
+import pickle
+import sys
+import threading
 from parsl.dataflow.taskrecord import TaskRecord
 
-from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from typing import Callable, Dict, Any, Iterator, List, MutableMapping, Optional, Sequence, Set, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from parsl import DataFlowKernel  # import loop at runtime - needed for typechecking - TODO turn into "if typing:"
 
 from concurrent.futures import Future
 
+from parsl.dataflow.checkpoint_store import SQLiteCheckpointStore
+from parsl.dataflow.futures import AppFuture
 from parsl.serialize import serialize
+from parsl.serialize.proxy import ResultProxy
 import types
 
 logger = logging.getLogger(__name__)
 
+MEMO_SPILL_DB = 'memo_spill.db'
+
 
 @singledispatch
 def id_for_memo(obj: object, output_ref: bool = False) -> bytes:
@@ -103,6 +113,18 @@ def id_for_memo_dict(denormalized_dict: dict, output_ref: bool = False) -> bytes
     return serialize(normalized_list)
 
 
+@id_for_memo.register(ResultProxy)
+def id_for_memo_result_proxy(proxy: ResultProxy, output_ref: bool = False) -> bytes:
+    """A result left in shared storage is identified by a digest of its file,
+    which is read in pieces rather than loaded.
+    """
+    digest = hashlib.sha256()
+    with open(proxy.path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(chunk)
+    return serialize(["ResultProxy", digest.hexdigest()])
+
+
 # the LRU cache decorator must be applied closer to the id_for_memo_function call
 # that the .register() call, so that the cache-decorated version is registered.
 @id_for_memo.register(types.FunctionType)
@@ -115,6 +137,101 @@ def id_for_memo_function(f: types.FunctionType, output_ref: bool = False) -> byt
     return serialize(["types.FunctionType", f.__name__, f.__module__])
 
 
+def _result_size(fu: Future[Any]) -> int:
+    """An estimate of the memory held by the outcome of a completed future:
+    the size of its pickled result or exception, or where that cannot be
+    pickled, the size of the object itself.
+
+    A result left in shared storage is sized from its file, without loading it.
+    """
+    if not fu.done():
+        return 0
+    outcome = fu.exception()
+    if outcome is None:
+        # Future.result, so that an AppFuture does not resolve a ResultProxy
+        outcome = Future.result(fu)
+    if isinstance(outcome, ResultProxy):
+        try:
+            return os.path.getsize(outcome.path)
+        except OSError:
+            return outcome.nbytes
+    try:
+        return len(pickle.dumps(outcome))
+    except Exception:
+        return sys.getsizeof(outcome)
+
+
+class MemoTable(MutableMapping[str, 'Future[Any]']):
+    """A memo lookup table which holds at most max_entries results, or
+    results of at most max_bytes in total, evicting the least recently used
+    results to stay within those limits.
+
+    Parameters
+    ----------
+    max_entries : int, optional
+        The most results to hold. Default is None, for no limit.
+    max_bytes : int, optional
+        The most memory, estimated from the size of each pickled result, that
+        the results held may use. Default is None, for no limit.
+    on_evict : callable, optional
+        Called with a list of the (hash, future) pairs evicted by each
+        insertion, after they have been removed from the table.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 on_evict: Optional[Callable[[List[Tuple[str, Future[Any]]]], None]] = None) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1, not {}".format(max_entries))
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1, not {}".format(max_bytes))
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+        self._entries: OrderedDict[str, Tuple[Future[Any], int]] = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+        # results are looked up by launching threads and stored by completion threads
+        self._lock = threading.Lock()
+
+    def __getitem__(self, hashsum: str) -> Future[Any]:
+        with self._lock:
+            fu, _ = self._entries[hashsum]
+            self._entries.move_to_end(hashsum)
+            return fu
+
+    def __setitem__(self, hashsum: str, fu: Future[Any]) -> None:
+        size = _result_size(fu) if self.max_bytes is not None else 0
+        evicted = []
+        with self._lock:
+            if hashsum in self._entries:
+                self.bytes -= self._entries.pop(hashsum)[1]
+            self._entries[hashsum] = (fu, size)
+            self.bytes += size
+            while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                     (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                old_hashsum, (old_fu, old_size) = self._entries.popitem(last=False)
+                self.bytes -= old_size
+                evicted.append((old_hashsum, old_fu))
+            self.evictions += len(evicted)
+        if evicted and self.on_evict is not None:
+            self.on_evict(evicted)
+
+    def __delitem__(self, hashsum: str) -> None:
+        with self._lock:
+            self.bytes -= self._entries.pop(hashsum)[1]
+
+    def __contains__(self, hashsum: object) -> bool:
+        return hashsum in self._entries
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class Memoizer:
     """Memoizer is responsible for ensuring that identical work is not repeated.
 
@@ -146,7 +263,10 @@ class Memoizer:
 
     """
 
-    def __init__(self, dfk: DataFlowKernel, memoize: bool = True, checkpoint: Dict[str, Future[Any]] = {}):
+    def __init__(self, dfk: DataFlowKernel, memoize: bool = True, checkpoint: Dict[str, Future[Any]] = {},
+                 checkpoint_stores: Sequence[SQLiteCheckpointStore] = (),
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 spill_path: Optional[str] = None):
         """Initialize the memoizer.
 
         Args:
@@ -155,16 +275,36 @@ class Memoizer:
         KWargs:
             - memoize (Bool): enable memoization or not.
             - checkpoint (Dict): A checkpoint loaded as a dict.
+            - checkpoint_stores (Sequence): Indexed checkpoints, in which hashes
+              that are not in the lookup table are looked for, in order.
+            - max_entries (int): The most results to hold in memory.
+            - max_bytes (int): The most memory the results held may use.
+            - spill_path (str): A database to which results evicted from memory
+              are written, and from which they are reloaded when looked up again.
+              It is removed when the memoizer is closed.
         """
         self.dfk = dfk
         self.memoize = memoize
+        self.checkpoint_stores = checkpoint_stores
 
-        if self.memoize:
+        self.memo_lookup_table: MutableMapping[str, Future[Any]]
+        self.spill: Optional[SQLiteCheckpointStore] = None
+        self.spilled_proxy_paths: Set[str] = set()
+        if not self.memoize:
+            logger.info("App caching disabled for all apps")
+            self.memo_lookup_table = {}
+        elif max_entries is None and max_bytes is None:
             logger.info("App caching initialized")
             self.memo_lookup_table = checkpoint
         else:
-            logger.info("App caching disabled for all apps")
-            self.memo_lookup_table = {}
+            logger.info("App caching initialized, holding at most {} results and {} bytes in memory".format(
+                max_entries, max_bytes))
+            if spill_path is not None:
+                logger.info("Results evicted from the app cache will be written to {}".format(spill_path))
+                self.spill = SQLiteCheckpointStore(spill_path, sync=False)
+            self.memo_lookup_table = MemoTable(max_entries=max_entries, max_bytes=max_bytes,
+                                               on_evict=self._spill if self.spill is not None else None)
+            self.memo_lookup_table.update(checkpoint)
 
     def make_hash(self, task: TaskRecord) -> str:
         """Create a hash of the task inputs.
@@ -227,12 +367,15 @@ class Memoizer:
 
         hashsum = self.make_hash(task)
         logger.debug("Task {} has memoization hash {}".format(task_id, hashsum))
-        result = None
-        if hashsum in self.memo_lookup_table:
-            result = self.memo_lookup_table[hashsum]
+        result = self._memo_lookup(hashsum)
+        if result is not None:
             logger.info("Task %s using result from cache", task_id)
         else:
-            logger.info("Task %s had no result in cache", task_id)
+            result = self._checkpoint_lookup(hashsum)
+            if result is not None:
+                logger.info("Task %s using result from checkpoint", task_id)
+            else:
+                logger.info("Task %s had no result in cache", task_id)
 
         task['hashsum'] = hashsum
 
@@ -251,7 +394,63 @@ class Memoizer:
         Raises:
             - KeyError: if hash not in table
         """
-        return self.memo_lookup_table[hashsum]
+        result = self._memo_lookup(hashsum)
+        if result is None:
+            result = self._checkpoint_lookup(hashsum)
+        if result is None:
+            raise KeyError(hashsum)
+        return result
+
+    def _memo_lookup(self, hashsum: str) -> Optional[Future[Any]]:
+        result = self.memo_lookup_table.get(hashsum)
+        if result is None and self.spill is not None:
+            result = self.spill.get(hashsum)
+            if result is not None:
+                logger.debug("Reloading app cache entry {} from {}".format(hashsum, self.spill.path))
+                self.memo_lookup_table[hashsum] = result
+        return result
+
+    def _spill(self, evicted: List[Tuple[str, Future[Any]]]) -> None:
+        assert self.spill is not None
+        for hashsum, fu in evicted:
+            # failures are not spilled: the exceptions of many tasks cannot be pickled
+            if not fu.done() or fu.exception() is not None:
+                continue
+            if isinstance(fu, AppFuture):
+                result = fu._result_or_proxy()
+            else:
+                result = Future.result(fu)
+            try:
+                # a ResultProxy is spilled as it is, rather than loaded, and
+                # its file is kept until the memoizer is closed
+                if isinstance(result, ResultProxy):
+                    self.spilled_proxy_paths.add(result.path)
+                self.spill.put([(hashsum, result)])
+            except Exception:
+                logger.warning("Could not write app cache entry {} to {}; it is discarded".format(hashsum, self.spill.path),
+                               exc_info=True)
+
+    def _checkpoint_lookup(self, hashsum: str) -> Optional[Future[Any]]:
+        for store in self.checkpoint_stores:
+            result = store.get(hashsum)
+            if result is not None:
+                return result
+        return None
+
+    def close(self) -> None:
+        """Close the indexed checkpoints, and remove the results spilled from
+        memory.
+        """
+        for store in self.checkpoint_stores:
+            store.close()
+        if self.spill is not None:
+            self.spill.close()
+            os.remove(self.spill.path)
+        for path in self.spilled_proxy_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
 
     def update_memo(self, task: TaskRecord, r: Future[Any]) -> None:
         """Updates the memoization lookup table with the result from a task.
@@ -0,0 +1,82 @@
+"""Futures nested inside app arguments
+
+With ``Config(find_nested_futures=True)``, the DataFlowKernel looks for
+Futures inside the lists, tuples, sets, frozensets and dict values passed to
+apps, as well as at the top level of the arguments, waits for them, and
+passes the app copies of those containers with each Future replaced by its
+result.
+
+Only containers of exactly those built-in types are searched: subclasses,
+such as named tuples, and other objects are passed unchanged. The types of
+the items of a container are collected in one pass, so containers which
+hold only values that cannot be or contain Futures, such as long lists of
+numbers or strings, are skipped without examining each item in Python.
+"""
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+_CONTAINER_TYPES = frozenset((list, tuple, set, frozenset, dict))
+
+
+def _may_hold_futures(container: Any) -> bool:
+    items = container.values() if type(container) is dict else container
+    return any(t in _CONTAINER_TYPES or issubclass(t, Future) for t in set(map(type, items)))
+
+
+def find_futures(obj: Any) -> List[Future]:
+    """The Futures in obj, which may be a Future or a container holding
+    Futures at any depth, in the order they appear.
+    """
+    found: List[Future] = []
+    _find(obj, found, set())
+    return found
+
+
+def _find(obj: Any, found: List[Future], seen: Set[int]) -> None:
+    if isinstance(obj, Future):
+        found.append(obj)
+        return
+    t = type(obj)
+    if t not in _CONTAINER_TYPES or id(obj) in seen or not _may_hold_futures(obj):
+        return
+    seen.add(id(obj))
+    for item in (obj.values() if t is dict else obj):
+        _find(item, found, seen)
+
+
+def replace_futures(obj: Any, failures: List[Tuple[BaseException, Optional[int]]]) -> Any:
+    """obj with each Future replaced by its result, copying the containers
+    which hold Futures; others are returned unchanged. The Futures must be
+    complete.
+
+    A Future which failed is left in place, and its exception and task id,
+    if it is the Future of a task, are appended to failures.
+    """
+    return _replace(obj, failures, {})
+
+
+def _replace(obj: Any, failures: List[Tuple[BaseException, Optional[int]]], copies: Dict[int, Any]) -> Any:
+    if isinstance(obj, Future):
+        try:
+            return obj.result()
+        except Exception as e:
+            failures.append((e, obj.task_def['id'] if hasattr(obj, 'task_def') else None))
+            return obj
+    t = type(obj)
+    if t not in _CONTAINER_TYPES or not _may_hold_futures(obj):
+        return obj
+    if id(obj) in copies:
+        return copies[id(obj)]
+    # a container which holds itself keeps holding the original
+    copies[id(obj)] = obj
+    copy = obj
+    if t is dict:
+        values = {k: _replace(v, failures, copies) for k, v in obj.items()}
+        if any(values[k] is not v for k, v in obj.items()):
+            copy = values
+    else:
+        items = [_replace(item, failures, copies) for item in obj]
+        if any(new is not old for new, old in zip(items, obj)):
+            copy = t(items)
+    copies[id(obj)] = copy
+    return copy
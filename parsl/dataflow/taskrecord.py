@@ -37,6 +37,11 @@ class TaskRecord(TypedDict, total=False):
     executed on.
     """
 
+    executor_choices: Optional[Sequence[str]]
+    """The names of the executors which the executor of this task is chosen
+    from again each time it is launched, or None if its executor is fixed.
+    """
+
     retries_left: int
     fail_count: int
     fail_cost: float
@@ -52,6 +57,12 @@ class TaskRecord(TypedDict, total=False):
     None before that.
     """
 
+    outstanding_deps: int
+    """The number of dependencies which have not yet completed, plus one
+    while the task is being submitted. The task is launched when this
+    reaches zero. Protected by task_launch_lock.
+    """
+
     task_launch_lock: threading.Lock
     """This lock is used to ensure that task launch only happens once.
     A task can be launched by dependencies completing from arbitrary
@@ -81,6 +92,10 @@ class TaskRecord(TypedDict, total=False):
 
     resource_specification: Dict[str, Any]
 
+    priority: Optional[float]
+    """The estimated remaining critical path of the task when it was last
+    launched, if critical path priorities are enabled."""
+
     join: bool
     """Is this a join_app?"""
 
@@ -29,6 +29,14 @@ class ParslExecutor(metaclass=ABCMeta):
        radio_mode: str - a string describing which radio mode should be used to
               send task resource data back to the submit side.
 
+    Task ordering can be influenced by exposing:
+
+       supports_priority: bool - True if the executor accepts a numeric
+              ``priority`` in the resource specification of a task, and runs
+              queued tasks with a higher priority first. When critical path
+              priorities are enabled, the DataFlowKernel adds a priority to
+              the resource specification of tasks sent to such executors.
+
     An executor may optionally expose:
 
        storage_access: List[parsl.data_provider.staging.Staging] - a list of staging
@@ -42,10 +50,18 @@ class ParslExecutor(metaclass=ABCMeta):
               invariant, not co-variant, and it looks like @typeguard cannot be
               persuaded otherwise. So if you're implementing an executor and want to
               @typeguard the constructor, you'll have to use List[Any] here.
+
+       submit_batch(tasks) - submit many tasks at once. tasks is a sequence of
+              (func, resource_specification, args, kwargs) tuples, as would be
+              passed to submit, and a list of Futures for the tasks is returned in
+              the same order. The DataFlowKernel uses this, when present, to launch
+              batches of tasks created by submit_many; otherwise it calls submit
+              for each task.
     """
 
     label: str = "undefined"
     radio_mode: str = "udp"
+    supports_priority: bool = False
 
     def __enter__(self) -> Self:
         return self
@@ -183,7 +183,7 @@ class Manager:
             socks = dict(poller.poll(timeout=poll_timer))
 
             if self.task_incoming in socks and socks[self.task_incoming] == zmq.POLLIN:
-                _, pkl_msg = self.task_incoming.recv_multipart()
+                _, pkl_msg, *frames = self.task_incoming.recv_multipart()
                 tasks = pickle.loads(pkl_msg)
                 last_interchange_contact = time.time()
 
@@ -201,7 +201,10 @@ class Manager:
                     task_recv_counter += len(tasks)
                     logger.debug("[TASK_PULL_THREAD] Got tasks: {} of {}".format([t['task_id'] for t in tasks],
                                                                                  task_recv_counter))
+                    # Out-of-band buffers of the tasks follow them as frames
+                    frame_iter = iter([bytearray(frame) for frame in frames])
                     for task in tasks:
+                        task['frames'] = [next(frame_iter) for _ in range(task.pop('n_frames', 0))]
                         self.pending_task_queue.put(task)
             else:
                 logger.debug("[TASK_PULL_THREAD] No incoming tasks")
@@ -346,7 +349,7 @@ class Manager:
         logger.info("mpi_worker_pool ran for {} seconds".format(delta))
 
 
-def execute_task(bufs):
+def execute_task(bufs, frames=None, function=None):
     """Deserialize the buffer and execute the task.
 
     Returns the serialized result or exception.
@@ -354,7 +357,10 @@ def execute_task(bufs):
     user_ns = locals()
     user_ns.update({'__builtins__': __builtins__})
 
-    f, args, kwargs = unpack_apply_message(bufs, user_ns, copy=False)
+    # This pool does not register a function store with the interchange, so
+    # the function is always sent with the task
+    functions = dict([function]) if function else None
+    f, args, kwargs = unpack_apply_message(bufs, user_ns, copy=False, buffers=frames, functions=functions)
 
     fname = getattr(f, '__name__', 'f')
     prefix = "parsl_"
@@ -402,7 +408,7 @@ def worker(comm, rank):
         logger.debug("Got task: {}".format(tid))
 
         try:
-            result = execute_task(req['buffer'])
+            result = execute_task(req['buffer'], req.get('frames'), req.get('function'))
         except Exception as e:
             result_package = {'type': 'result', 'task_id': tid, 'exception': serialize(RemoteExceptionWrapper(*sys.exc_info()))}
             logger.debug("No result due to exception: {} with result package {}".format(e, result_package))
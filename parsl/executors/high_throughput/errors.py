@@ -10,3 +10,20 @@ class WorkerLost(Exception):
 
     def __str__(self):
         return self.__repr__()
+
+
+class WorkerOOMKilled(WorkerLost):
+    """Exception raised when a worker is killed for running out of memory,
+    either because it exceeded its own memory limit or because the node
+    ran out of memory
+    """
+    def __init__(self, worker_id, hostname, mem_limit=None):
+        super().__init__(worker_id, hostname)
+        self.mem_limit = mem_limit
+
+    def __repr__(self):
+        if self.mem_limit is None:
+            limit = "the memory available on the node"
+        else:
+            limit = "its memory limit of {} bytes".format(self.mem_limit)
+        return "Task failure due to worker {} on host {} exceeding {}".format(self.worker_id, self.hostname, limit)
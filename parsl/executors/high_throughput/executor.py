@@ -10,8 +10,10 @@ from multiprocessing import Queue
 from typing import Dict, Sequence  # noqa F401 (used in type annotation)
 from typing import List, Optional, Tuple, Union
 import math
+import time
 
 from parsl.serialize import pack_apply_message, deserialize
+from parsl.serialize.compression import get_compressor
 from parsl.app.errors import RemoteExceptionWrapper
 from parsl.executors.high_throughput import zmq_pipes
 from parsl.executors.high_throughput import interchange
@@ -129,6 +131,15 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         will check the available memory at startup and limit the number of workers such that
         the there's sufficient memory for each worker. Default: None
 
+    enforce_mem_per_worker : bool
+        Limit each worker, and any processes it launches, to ``mem_per_worker`` GB of memory.
+        Where the manager runs in a cgroup v2 which delegates the memory controller, each worker
+        is placed in its own cgroup with that memory limit. Otherwise the address space of each
+        worker is limited with ``RLIMIT_AS``, so that allocations beyond the limit raise
+        ``MemoryError`` in the task. Tasks on workers killed by the kernel OOM killer fail with
+        ``WorkerOOMKilled``, a subclass of ``WorkerLost``, which a retry handler can use to send
+        them to larger nodes. Requires ``mem_per_worker``. Default: False
+
     max_workers : int
         Caps the number of workers launched per node. Default: infinity
 
@@ -140,6 +151,10 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         (ex: assign 0,2 to worker 0, 1,3 to worker 1).
         The "block-reverse" option assigns adjacent cores to workers, but assigns
         the CPUs with large indices to low index workers (ex: assign 2-3 to worker 1, 0,1 to worker 2)
+        The "numa" option spreads workers round-robin across the NUMA nodes of the host, and assigns each
+        worker a block of cores within a single node (ex: with nodes 0-3 and 4-7, assign 0-1 to worker 0,
+        4-5 to worker 1, 2-3 to worker 2). The node is exported to tasks as ``PARSL_NUMA_NODE``, along with
+        ``OMP_PLACES`` and ``OMP_PROC_BIND`` so that OpenMP threads stay on the node.
 
     available_accelerators: int | list
         Accelerators available for workers to use. Each worker will be pinned to exactly one of the provided
@@ -184,6 +199,68 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
 
     worker_logdir_root : string
         In case of a remote file system, specify the path to where logs will be kept.
+
+    adaptive_workers : bool
+        If enabled, each manager samples the CPU and memory use of its workers and grows or
+        shrinks its worker pool while it runs: workers are added while every worker is busy but
+        the workers leave cores idle, and removed when the node runs short of memory. The
+        number of workers stays between ``min_workers`` and ``max_workers`` (or the number of
+        workers initially started, if ``max_workers`` is not set). Managers report their current
+        capacity to the interchange, which schedules tasks accordingly. Not supported together
+        with ``cpu_affinity``, ``available_accelerators`` or the "thread" start method.
+        Default: False
+
+    min_workers : int
+        Lower bound on the number of workers per node when ``adaptive_workers`` is enabled.
+        Default: 1
+
+    adaptive_period : float
+        Seconds between samples of worker utilisation when ``adaptive_workers`` is enabled.
+        Default: 10s
+
+    result_batch_bytes : int
+        Managers send results to the interchange in batches. A batch is sent once it holds
+        this many bytes, once it holds as many results as the manager can have tasks
+        outstanding, once its oldest result has waited ``result_batch_latency``, or earlier
+        when results are arriving too slowly for waiting to enlarge the batch.
+        Default: 1MB
+
+    result_batch_latency : int
+        Longest time in milliseconds that a result waits in the manager to be batched with
+        other results. Default: ``poll_period``, but at least 10ms
+
+    drain_timeout : float
+        If set, blocks are drained before they are scaled in: the interchange stops sending
+        tasks to the managers in the block and waits up to this many seconds for their
+        running tasks to complete, then tells the managers to exit, and only then is the
+        block cancelled through the provider. Tasks still running at the deadline fail with
+        ``ManagerLost`` and may be retried. ``scale_in`` blocks while draining.
+        If None, blocks are cancelled straight away and their running tasks are lost.
+        Default: None
+
+    compression : str
+        Compress serialized task arguments and results of at least ``compression_threshold``
+        bytes, for blocks connected over slow networks. One of "zlib", "lz4" or "zstd";
+        "lz4" and "zstd" require the lz4 and zstandard modules on the submit side and
+        on the workers. Large buffers sent out of band, such as those of NumPy arrays,
+        are not compressed. If None, nothing is compressed. Default: None
+
+    compression_threshold : int
+        Size in bytes from which serialized arguments and results are compressed.
+        Default: 16KB
+
+    result_proxy_dir : str
+        Directory on a filesystem shared by the workers and the submit side. Results whose
+        serialized size is at least ``result_proxy_threshold`` are written to a file in
+        this directory by the worker, and only a reference to the file is sent back. The
+        result is loaded from the file when ``AppFuture.result()`` is first called, so it
+        never passes through the interchange. Each file is removed once its result has been
+        loaded; the files of results which are never loaded, by ``AppFuture.result()`` or by a
+        dependent task, are left in the directory.
+        If None, all results are sent back. Default: None
+
+    result_proxy_threshold : int
+        Size in bytes from which results are written to ``result_proxy_dir``. Default: 128MB
     """
 
     @typeguard.typechecked
@@ -200,6 +277,7 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                  worker_debug: bool = False,
                  cores_per_worker: float = 1.0,
                  mem_per_worker: Optional[float] = None,
+                 enforce_mem_per_worker: bool = False,
                  max_workers: Union[int, float] = float('inf'),
                  cpu_affinity: str = 'none',
                  available_accelerators: Union[int, Sequence[str]] = (),
@@ -210,7 +288,17 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                  poll_period: int = 10,
                  address_probe_timeout: Optional[int] = None,
                  worker_logdir_root: Optional[str] = None,
-                 block_error_handler: bool = True):
+                 block_error_handler: bool = True,
+                 adaptive_workers: bool = False,
+                 min_workers: int = 1,
+                 adaptive_period: float = 10,
+                 result_batch_bytes: int = 2 ** 20,
+                 result_batch_latency: Optional[int] = None,
+                 drain_timeout: Optional[float] = None,
+                 compression: Optional[str] = None,
+                 compression_threshold: int = 2 ** 14,
+                 result_proxy_dir: Optional[str] = None,
+                 result_proxy_threshold: int = 2 ** 27):
 
         logger.debug("Initializing HighThroughputExecutor")
 
@@ -222,6 +310,7 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         self.working_dir = working_dir
         self.cores_per_worker = cores_per_worker
         self.mem_per_worker = mem_per_worker
+        self.enforce_mem_per_worker = enforce_mem_per_worker
         self.max_workers = max_workers
         self.prefetch_capacity = prefetch_capacity
         self.address = address
@@ -256,6 +345,16 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
             raise ValueError('Thread affinity is not available with start method: "thread"')
         if start_method == "thread" and len(available_accelerators) > 0:
             raise ValueError('Accelerator pinning not available with start method: "thread"')
+        if enforce_mem_per_worker and not mem_per_worker:
+            raise ValueError('enforce_mem_per_worker requires mem_per_worker to be set')
+        if enforce_mem_per_worker and start_method == "thread":
+            raise ValueError('Worker memory limits are not available with start method: "thread"')
+        if adaptive_workers and start_method == "thread":
+            raise ValueError('Adaptive worker counts are not available with start method: "thread"')
+        if adaptive_workers and cpu_affinity != "none":
+            raise ValueError('Adaptive worker counts are not available with cpu_affinity')
+        if adaptive_workers and len(available_accelerators) > 0:
+            raise ValueError('Adaptive worker counts are not available with accelerator pinning')
         if start_method == "fork":
             logger.warning("The 'fork' start method is deprecated")
             warnings.warn("The 'fork' start method is deprecated")
@@ -280,6 +379,17 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         self.run_dir = '.'
         self.worker_logdir_root = worker_logdir_root
         self.cpu_affinity = cpu_affinity
+        self.adaptive_workers = adaptive_workers
+        self.min_workers = min_workers
+        self.adaptive_period = adaptive_period
+        self.result_batch_bytes = result_batch_bytes
+        self.result_batch_latency = result_batch_latency
+        self.drain_timeout = drain_timeout
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self._compressor = None if compression is None else get_compressor(compression)
+        self.result_proxy_dir = result_proxy_dir
+        self.result_proxy_threshold = result_proxy_threshold
 
         if not launch_cmd:
             self.launch_cmd = ("process_worker_pool.py {debug} {max_workers} "
@@ -287,6 +397,7 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                                "-p {prefetch_capacity} "
                                "-c {cores_per_worker} "
                                "-m {mem_per_worker} "
+                               "{enforce_mem_per_worker} "
                                "--poll {poll_period} "
                                "--task_port={task_port} "
                                "--result_port={result_port} "
@@ -297,7 +408,12 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                                "--hb_threshold={heartbeat_threshold} "
                                "--cpu-affinity {cpu_affinity} "
                                "--available-accelerators {accelerators} "
-                               "--start-method {start_method}")
+                               "--start-method {start_method} "
+                               "--result_batch_bytes={result_batch_bytes} "
+                               "{result_batch_latency_string} "
+                               "{compression_string} "
+                               "{result_proxy_string} "
+                               "{adaptive_workers}")
 
     radio_mode = "htex"
 
@@ -313,6 +429,21 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         address_probe_timeout_string = ""
         if self.address_probe_timeout:
             address_probe_timeout_string = "--address_probe_timeout={}".format(self.address_probe_timeout)
+        adaptive_workers = ""
+        if self.adaptive_workers:
+            adaptive_workers = "--adaptive-workers --min_workers={} --adaptive_period={}".format(self.min_workers,
+                                                                                                 self.adaptive_period)
+        result_batch_latency_string = ""
+        if self.result_batch_latency is not None:
+            result_batch_latency_string = "--result_batch_latency={}".format(self.result_batch_latency)
+        compression_string = ""
+        if self.compression is not None:
+            compression_string = "--compression={} --compression_threshold={}".format(self.compression,
+                                                                                      self.compression_threshold)
+        result_proxy_string = ""
+        if self.result_proxy_dir is not None:
+            result_proxy_string = "--result_proxy_dir={} --result_proxy_threshold={}".format(self.result_proxy_dir,
+                                                                                             self.result_proxy_threshold)
         worker_logdir = "{}/{}".format(self.run_dir, self.label)
         if self.worker_logdir_root is not None:
             worker_logdir = "{}/{}".format(self.worker_logdir_root, self.label)
@@ -325,6 +456,7 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                                        result_port=self.worker_result_port,
                                        cores_per_worker=self.cores_per_worker,
                                        mem_per_worker=self.mem_per_worker,
+                                       enforce_mem_per_worker="--enforce_mem_per_worker" if self.enforce_mem_per_worker else "",
                                        max_workers=max_workers,
                                        nodes_per_block=self.provider.nodes_per_block,
                                        heartbeat_period=self.heartbeat_period,
@@ -333,7 +465,12 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                                        logdir=worker_logdir,
                                        cpu_affinity=self.cpu_affinity,
                                        accelerators=" ".join(self.available_accelerators),
-                                       start_method=self.start_method)
+                                       start_method=self.start_method,
+                                       adaptive_workers=adaptive_workers,
+                                       result_batch_bytes=self.result_batch_bytes,
+                                       result_batch_latency_string=result_batch_latency_string,
+                                       compression_string=compression_string,
+                                       result_proxy_string=result_proxy_string)
         self.launch_cmd = l_cmd
         logger.debug("Launch command: {}".format(self.launch_cmd))
 
@@ -550,6 +687,31 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                 logger.debug("Sending hold to manager: {}".format(manager['manager']))
                 self.hold_worker(manager['manager'])
 
+    def _drain_blocks(self, block_ids):
+        """ Drains the managers in the given blocks, waiting for the interchange
+        to stop them once their tasks have completed or ``drain_timeout`` has passed
+
+        Parameters
+        ----------
+        block_ids : list of str
+             Block identifiers of the blocks to drain
+        """
+        for block_id in block_ids:
+            managers = self.command_client.run("DRAIN_BLOCK;{};{}".format(block_id, self.drain_timeout))
+            logger.debug("Draining managers {} in block {}".format(managers, block_id))
+
+        # The interchange enforces the deadline, so allow a little longer for it to act
+        deadline = time.time() + self.drain_timeout + 5
+        while True:
+            remaining = [m['manager'] for m in self.connected_managers() if m['block_id'] in block_ids]
+            if not remaining:
+                logger.debug("Blocks {} have drained".format(block_ids))
+                break
+            if time.time() > deadline:
+                logger.warning("Managers {} were not stopped by the interchange after draining".format(remaining))
+                break
+            time.sleep(max(self.poll_period, 100) / 1000)
+
     def submit(self, func, resource_specification, *args, **kwargs):
         """Submits work to the outgoing_q.
 
@@ -567,6 +729,46 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         Returns:
               Future
         """
+        fut, msg, frames = self._prepare_task(func, resource_specification, args, kwargs)
+
+        # Post task to the the outgoing queue
+        self.outgoing_q.put(msg, frames)
+
+        # Return the future
+        return fut
+
+    def submit_batch(self, tasks):
+        """Submits a batch of tasks to the outgoing_q as a single message,
+        which the interchange splits back into tasks.
+
+        A task which cannot be serialized gets a failed Future, without
+        affecting the rest of the batch.
+        """
+        if self.bad_state_is_set:
+            raise self.executor_exception
+
+        futures = []
+        messages = []
+        for (func, resource_specification, args, kwargs) in tasks:
+            try:
+                fut, msg, frames = self._prepare_task(func, resource_specification, args, kwargs)
+            except Exception as e:
+                fut = Future()
+                fut.set_exception(e)
+            else:
+                messages.append((msg, frames))
+            futures.append(fut)
+
+        if messages:
+            logger.debug("Pushing batch of {} tasks to queue".format(len(messages)))
+            self.outgoing_q.put_batch(messages)
+
+        return futures
+
+    def _prepare_task(self, func, resource_specification, args, kwargs):
+        """Create the Future of a task, and the message and frames to send
+        to the interchange for it.
+        """
         if resource_specification:
             logger.error("Ignoring the resource specification. "
                          "Parsl resource specification is not supported in HighThroughput Executor. "
@@ -589,20 +791,27 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
         fut.parsl_executor_task_id = task_id
         self.tasks[task_id] = fut
 
+        # Large buffers in the arguments travel as separate ZMQ frames, and
+        # the function travels beside the packed message, so that the
+        # interchange need only send it to each manager once
+        frames = []  # type: List[memoryview]
+        functions = {}  # type: Dict[bytes, bytes]
         try:
             fn_buf = pack_apply_message(func, args, kwargs,
-                                        buffer_threshold=1024 * 1024)
+                                        buffer_threshold=1024 * 1024,
+                                        buffers=frames,
+                                        functions=functions,
+                                        compressor=self._compressor,
+                                        compression_threshold=self.compression_threshold)
         except TypeError:
             raise SerializationError(func.__name__)
 
+        (function,) = functions.items()
         msg = {"task_id": task_id,
-               "buffer": fn_buf}
+               "buffer": fn_buf,
+               "function": function}
 
-        # Post task to the the outgoing queue
-        self.outgoing_q.put(msg)
-
-        # Return the future
-        return fut
+        return fut, msg, frames
 
     def create_monitoring_info(self, status):
         """ Create a msg for monitoring based on the poll status
@@ -627,9 +836,9 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
     def scale_in(self, blocks=None, block_ids=[], force=True, max_idletime=None):
         """Scale in the number of active blocks by specified amount.
 
-        The scale in method here is very rude. It doesn't give the workers
-        the opportunity to finish current tasks or cleanup. This is tracked
-        in issue #530
+        Unless ``drain_timeout`` is set, the scale in method here is very rude.
+        It doesn't give the workers the opportunity to finish current tasks or
+        cleanup. This is tracked in issue #530
 
         Parameters
         ----------
@@ -689,9 +898,13 @@ class HighThroughputExecutor(BlockProviderExecutor, RepresentationMixin):
                 if len(block_ids_to_kill) < blocks:
                     logger.warning(f"Could not find enough blocks to kill: wanted {blocks} but only selected {len(block_ids_to_kill)}")
 
-        # Hold the block
-        for block_id in block_ids_to_kill:
-            self._hold_block(block_id)
+        if self.drain_timeout is not None:
+            # Let running tasks complete before the block is cancelled
+            self._drain_blocks(block_ids_to_kill)
+        else:
+            # Hold the block
+            for block_id in block_ids_to_kill:
+                self._hold_block(block_id)
 
         # Now kill via provider
         # Potential issue with multiple threads trying to remove the same blocks
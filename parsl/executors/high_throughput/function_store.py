@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import Optional
+
+
+class FunctionStore:
+    """ Bounded LRU store of serialized functions, keyed by the digest of
+    their serialized form
+
+    Each manager keeps the functions it has been sent in a store. The
+    interchange keeps a store of the same size for each manager, without the
+    functions themselves, and updates it in the same order as the manager
+    updates its own store: once for each task sent. The two stores therefore
+    hold the same digests, and the interchange sends a function to a manager
+    only when the manager's store does not hold it.
+
+    Parameters
+    ----------
+    maxsize : int
+        Number of functions to keep. A store of size 0 holds nothing.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._functions = OrderedDict()  # type: OrderedDict[bytes, Optional[bytes]]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._functions
+
+    def __len__(self) -> int:
+        return len(self._functions)
+
+    def put(self, digest: bytes, payload: Optional[bytes] = None) -> None:
+        """ Add a function, or mark it as recently used if it is present """
+        self._functions[digest] = payload
+        self._functions.move_to_end(digest)
+        while len(self._functions) > self.maxsize:
+            self._functions.popitem(last=False)
+
+    def get(self, digest: bytes) -> Optional[bytes]:
+        """ Return a function, and mark it as recently used, or return None
+        if it is not present
+        """
+        if digest not in self._functions:
+            return None
+        self._functions.move_to_end(digest)
+        return self._functions[digest]
@@ -21,6 +21,7 @@ from parsl.version import VERSION as PARSL_VERSION
 from parsl.serialize import serialize as serialize_object
 
 from parsl.app.errors import RemoteExceptionWrapper
+from parsl.executors.high_throughput.function_store import FunctionStore
 from parsl.executors.high_throughput.manager_record import ManagerRecord
 from parsl.monitoring.message_type import MessageType
 from parsl.process_loggers import wrap_with_logs
@@ -218,6 +219,26 @@ class Interchange:
 
         return tasks
 
+    def _pack_tasks(self, tasks, functions):
+        """ Pack a batch of tasks into the parts of a ZMQ message for a manager: the
+        pickled tasks, followed by the frames of each task in turn. Each task
+        records how many frames it has.
+
+        The serialized function of a task is left out if the manager's function
+        store, mirrored by ``functions``, already holds it.
+        """
+        frames = []
+        for task in tasks:
+            task_frames = task.pop('frames', [])
+            task['n_frames'] = len(task_frames)
+            frames.extend(task_frames)
+            if 'function' in task:
+                digest, payload = task['function']
+                if digest in functions:
+                    task['function'] = (digest, None)
+                functions.put(digest)
+        return [pickle.dumps(tasks), *frames]
+
     @wrap_with_logs(target="interchange")
     def task_puller(self):
         """Pull tasks from the incoming tasks zmq pipe onto the internal
@@ -227,17 +248,31 @@ class Interchange:
         task_counter = 0
 
         while True:
-            logger.debug("launching recv_pyobj")
+            logger.debug("launching recv_multipart")
             try:
-                msg = self.task_incoming.recv_pyobj()
+                # The out-of-band buffers of the task follow it as zero-copy
+                # frames, which are forwarded to a manager as they are
+                msg_part, *frames = self.task_incoming.recv_multipart(copy=False)
+                msg = pickle.loads(msg_part.bytes)
             except zmq.Again:
                 # We just timed out while attempting to receive
                 logger.debug("zmq.Again with {} tasks in internal queue".format(self.pending_task_queue.qsize()))
                 continue
 
-            logger.debug("putting message onto pending_task_queue")
-            self.pending_task_queue.put(msg)
-            task_counter += 1
+            if isinstance(msg, list):
+                # a batch of tasks, followed by the frames of each task in turn
+                msgs = msg
+                for msg in msgs:
+                    n_frames = msg.pop('n_frames')
+                    msg['frames'], frames = frames[:n_frames], frames[n_frames:]
+            else:
+                msg['frames'] = frames
+                msgs = [msg]
+
+            logger.debug("putting {} messages onto pending_task_queue".format(len(msgs)))
+            for msg in msgs:
+                self.pending_task_queue.put(msg)
+            task_counter += len(msgs)
             logger.debug(f"Fetched {task_counter} tasks so far")
 
     def _create_monitoring_channel(self):
@@ -302,7 +337,9 @@ class Interchange:
                                 'worker_count': m['worker_count'],
                                 'tasks': len(m['tasks']),
                                 'idle_duration': idle_duration,
-                                'active': m['active']}
+                                'active': m['active'],
+                                'draining': 'drain_deadline' in m,
+                                'result_batch_stats': m.get('result_batch_stats')}
                         reply.append(resp)
 
                 elif command_req.startswith("HOLD_WORKER"):
@@ -318,6 +355,19 @@ class Interchange:
 
                     reply = None
 
+                elif command_req.startswith("DRAIN_BLOCK"):
+                    cmd, block_id, timeout = command_req.split(';')
+                    deadline = time.time() + float(timeout)
+                    logger.info("Received DRAIN_BLOCK for block {} with timeout {}s".format(block_id, timeout))
+                    draining = []
+                    for manager_id, m in list(self._ready_managers.items()):
+                        if m['block_id'] == block_id:
+                            m['active'] = False
+                            m['drain_deadline'] = deadline
+                            draining.append(manager_id.decode('utf-8'))
+                            self._send_monitoring_info(hub_channel, m)
+                    reply = draining
+
                 else:
                     reply = None
 
@@ -379,6 +429,7 @@ class Interchange:
             self.process_task_outgoing_incoming(interesting_managers, hub_channel, kill_event)
             self.process_results_incoming(interesting_managers, hub_channel)
             self.expire_bad_managers(interesting_managers, hub_channel)
+            self.process_draining_managers(interesting_managers)
             self.process_tasks_to_send(interesting_managers)
 
         delta = time.time() - start
@@ -416,6 +467,7 @@ class Interchange:
                     logger.info("Adding manager: {} to ready queue".format(manager_id))
                     m = self._ready_managers[manager_id]
                     m.update(msg)
+                    m['functions'] = FunctionStore(msg.get('function_store_size', 0))
                     logger.info("Registration info for manager {}: {}".format(manager_id, msg))
                     self._send_monitoring_info(hub_channel, m)
 
@@ -472,7 +524,7 @@ class Interchange:
                 if (real_capacity and m['active']):
                     tasks = self.get_tasks(real_capacity)
                     if tasks:
-                        self.task_outgoing.send_multipart([manager_id, b'', pickle.dumps(tasks)])
+                        self.task_outgoing.send_multipart([manager_id, b'', *self._pack_tasks(tasks, m['functions'])], copy=False)
                         task_count = len(tasks)
                         self.count += task_count
                         tids = [t['task_id'] for t in tasks]
@@ -515,6 +567,7 @@ class Interchange:
                         hub_channel.send_pyobj(r['payload'])
                     elif r['type'] == 'heartbeat':
                         logger.debug(f"Manager {manager_id} sent heartbeat via results connection")
+                        self._update_manager_from_heartbeat(manager_id, r, interesting_managers, hub_channel)
                         b_messages.append((p_message, r))
                     else:
                         logger.error("Interchange discarding result_queue message of unknown type: {}".format(r['type']))
@@ -556,6 +609,24 @@ class Interchange:
                     interesting_managers.add(manager_id)
             logger.debug("leaving results_incoming section")
 
+    def _update_manager_from_heartbeat(self, manager_id, heartbeat, interesting_managers, hub_channel):
+        """Record the worker capacity and result batching statistics reported in
+        a manager heartbeat. Managers with adaptive worker counts report a new
+        capacity whenever they start or retire a worker.
+        """
+        m = self._ready_managers[manager_id]
+        if 'result_batch_stats' in heartbeat:
+            m['result_batch_stats'] = heartbeat['result_batch_stats']
+        if 'max_capacity' not in heartbeat:
+            return
+        if m['max_capacity'] != heartbeat['max_capacity'] or m['worker_count'] != heartbeat['worker_count']:
+            logger.info("Manager {} capacity changed from {} to {} with {} workers".format(
+                manager_id, m['max_capacity'], heartbeat['max_capacity'], heartbeat['worker_count']))
+            m['worker_count'] = heartbeat['worker_count']
+            m['max_capacity'] = heartbeat['max_capacity']
+            interesting_managers.add(manager_id)
+            self._send_monitoring_info(hub_channel, m)
+
     def expire_bad_managers(self, interesting_managers, hub_channel):
         bad_managers = [(manager_id, m) for (manager_id, m) in self._ready_managers.items() if
                         time.time() - m['last_heartbeat'] > self.heartbeat_threshold]
@@ -566,18 +637,39 @@ class Interchange:
                 m['active'] = False
                 self._send_monitoring_info(hub_channel, m)
 
+            self._remove_manager(manager_id, m, interesting_managers)
+
+    def process_draining_managers(self, interesting_managers):
+        """Stop managers which are being drained, once they have no tasks left
+        or their drain deadline has passed. Tasks still running on a manager at
+        its deadline are failed with ManagerLost so that they can be retried.
+        """
+        now = time.time()
+        drained_managers = [(manager_id, m) for (manager_id, m) in self._ready_managers.items() if
+                            'drain_deadline' in m and (not m['tasks'] or now > m['drain_deadline'])]
+        for (manager_id, m) in drained_managers:
+            if m['tasks']:
+                logger.warning(f"Manager {manager_id} did not drain before its deadline - stopping it")
+            else:
+                logger.info(f"Manager {manager_id} has drained - stopping it")
+            self.task_outgoing.send_multipart([manager_id, b'', pickle.dumps('STOP')])
+            self._remove_manager(manager_id, m, interesting_managers)
+
+    def _remove_manager(self, manager_id, m, interesting_managers):
+        """Unregister a manager, failing any tasks still recorded against it"""
+        if m['tasks']:
             logger.warning(f"Cancelling htex tasks {m['tasks']} on removed manager")
-            for tid in m['tasks']:
-                try:
-                    raise ManagerLost(manager_id, m['hostname'])
-                except Exception:
-                    result_package = {'type': 'result', 'task_id': tid, 'exception': serialize_object(RemoteExceptionWrapper(*sys.exc_info()))}
-                    pkl_package = pickle.dumps(result_package)
-                    self.results_outgoing.send(pkl_package)
-            logger.warning("Sent failure reports, unregistering manager")
-            self._ready_managers.pop(manager_id, 'None')
-            if manager_id in interesting_managers:
-                interesting_managers.remove(manager_id)
+        for tid in m['tasks']:
+            try:
+                raise ManagerLost(manager_id, m['hostname'])
+            except Exception:
+                result_package = {'type': 'result', 'task_id': tid, 'exception': serialize_object(RemoteExceptionWrapper(*sys.exc_info()))}
+                pkl_package = pickle.dumps(result_package)
+                self.results_outgoing.send(pkl_package)
+        logger.warning("Sent failure reports, unregistering manager")
+        self._ready_managers.pop(manager_id, 'None')
+        if manager_id in interesting_managers:
+            interesting_managers.remove(manager_id)
 
 
 def start_file_logger(filename, name='interchange', level=logging.DEBUG, format_string=None):
@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from typing_extensions import TypedDict
 
+from parsl.executors.high_throughput.function_store import FunctionStore
+
 
 class ManagerRecord(TypedDict, total=False):
     block_id: Optional[str]
@@ -13,3 +15,6 @@ class ManagerRecord(TypedDict, total=False):
     last_heartbeat: float
     idle_since: Optional[float]
     timestamp: datetime
+    result_batch_stats: Dict[str, Any]
+    drain_deadline: float
+    functions: FunctionStore
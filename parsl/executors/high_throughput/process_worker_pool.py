@@ -3,6 +3,8 @@
 import argparse
 import logging
 import os
+import resource
+import signal
 import sys
 import platform
 import threading
@@ -13,7 +15,7 @@ import uuid
 import subprocess
 import copy
 from threading import Thread
-from typing import Sequence, Optional
+from typing import Dict, List, Sequence, Optional, Tuple
 
 import zmq
 import math
@@ -25,7 +27,8 @@ from parsl.process_loggers import wrap_with_logs
 
 from parsl.version import VERSION as PARSL_VERSION
 from parsl.app.errors import RemoteExceptionWrapper
-from parsl.executors.high_throughput.errors import WorkerLost
+from parsl.executors.high_throughput.errors import WorkerLost, WorkerOOMKilled
+from parsl.executors.high_throughput.function_store import FunctionStore
 from parsl.executors.high_throughput.probe import probe_addresses
 from parsl.multiprocessing import ForkProcess as mpForkProcess
 from parsl.multiprocessing import SpawnProcess as mpSpawnProcess
@@ -33,10 +36,94 @@ from parsl.multiprocessing import SpawnProcess as mpSpawnProcess
 from parsl.multiprocessing import SizedQueue as mpQueue
 
 from parsl.serialize import unpack_apply_message, serialize
+from parsl.serialize.compression import get_compressor
+from parsl.serialize.facade import compress
+from parsl.serialize.proxy import serialize_result
 
 HEARTBEAT_CODE = (2 ** 32) - 1
 
 
+class ResultBatcher:
+    """ Collects results in the manager into batches for sending to the interchange
+
+    A batch is flushed when it holds ``max_items`` results or ``max_bytes``
+    bytes, or when its oldest result has waited ``max_latency`` seconds. It is
+    also flushed early when the recent arrival rate of results means that the
+    next result is not expected before ``max_latency`` expires, as waiting
+    would then add latency without making the batch larger.
+
+    The ``stats`` dictionary counts the batches, results and bytes sent, the
+    largest batch, and how often each flush reason occurred.
+    """
+
+    FLUSH_REASONS = ('count', 'bytes', 'latency', 'rate', 'heartbeat')
+
+    def __init__(self, max_items, max_bytes, max_latency):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+
+        self.items = []
+        self.nbytes = 0
+        self.first_arrival = None
+        self.last_arrival = None
+        self.mean_gap = None
+
+        self.stats = {'batches': 0,
+                      'results': 0,
+                      'bytes': 0,
+                      'max_batch_results': 0,
+                      'flush_reasons': {reason: 0 for reason in self.FLUSH_REASONS}}
+
+    def add(self, item, now):
+        """ Add a serialized result which arrived at time ``now`` to the batch """
+        if self.last_arrival is not None:
+            gap = now - self.last_arrival
+            # exponentially weighted mean of the time between results
+            self.mean_gap = gap if self.mean_gap is None else 0.8 * self.mean_gap + 0.2 * gap
+        self.last_arrival = now
+
+        if not self.items:
+            self.first_arrival = now
+        self.items.append(item)
+        self.nbytes += len(item)
+
+    def time_to_flush(self, now):
+        """ Seconds until the batch must be flushed, or None if the batch is empty """
+        if not self.items:
+            return None
+        return max(0, self.first_arrival + self.max_latency - now)
+
+    def flush_reason(self, now):
+        """ The reason the batch should be flushed at time ``now``, or None to keep collecting """
+        if not self.items:
+            return None
+        if len(self.items) >= self.max_items:
+            return 'count'
+        if self.nbytes >= self.max_bytes:
+            return 'bytes'
+        waited = now - self.first_arrival
+        if waited >= self.max_latency:
+            return 'latency'
+        if self.mean_gap is None or self.mean_gap > self.max_latency - waited:
+            return 'rate'
+        return None
+
+    def take(self, reason):
+        """ Remove and return the batched items, recording the flush in ``stats`` """
+        items = self.items
+        if items:
+            self.stats['batches'] += 1
+            self.stats['results'] += len(items)
+            self.stats['bytes'] += self.nbytes
+            self.stats['max_batch_results'] = max(self.stats['max_batch_results'], len(items))
+            self.stats['flush_reasons'][reason] += 1
+        self.items = []
+        self.nbytes = 0
+        self.first_arrival = None
+        return items
+
+
 class Manager:
     """ Manager manages task execution by the workers
 
@@ -69,7 +156,19 @@ class Manager:
                  poll_period=10,
                  cpu_affinity=False,
                  available_accelerators: Sequence[str] = (),
-                 start_method: str = 'fork'):
+                 start_method: str = 'fork',
+                 adaptive_workers: bool = False,
+                 min_workers: int = 1,
+                 adaptive_period: float = 10,
+                 adaptive_cpu_threshold: float = 0.5,
+                 result_batch_bytes: int = 2 ** 20,
+                 result_batch_latency: Optional[float] = None,
+                 enforce_mem_per_worker: bool = False,
+                 function_store_size: int = 1024,
+                 compression: Optional[str] = None,
+                 compression_threshold: int = 2 ** 14,
+                 result_proxy_dir: Optional[str] = None,
+                 result_proxy_threshold: int = 2 ** 27):
         """
         Parameters
         ----------
@@ -130,6 +229,56 @@ class Manager:
             What method to use to start new worker processes. Choices are fork, spawn, and thread.
             Default: fork
 
+        adaptive_workers : bool
+             Grow or shrink the number of workers while the manager runs, based on the CPU and
+             memory use of the workers sampled every ``adaptive_period`` seconds. The pool starts
+             with the usual worker count and stays between ``min_workers`` and ``max_workers``
+             (or the starting count, if ``max_workers`` is unbounded). Default: False
+
+        min_workers : int
+             Lower bound on the number of workers when ``adaptive_workers`` is enabled. Default: 1
+
+        adaptive_period : float
+             Seconds between samples of worker utilisation when ``adaptive_workers`` is enabled.
+             Default: 10s
+
+        adaptive_cpu_threshold : float
+             Fraction of ``cores_per_worker`` below which busy workers are considered to be
+             leaving cores idle, so that another worker may be started. Default: 0.5
+
+        result_batch_bytes : int
+             Size in bytes at which a batch of results is sent to the interchange without
+             waiting for more results. Default: 1MB
+
+        result_batch_latency : float
+             Longest time in milliseconds that a result waits in the manager to be batched with
+             other results. Default: poll_period, but at least 10ms
+
+        enforce_mem_per_worker : bool
+             Limit each worker, and any processes it launches, to ``mem_per_worker`` GB of
+             memory. Uses a cgroup v2 per worker when the manager's cgroup delegates the memory
+             controller to its children, and otherwise limits the address space of each worker
+             with ``RLIMIT_AS``. Default: False
+
+        function_store_size : int
+             Number of serialized functions to keep, so that the interchange need not send
+             a function with every task that uses it. Default: 1024
+
+        compression : str
+             Name of the compression to apply to serialized results of at least
+             ``compression_threshold`` bytes, or None for no compression. Default: None
+
+        compression_threshold : int
+             Size in bytes from which results are compressed. Default: 16KB
+
+        result_proxy_dir : str
+             Directory shared with the submit side, to which workers write results of at least
+             ``result_proxy_threshold`` bytes, sending back only a reference to the file.
+             If None, all results are sent back. Default: None
+
+        result_proxy_threshold : int
+             Size in bytes from which results are written to ``result_proxy_dir``. Default: 128MB
+
         """
 
         logger.info("Manager started")
@@ -196,6 +345,29 @@ class Manager:
                                 mem_slots,
                                 math.floor(cores_on_node / cores_per_worker))
 
+        self.cores_per_worker = cores_per_worker
+        self.mem_per_worker = mem_per_worker
+        self.worker_mem_limit = None
+        self.worker_cgroup_parent = None
+        if enforce_mem_per_worker:
+            if not mem_per_worker:
+                raise ValueError("enforce_mem_per_worker requires mem_per_worker to be set")
+            self.worker_mem_limit = int(mem_per_worker * 2**30)
+            self.worker_cgroup_parent = find_delegated_cgroup()
+            logger.info("Limiting workers to {} bytes of memory using {}".format(
+                self.worker_mem_limit, self.worker_cgroup_parent or "RLIMIT_AS"))
+        # OOM kills on the node which have been attributed to dead workers
+        self._node_oom_kills = read_oom_kill_count()
+        self.adaptive_workers = adaptive_workers
+        self.adaptive_period = adaptive_period
+        self.adaptive_cpu_threshold = adaptive_cpu_threshold
+        self.min_worker_count = max(1, min(min_workers, self.worker_count))
+        self.max_worker_count = self.worker_count if max_workers == float('inf') else max_workers
+        # Number of workers asked to exit by worker_scaler, which the watchdog
+        # should not restart when it finds them dead
+        self._retiring_workers = 0
+        self._retiring_lock = threading.Lock()
+
         # Determine which start method to use
         start_method = start_method.lower()
         if start_method == "fork":
@@ -213,6 +385,25 @@ class Manager:
 
         self.max_queue_size = self.prefetch_capacity + self.worker_count
 
+        if result_batch_latency is None:
+            result_batch_latency = max(10, poll_period)
+        self.result_batcher = ResultBatcher(max_items=self.max_queue_size,
+                                            max_bytes=result_batch_bytes,
+                                            max_latency=result_batch_latency / 1000)
+
+        self.function_store = FunctionStore(function_store_size)
+
+        if compression is not None:
+            # Fail now, rather than in every worker, if the compression is not available
+            get_compressor(compression)
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+
+        if result_proxy_dir is not None:
+            os.makedirs(result_proxy_dir, exist_ok=True)
+        self.result_proxy_dir = result_proxy_dir
+        self.result_proxy_threshold = result_proxy_threshold
+
         self.tasks_per_round = 1
 
         self.heartbeat_period = heartbeat_period
@@ -239,15 +430,26 @@ class Manager:
                'block_id': self.block_id,
                'prefetch_capacity': self.prefetch_capacity,
                'max_capacity': self.worker_count + self.prefetch_capacity,
+               'adaptive_workers': self.adaptive_workers,
                'os': platform.system(),
                'hostname': platform.node(),
                'dir': os.getcwd(),
                'cpu_count': psutil.cpu_count(logical=False),
                'total_memory': psutil.virtual_memory().total,
+               'function_store_size': self.function_store.maxsize,
         }
         b_msg = json.dumps(msg).encode('utf-8')
         return b_msg
 
+    def create_capacity_message(self):
+        """ Creates a heartbeat message for the results connection, which also
+        reports the current worker capacity of this manager to the interchange
+        """
+        return pickle.dumps({'type': 'heartbeat',
+                             'worker_count': self.worker_count,
+                             'max_capacity': self.worker_count + self.prefetch_capacity,
+                             'result_batch_stats': self.result_batcher.stats})
+
     def heartbeat_to_incoming(self):
         """ Send heartbeat to the incoming task queue
         """
@@ -296,8 +498,8 @@ class Manager:
 
             if self.task_incoming in socks and socks[self.task_incoming] == zmq.POLLIN:
                 poll_timer = 0
-                _, pkl_msg = self.task_incoming.recv_multipart()
-                tasks = pickle.loads(pkl_msg)
+                _, pkl_msg, *frames = self.task_incoming.recv_multipart(copy=False)
+                tasks = pickle.loads(pkl_msg.bytes)
                 last_interchange_contact = time.time()
 
                 if tasks == 'STOP':
@@ -312,7 +514,19 @@ class Manager:
                     task_recv_counter += len(tasks)
                     logger.debug("Got executor tasks: {}, cumulative count of tasks: {}".format([t['task_id'] for t in tasks], task_recv_counter))
 
+                    # Copy the out-of-band buffers of each task into writable
+                    # buffers, so that arrays built on them are writable
+                    frame_iter = iter([bytearray(frame.buffer) for frame in frames])
                     for task in tasks:
+                        task['frames'] = [next(frame_iter) for _ in range(task.pop('n_frames', 0))]
+                        if 'function' in task:
+                            # The interchange sends a function only if the store does not have it
+                            digest, payload = task['function']
+                            if payload is None:
+                                payload = self.function_store.get(digest)
+                            else:
+                                self.function_store.put(digest, payload)
+                            task['function'] = (digest, payload)
                         if self.expand_at is not None:
                             # when manager pulls this many tasks, start expand
                             if(int(task['task_id']) == self.expand_at):
@@ -350,48 +564,52 @@ class Manager:
 
         logger.debug("Starting result push thread")
 
-        push_poll_period = max(10, self.poll_period) / 1000    # push_poll_period must be atleast 10 ms
-        logger.debug("push poll period: {}".format(push_poll_period))
-
-        last_beat = time.time()
+        batcher = self.result_batcher
         last_result_beat = time.time()
-        items = []
 
         while not kill_event.is_set():
+            # Block until a result arrives, or until the pending batch or the
+            # heartbeat is due
+            timeout = last_result_beat + self.heartbeat_period - time.time()
+            batch_timeout = batcher.time_to_flush(time.time())
+            if batch_timeout is not None:
+                timeout = min(timeout, batch_timeout)
+
             try:
-                logger.debug("Starting pending_result_queue get")
-                r = self.pending_result_queue.get(block=True, timeout=push_poll_period)
+                r = self.pending_result_queue.get(block=True, timeout=max(timeout, 0))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logger.exception("Got an exception: {}".format(e))
+            else:
+                if r is None:
+                    # Woken up to notice kill_event
+                    continue
 
                 if self.expand_at is not None:
                     # check if expanding task done and clear expand flag to let other workers work
-                    if  expand_event.is_set():
+                    if expand_event.is_set():
                         result_after_expand = pickle.loads(r)
-                        if(int(result_after_expand['task_id']) == self.expand_at):
+                        if result_after_expand.get('task_id') == self.expand_at:
                             expand_event.clear()
 
-                logger.debug("Got a result item")
-                items.append(r)
-            except queue.Empty:
-                logger.debug("pending_result_queue get timeout without result item")
-            except Exception as e:
-                logger.exception("Got an exception: {}".format(e))
+                batcher.add(r, time.time())
+
+            batcher.max_items = self.max_queue_size
 
             if time.time() > last_result_beat + self.heartbeat_period:
-                logger.info(f"Sending heartbeat via results connection: last_result_beat={last_result_beat} heartbeat_period={self.heartbeat_period} seconds")
                 last_result_beat = time.time()
-                items.append(pickle.dumps({'type': 'heartbeat'}))
-
-            if len(items) >= self.max_queue_size or time.time() > last_beat + push_poll_period:
-                last_beat = time.time()
-                if items:
-                    logger.debug(f"Result send: Pushing {len(items)} items")
-                    self.result_outgoing.send_multipart(items)
-                    logger.debug("Result send: Pushed")
-                    items = []
-                else:
-                    logger.debug("Result send: No items to push")
-            else:
-                logger.debug(f"Result send: check condition not met - deferring {len(items)} result items")
+                logger.info("Sending heartbeat via results connection, result batching stats: {}".format(batcher.stats))
+                items = batcher.take('heartbeat')
+                items.append(self.create_capacity_message())
+                self.result_outgoing.send_multipart(items)
+                continue
+
+            reason = batcher.flush_reason(time.time())
+            if reason:
+                items = batcher.take(reason)
+                logger.debug("Result send: Pushing {} items, flush reason {}".format(len(items), reason))
+                self.result_outgoing.send_multipart(items)
 
         logger.critical("Exiting")
 
@@ -413,11 +631,26 @@ class Manager:
             # self.procs may get modified while expanding, so use a copy
             for worker_id, p in self.procs.copy().items():
                 if not p.is_alive():
+                    with self._retiring_lock:
+                        retired = self._retiring_workers > 0 and getattr(p, 'exitcode', None) == 0
+                        if retired:
+                            self._retiring_workers -= 1
+                    if retired:
+                        logger.info("Worker {} has exited after being retired".format(worker_id))
+                        self._remove_worker_cgroup(worker_id)
+                        del self.procs[worker_id]
+                        continue
+
                     logger.error("Worker {} has died".format(worker_id))
+                    oom_killed = self._worker_oom_killed(worker_id, p)
+                    if oom_killed:
+                        logger.error("Worker {} was killed for running out of memory".format(worker_id))
                     try:
                         task = self._tasks_in_progress.pop(worker_id)
                         logger.info("Worker {} was busy when it died".format(worker_id))
                         try:
+                            if oom_killed:
+                                raise WorkerOOMKilled(worker_id, platform.node(), self.worker_mem_limit)
                             raise WorkerLost(worker_id, platform.node())
                         except Exception:
                             logger.info("Putting exception for executor task {} in the pending result queue".format(task['task_id']))
@@ -427,22 +660,186 @@ class Manager:
                     except KeyError:
                         logger.info("Worker {} was not busy when it died".format(worker_id))
 
-                    p = self.mpProcess(target=worker, args=(worker_id,
-                                                            self.uid,
-                                                            self.worker_count,
-                                                            self.pending_task_queue,
-                                                            self.pending_result_queue,
-                                                            self.ready_worker_queue,
-                                                            self._tasks_in_progress,
-                                                            self.cpu_affinity,
-                                                            expand_event),
-                                       name="HTEX-Worker-{}".format(worker_id))
-                    self.procs[worker_id] = p
+                    self._start_worker(worker_id, expand_event)
                     logger.info("Worker {} has been restarted".format(worker_id))
                 time.sleep(self.heartbeat_period)
 
         logger.critical("Exiting")
 
+    def _worker_cgroup(self, worker_id):
+        """ The cgroup directory which limits the memory of a worker, or None if
+        worker memory is not limited with cgroups
+        """
+        if self.worker_cgroup_parent is None:
+            return None
+        return os.path.join(self.worker_cgroup_parent, "parsl-{}-worker-{}".format(self.uid, worker_id))
+
+    def _remove_worker_cgroup(self, worker_id):
+        """ Remove the cgroup of a worker which has exited, if it has one
+        """
+        cgroup = self._worker_cgroup(worker_id)
+        if cgroup is None:
+            return
+        try:
+            os.rmdir(cgroup)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove cgroup {} of worker {}".format(cgroup, worker_id))
+
+    def _worker_oom_killed(self, worker_id, p):
+        """ Determine whether a dead worker was killed by the kernel OOM killer
+
+        A worker in its own cgroup was OOM killed if the cgroup recorded an OOM
+        kill. The cgroup is removed so that a restarted worker starts afresh.
+        Otherwise, a worker killed by SIGKILL is assumed to have been OOM
+        killed if the node has recorded an OOM kill which has not already been
+        attributed to another worker.
+        """
+        cgroup = self._worker_cgroup(worker_id)
+        if cgroup is not None:
+            oom_kills = read_oom_kill_count(os.path.join(cgroup, "memory.events"))
+            self._remove_worker_cgroup(worker_id)
+            if oom_kills:
+                return True
+
+        if getattr(p, 'exitcode', None) != -signal.SIGKILL:
+            return False
+        node_oom_kills = read_oom_kill_count()
+        if node_oom_kills is None or self._node_oom_kills is None:
+            return False
+        if node_oom_kills > self._node_oom_kills:
+            self._node_oom_kills += 1
+            return True
+        return False
+
+    def _worker_accelerator(self, worker_id):
+        """ The accelerator to which a worker is pinned, or None
+        """
+        if self.accelerators_available and worker_id < len(self.available_accelerators):
+            return self.available_accelerators[worker_id]
+        return None
+
+    def _start_worker(self, worker_id, expand_event):
+        """ Start a single worker process with the given worker_id
+        """
+        p = self.mpProcess(target=worker, args=(worker_id,
+                                                self.uid,
+                                                self.worker_count,
+                                                self.pending_task_queue,
+                                                self.pending_result_queue,
+                                                self.ready_worker_queue,
+                                                self._tasks_in_progress,
+                                                self.cpu_affinity,
+                                                expand_event,
+                                                self._worker_accelerator(worker_id),
+                                                self.worker_mem_limit,
+                                                self._worker_cgroup(worker_id),
+                                                self.compression,
+                                                self.compression_threshold,
+                                                self.result_proxy_dir,
+                                                self.result_proxy_threshold),
+                           name="HTEX-Worker-{}".format(worker_id))
+        p.start()
+        self.procs[worker_id] = p
+        return p
+
+    def _sample_workers(self, samplers):
+        """ Sample CPU and memory use of the worker processes and any processes
+        they have launched.
+
+        Parameters:
+        -----------
+        samplers : dict
+              psutil.Process objects keyed by pid, kept between calls so that
+              cpu_percent measures the use since the previous sample.
+
+        Returns:
+        --------
+        (mean fraction of a core used by each busy worker, mean RSS in bytes per worker)
+        """
+        busy_workers = set(self._tasks_in_progress.keys())
+        busy_cpu = []
+        rss = []
+        seen = set()
+        for worker_id, p in self.procs.copy().items():
+            try:
+                worker_proc = samplers.setdefault(p.pid, psutil.Process(p.pid))
+                procs = [worker_proc] + [samplers.setdefault(c.pid, c) for c in worker_proc.children(recursive=True)]
+                cpu = 0.0
+                mem = 0
+                for proc in procs:
+                    seen.add(proc.pid)
+                    cpu += proc.cpu_percent() / 100
+                    mem += proc.memory_info().rss
+            except psutil.Error:
+                # The worker or one of its children exited while being sampled
+                continue
+            rss.append(mem)
+            if worker_id in busy_workers:
+                busy_cpu.append(cpu)
+
+        for pid in list(samplers):
+            if pid not in seen:
+                del samplers[pid]
+
+        mean_cpu = sum(busy_cpu) / len(busy_cpu) if busy_cpu else None
+        mean_rss = sum(rss) / len(rss) if rss else 0
+        return mean_cpu, mean_rss
+
+    @wrap_with_logs
+    def worker_scaler(self, kill_event, expand_event):
+        """Adjusts the number of workers to the observed CPU and memory use of tasks.
+
+        Parameters:
+        -----------
+        kill_event : threading.Event
+              Event to let the thread know when it is time to die.
+        expand_event : threading.Event
+              Event passed on to workers started by this thread.
+        """
+        logger.debug("Starting worker scaler")
+        samplers = {}
+
+        while not kill_event.wait(self.adaptive_period):
+            mean_cpu, mean_rss = self._sample_workers(samplers)
+            if self.mem_per_worker:
+                mem_per_worker = self.mem_per_worker * 2**30
+            else:
+                mem_per_worker = mean_rss
+            saturated = len(self._tasks_in_progress) >= self.worker_count
+
+            target = adaptive_worker_target(self.worker_count,
+                                            self.min_worker_count,
+                                            self.max_worker_count,
+                                            mean_cpu,
+                                            self.cores_per_worker * self.adaptive_cpu_threshold,
+                                            saturated,
+                                            psutil.virtual_memory().available,
+                                            mem_per_worker)
+            logger.debug("Worker scaler sample: workers={} busy cpu={} rss={} saturated={} target={}".format(
+                self.worker_count, mean_cpu, mean_rss, saturated, target))
+
+            if target > self.worker_count:
+                worker_id = max(self.procs, default=-1) + 1
+                self.worker_count = target
+                self._start_worker(worker_id, expand_event)
+                logger.info("Started worker {}, worker count is now {}".format(worker_id, self.worker_count))
+            elif target < self.worker_count:
+                with self._retiring_lock:
+                    self._retiring_workers += 1
+                self.worker_count = target
+                # Whichever worker picks up this request next will exit
+                self.pending_task_queue.put(None)
+                logger.info("Retiring a worker, worker count is now {}".format(self.worker_count))
+            else:
+                continue
+
+            self.max_queue_size = self.prefetch_capacity + self.worker_count
+            self.pending_result_queue.put(self.create_capacity_message())
+
+        logger.critical("Exiting")
+
     @wrap_with_logs
     def worker_expand(self, kill_event, expand_event):
         """Increase number of workers.
@@ -461,19 +858,7 @@ class Manager:
                 worker_add_count = int(os.environ['EXPAND_BY'])
                 self.worker_count += worker_add_count
                 for id in range(worker_add_count):
-                    p = self.mpProcess(target=worker, args=(self.worker_count-1+id,
-                                                                    self.uid,
-                                                                    self.worker_count,
-                                                                    self.pending_task_queue,
-                                                                    self.pending_result_queue,
-                                                                    self.ready_worker_queue,
-                                                                    self._tasks_in_progress,
-                                                                    self.cpu_affinity,
-                                                                    expand_event,
-                                                                    None),
-                                            name="HTEX-Worker-{}".format(self.worker_count-1+id))
-                    p.start()
-                    self.procs[self.worker_count-1+id] = p
+                    self._start_worker(self.worker_count-1+id, expand_event)
                     logger.info("Worker {} has been started".format(self.worker_count-1+id))
                     # wait for expand event to clear after forking the worker
                 while(expand_event.is_set()):
@@ -532,20 +917,7 @@ class Manager:
 
         self.procs = {}
         for worker_id in range(self.worker_count):
-            p = self.mpProcess(target=worker,
-                               args=(worker_id,
-                                     self.uid,
-                                     self.worker_count,
-                                     self.pending_task_queue,
-                                     self.pending_result_queue,
-                                     self.ready_worker_queue,
-                                     self._tasks_in_progress,
-                                     self.cpu_affinity,
-                                     self._expand_event,
-                                     self.available_accelerators[worker_id] if self.accelerators_available else None),
-                               name="HTEX-Worker-{}".format(worker_id))
-            p.start()
-            self.procs[worker_id] = p
+            self._start_worker(worker_id, self._expand_event)
 
         logger.debug("Workers started")
 
@@ -562,9 +934,15 @@ class Manager:
             self._worker_expand_thread = threading.Thread(target=self.worker_expand,
                                                             args=(self._kill_event, self._expand_event),
                                                             name="worker-expand")
+        if self.adaptive_workers:
+            self._worker_scaler_thread = threading.Thread(target=self.worker_scaler,
+                                                          args=(self._kill_event, self._expand_event),
+                                                          name="worker-scaler")
         self._task_puller_thread.start()
         self._result_pusher_thread.start()
         self._worker_watchdog_thread.start()
+        if self.adaptive_workers:
+            self._worker_scaler_thread.start()
         if self.expand_at is not None:
             self._worker_expand_thread.start()
 
@@ -579,6 +957,9 @@ class Manager:
         self._kill_event.wait()
         logger.critical("Received kill event, terminating worker pool")
 
+        # Wake up the result pusher, which blocks on the result queue
+        self.pending_result_queue.put(None)
+
         self._task_puller_thread.join()
         self._result_pusher_thread.join()
         self._worker_watchdog_thread.join()
@@ -586,6 +967,9 @@ class Manager:
         if self.expand_at is not None:
             self._worker_expand_thread.join()
 
+        if self.adaptive_workers:
+            self._worker_scaler_thread.join()
+
         for proc_id in self.procs:
             self.procs[proc_id].terminate()
             logger.critical("Terminating worker {}: is_alive()={}".format(self.procs[proc_id],
@@ -603,15 +987,132 @@ class Manager:
         return
 
 
-def execute_task(bufs):
-    """Deserialize the buffer and execute the task.
+def read_oom_kill_count(path="/proc/vmstat"):
+    """ Read the number of processes killed by the kernel OOM killer
+
+    Parameters
+    ----------
+    path : str
+        Either /proc/vmstat, for the count across the node, or the memory.events
+        file of a cgroup v2, for the count within that cgroup.
+
+    Returns the count, or None if it is not available.
+    """
+    try:
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) == 2 and fields[0] == "oom_kill":
+                    return int(fields[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def find_delegated_cgroup(cgroup_root="/sys/fs/cgroup", proc_cgroup="/proc/self/cgroup"):
+    """ Find the cgroup v2 of this process, if it delegates the memory
+    controller to child cgroups which this process may create
+
+    Returns the cgroup directory, or None if worker memory cannot be limited with cgroups.
+    """
+    try:
+        with open(proc_cgroup) as f:
+            entries = [line.strip().split(":", 2) for line in f]
+    except OSError:
+        return None
+
+    # cgroup v2 has a single hierarchy with id 0
+    paths = [entry[2] for entry in entries if len(entry) == 3 and entry[0] == "0" and entry[1] == ""]
+    if not paths:
+        return None
+    cgroup = os.path.join(cgroup_root, paths[0].lstrip("/"))
+
+    try:
+        with open(os.path.join(cgroup, "cgroup.subtree_control")) as f:
+            controllers = f.read().split()
+    except OSError:
+        return None
+    if "memory" not in controllers or not os.access(cgroup, os.W_OK):
+        return None
+    return cgroup
+
+
+def limit_worker_memory(mem_limit, cgroup=None):
+    """ Limit the memory of the calling process, and the processes it launches
+
+    Parameters
+    ----------
+    mem_limit : int
+        Memory limit in bytes
+    cgroup : str
+        Directory of a cgroup v2 to create for the process, or None to use RLIMIT_AS
+
+    Returns the mechanism used: "cgroup" or "rlimit".
+    """
+    if cgroup is not None:
+        try:
+            os.makedirs(cgroup, exist_ok=True)
+            with open(os.path.join(cgroup, "memory.max"), "w") as f:
+                f.write(str(mem_limit))
+            with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+                f.write(str(os.getpid()))
+            return "cgroup"
+        except OSError:
+            logger.warning("Could not limit memory with cgroup {}, falling back to RLIMIT_AS".format(cgroup), exc_info=True)
+
+    resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit))
+    return "rlimit"
+
+
+def adaptive_worker_target(worker_count, min_workers, max_workers,
+                           busy_cpu, cpu_threshold, saturated,
+                           mem_available, mem_per_worker):
+    """Choose the number of workers an adaptive manager should run next.
+
+    The count changes by at most one worker per call. A worker is retired when
+    free memory on the node drops below half of the memory used by a worker, and
+    a worker is added when every worker is busy, the busy workers use less than
+    ``cpu_threshold`` cores each and there is room in memory for at least two
+    more workers.
+
+    Parameters
+    ----------
+    worker_count : int
+        Current number of workers
+    min_workers, max_workers : int
+        Bounds on the returned count
+    busy_cpu : float or None
+        Mean number of cores used by each busy worker, or None if no worker is busy
+    cpu_threshold : float
+        Number of cores per busy worker under which the node is considered underused
+    saturated : bool
+        Whether every worker is busy with a task
+    mem_available : int
+        Bytes of memory available on the node
+    mem_per_worker : float
+        Bytes of memory a worker is expected to use
+    """
+    if worker_count > min_workers and mem_available < 0.5 * mem_per_worker:
+        return worker_count - 1
+    if (worker_count < max_workers and saturated and
+            busy_cpu is not None and busy_cpu < cpu_threshold and
+            mem_available > 2 * mem_per_worker):
+        return worker_count + 1
+    return min(max(worker_count, min_workers), max_workers)
+
+
+def execute_task(bufs, frames=None, function=None):
+    """Deserialize the buffer and execute the task, whose large buffers may
+    have been sent separately as frames, and whose function may have been
+    sent separately as a (digest, serialized function) pair.
 
     Returns the result or throws exception.
     """
     user_ns = locals()
     user_ns.update({'__builtins__': __builtins__})
 
-    f, args, kwargs = unpack_apply_message(bufs, user_ns, copy=False)
+    functions = {function[0]: function[1]} if function and function[1] is not None else None
+    f, args, kwargs = unpack_apply_message(bufs, user_ns, copy=False, buffers=frames, functions=functions)
 
     # We might need to look into callability of the function from itself
     # since we change it's name in the new namespace
@@ -633,7 +1134,10 @@ def execute_task(bufs):
 
 
 @wrap_with_logs(target="worker_log")
-def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress, cpu_affinity, expand_event, accelerator: Optional[str]):
+def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue, tasks_in_progress, cpu_affinity, expand_event, accelerator: Optional[str],
+           mem_limit: Optional[int] = None, cgroup: Optional[str] = None,
+           compression: Optional[str] = None, compression_threshold: int = 2 ** 14,
+           result_proxy_dir: Optional[str] = None, result_proxy_threshold: int = 2 ** 27):
     """
 
     Put request token into queue
@@ -664,6 +1168,13 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
     if args.debug:
         logger.debug("Debug logging enabled")
 
+    # If desired, limit the memory of this worker and the processes it launches
+    if mem_limit is not None:
+        mechanism = limit_worker_memory(mem_limit, cgroup)
+        logger.info("Limited worker memory to {} bytes using {}".format(mem_limit, mechanism))
+
+    compressor = None if compression is None else get_compressor(compression)
+
     # If desired, set process affinity
     if cpu_affinity != "none":
         # Count the number of cores per worker
@@ -672,7 +1183,10 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
         assert cores_per_worker > 0, "Affinity does not work if there are more workers than cores"
 
         # Determine this worker's cores
-        if cpu_affinity == "block":
+        numa_node = None
+        if cpu_affinity == "numa":
+            numa_node, my_cores = numa_cores_for_worker(worker_id, pool_size, get_numa_nodes(avail_cores))
+        elif cpu_affinity == "block":
             my_cores = avail_cores[cores_per_worker * worker_id:cores_per_worker * (worker_id + 1)]
         elif cpu_affinity == "block-reverse":
             cpu_worker_id = pool_size - worker_id - 1  # To assign in reverse order
@@ -689,6 +1203,13 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
         os.environ["GOMP_CPU_AFFINITY"] = proc_list  # Compatible with GCC OpenMP
         os.environ["KMP_AFFINITY"] = f"explicit,proclist=[{proc_list}]"  # For Intel OpenMP
 
+        # Keep OpenMP threads, and the memory they touch first, on this worker's NUMA node
+        if numa_node is not None:
+            os.environ["PARSL_NUMA_NODE"] = str(numa_node)
+            os.environ["OMP_PLACES"] = ",".join("{{{}}}".format(c) for c in my_cores)
+            os.environ["OMP_PROC_BIND"] = "close"
+            logger.info("Assigned worker to NUMA node {}".format(numa_node))
+
         # Set the affinity for this worker
         os.sched_setaffinity(0, my_cores)
         logger.info("Set worker CPU affinity to {}".format(my_cores))
@@ -710,9 +1231,17 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
         else:
             worker_queue.put(worker_id)
 
-            # The worker will receive {'task_id':<tid>, 'buffer':<buf>}
+            # The worker will receive {'task_id':<tid>, 'buffer':<buf>}, or
+            # None when the manager is retiring a worker
             req = task_queue.get()
-            tasks_in_progress[worker_id] = req
+            if req is None:
+                worker_queue.get()
+                logger.info("Worker {} retired by manager".format(worker_id))
+                return
+
+            # Only the task id is needed by the manager, so do not copy the
+            # task's buffers to it
+            tasks_in_progress[worker_id] = {'task_id': req['task_id']}
             tid = req['task_id']
 
             if os.environ.get("EXPAND_AT"):
@@ -731,8 +1260,14 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
                 pass
 
             try:
-                result = execute_task(req['buffer'])
-                serialized_result = serialize(result, buffer_threshold=1000000)
+                result = execute_task(req['buffer'], req.get('frames'), req.get('function'))
+                if result_proxy_dir is not None:
+                    name = "result-{}-{}".format(tid, uuid.uuid4().hex)
+                    serialized_result = serialize_result(result, result_proxy_dir, result_proxy_threshold, name)
+                else:
+                    serialized_result = serialize(result, buffer_threshold=1000000)
+                if compressor is not None:
+                    serialized_result = compress(serialized_result, compressor, compression_threshold)
             except Exception as e:
                 logger.info('Caught an exception: {}'.format(e))
                 result_package = {'type': 'result', 'task_id': tid, 'exception': serialize(RemoteExceptionWrapper(*sys.exc_info()))}
@@ -754,6 +1289,68 @@ def worker(worker_id, pool_id, pool_size, task_queue, result_queue, worker_queue
             logger.info("All processing finished for executor task {}".format(tid))
 
 
+def parse_cpulist(cpulist: str) -> List[int]:
+    """Parse a Linux CPU list such as ``0-3,8-11`` into a list of CPU ids"""
+    cpus: List[int] = []
+    for item in cpulist.strip().split(','):
+        if not item:
+            continue
+        if '-' in item:
+            first, last = item.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(item))
+    return cpus
+
+
+def get_numa_nodes(avail_cores: Sequence[int], sysfs_path: str = "/sys/devices/system/node") -> Dict[int, List[int]]:
+    """Map each NUMA node with available cores to the sorted list of those cores.
+
+    Reads the node topology from sysfs. If the topology cannot be read, all
+    available cores are reported as a single node 0.
+    """
+    avail = set(avail_cores)
+    nodes: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir(sysfs_path)
+    except OSError:
+        entries = []
+    for entry in entries:
+        if not (entry.startswith("node") and entry[4:].isdigit()):
+            continue
+        try:
+            with open(os.path.join(sysfs_path, entry, "cpulist")) as f:
+                cpus = parse_cpulist(f.read())
+        except OSError:
+            continue
+        node_cores = sorted(avail.intersection(cpus))
+        if node_cores:
+            nodes[int(entry[4:])] = node_cores
+
+    if not nodes:
+        nodes = {0: sorted(avail)}
+    return nodes
+
+
+def numa_cores_for_worker(worker_id: int, pool_size: int, nodes: Dict[int, List[int]]) -> Tuple[int, List[int]]:
+    """Choose the NUMA node and cores for a worker.
+
+    Workers are assigned to NUMA nodes round-robin, and the cores of each node
+    are split into equal blocks among the workers assigned to it, so that no
+    worker spans more than one node.
+    """
+    node_ids = sorted(nodes)
+    node_index = worker_id % len(node_ids)
+    node = node_ids[node_index]
+    workers_on_node = len(range(node_index, pool_size, len(node_ids)))
+    rank_on_node = worker_id // len(node_ids)
+
+    cores = nodes[node]
+    cores_per_worker = len(cores) // workers_on_node
+    assert cores_per_worker > 0, "NUMA affinity does not work if there are more workers than cores on a NUMA node"
+    return node, cores[cores_per_worker * rank_on_node:cores_per_worker * (rank_on_node + 1)]
+
+
 def start_file_logger(filename, rank, name='parsl', level=logging.DEBUG, format_string=None):
     """Add a stream log handler.
 
@@ -814,12 +1411,32 @@ if __name__ == "__main__":
                         help="Poll period used in milliseconds")
     parser.add_argument("-r", "--result_port", required=True,
                         help="REQUIRED: Result port for posting results to the interchange")
-    parser.add_argument("--cpu-affinity", type=str, choices=["none", "block", "alternating", "block-reverse"],
+    parser.add_argument("--cpu-affinity", type=str, choices=["none", "block", "alternating", "block-reverse", "numa"],
                         help="Whether/how workers should control CPU affinity.")
     parser.add_argument("--available-accelerators", type=str, nargs="*",
                         help="Names of available accelerators")
     parser.add_argument("--start-method", type=str, choices=["fork", "spawn", "thread"], default="fork",
                         help="Method used to start new worker processes")
+    parser.add_argument("--result_batch_bytes", default=2 ** 20,
+                        help="Size in bytes at which a batch of results is sent without waiting. Default: 1MB")
+    parser.add_argument("--result_batch_latency", default=None,
+                        help="Longest time in milliseconds a result waits to be batched. Default: poll period, at least 10ms")
+    parser.add_argument("--enforce_mem_per_worker", action='store_true',
+                        help="Limit each worker to mem_per_worker GB of memory")
+    parser.add_argument("--compression", default=None,
+                        help="Compression to apply to large results: zlib, lz4 or zstd. Default: None")
+    parser.add_argument("--compression_threshold", default=2 ** 14,
+                        help="Size in bytes from which results are compressed. Default: 16KB")
+    parser.add_argument("--result_proxy_dir", default=None,
+                        help="Shared directory to which large results are written instead of being sent back")
+    parser.add_argument("--result_proxy_threshold", default=2 ** 27,
+                        help="Size in bytes from which results are written to --result_proxy_dir. Default: 128MB")
+    parser.add_argument("--adaptive-workers", action='store_true',
+                        help="Grow or shrink the worker pool based on observed worker utilisation")
+    parser.add_argument("--min_workers", default=1,
+                        help="Lower bound on the number of workers with --adaptive-workers. Default: 1")
+    parser.add_argument("--adaptive_period", default=10,
+                        help="Seconds between worker utilisation samples with --adaptive-workers. Default: 10")
 
     args = parser.parse_args()
 
@@ -849,6 +1466,7 @@ if __name__ == "__main__":
         logger.info("CPU affinity: {}".format(args.cpu_affinity))
         logger.info("Accelerators: {}".format(" ".join(args.available_accelerators)))
         logger.info("Start method: {}".format(args.start_method))
+        logger.info("Adaptive workers: {}".format(args.adaptive_workers))
 
         manager = Manager(task_port=args.task_port,
                           result_port=args.result_port,
@@ -864,7 +1482,17 @@ if __name__ == "__main__":
                           heartbeat_period=int(args.hb_period),
                           poll_period=int(args.poll),
                           cpu_affinity=args.cpu_affinity,
-                          available_accelerators=args.available_accelerators)
+                          available_accelerators=args.available_accelerators,
+                          adaptive_workers=args.adaptive_workers,
+                          min_workers=int(args.min_workers),
+                          adaptive_period=float(args.adaptive_period),
+                          enforce_mem_per_worker=args.enforce_mem_per_worker,
+                          compression=args.compression,
+                          compression_threshold=int(args.compression_threshold),
+                          result_proxy_dir=args.result_proxy_dir,
+                          result_proxy_threshold=int(args.result_proxy_threshold),
+                          result_batch_bytes=int(args.result_batch_bytes),
+                          result_batch_latency=None if args.result_batch_latency is None else float(args.result_batch_latency))
         manager.start()
 
     except Exception:
@@ -2,6 +2,7 @@
 
 import zmq
 import logging
+import pickle
 import threading
 
 logger = logging.getLogger(__name__)
@@ -101,21 +102,48 @@ class TasksOutgoing:
         self.poller = zmq.Poller()
         self.poller.register(self.zmq_socket, zmq.POLLOUT)
 
-    def put(self, message):
+    def put(self, message, frames=()):
         """ This function needs to be fast at the same time aware of the possibility of
         ZMQ pipes overflowing.
 
+        Any frames, such as the out-of-band buffers of a task, are sent as further
+        parts of the same ZMQ message, rather than being pickled with the message.
+
         The timeout increases slowly if contention is detected on ZMQ pipes.
         We could set copy=False and get slightly better latency but this results
         in ZMQ sockets reaching a broken state once there are ~10k tasks in flight.
         This issue can be magnified if each the serialized buffer itself is larger.
         """
+        self._send([pickle.dumps(message), *frames])
+
+    def put_batch(self, messages):
+        """ Send many messages, each with its own frames, as a single ZMQ message
+
+        Parameters
+        ----------
+
+        messages: list of (message, frames) tuples
+           The messages are sent as one pickled list, in which each message
+           records its number of frames as 'n_frames', followed by the frames of
+           all the messages in order.
+        """
+        batch = []
+        all_frames = []
+        for message, frames in messages:
+            message['n_frames'] = len(frames)
+            batch.append(message)
+            all_frames.extend(frames)
+        self._send([pickle.dumps(batch), *all_frames])
+
+    def _send(self, parts):
         timeout_ms = 1
         while True:
             socks = dict(self.poller.poll(timeout=timeout_ms))
             if self.zmq_socket in socks and socks[self.zmq_socket] == zmq.POLLOUT:
-                # The copy option adds latency but reduces the risk of ZMQ overflow
-                self.zmq_socket.send_pyobj(message, copy=True)
+                # The copy option adds latency but reduces the risk of ZMQ overflow.
+                # Copying the frames also means that the task sees its arguments as
+                # they were when it was submitted.
+                self.zmq_socket.send_multipart(parts, copy=True)
                 return
             else:
                 timeout_ms *= 2
@@ -228,6 +228,7 @@ class TaskVineExecutor(BlockProviderExecutor, putils.RepresentationMixin):
     """
 
     radio_mode = "filesystem"
+    supports_priority = True
 
     @typeguard.typechecked
     def __init__(self,
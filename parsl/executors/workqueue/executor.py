@@ -213,6 +213,7 @@ class WorkQueueExecutor(BlockProviderExecutor, putils.RepresentationMixin):
     """
 
     radio_mode = "filesystem"
+    supports_priority = True
 
     @typeguard.typechecked
     def __init__(self,
@@ -19,6 +19,7 @@ from parsl.utils import setproctitle
 from parsl.serialize import deserialize
 
 from parsl.monitoring.message_type import MessageType
+from parsl.monitoring.task_info import task_info_message
 from parsl.monitoring.types import AddressedMonitoringMessage, TaggedMonitoringMessage
 from typing import cast, Any, Callable, Dict, Optional, Sequence, Union
 
@@ -459,7 +460,8 @@ class MonitoringRouter:
                         elif msg[0] == MessageType.BLOCK_INFO:
                             block_msgs.put(msg_0)
                         elif msg[0] == MessageType.TASK_INFO:
-                            priority_msgs.put(msg_0)
+                            # the DFK sends a compact tuple, expanded here out of its way
+                            priority_msgs.put(((MessageType.TASK_INFO, task_info_message(self.run_id, cast(Tuple[Any, ...], msg[1]))), 0))
                         elif msg[0] == MessageType.WORKFLOW_INFO:
                             priority_msgs.put(msg_0)
                             if 'exit_now' in msg[1] and msg[1]['exit_now']:
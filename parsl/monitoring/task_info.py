@@ -0,0 +1,71 @@
+"""Compact task information messages
+
+The DataFlowKernel sends a TASK_INFO message each time a task changes state.
+To keep the work done in the DFK's callback threads small, it sends a tuple
+of the raw values of the task's fields, in the order of TASK_INFO_FIELDS,
+and the monitoring router expands that into the message dictionary which is
+recorded in the database.
+
+Fields which the database only records when a task is first seen (its
+inputs, outputs, standard streams and dependencies) are only formatted for
+the first message about each task, and are None in later messages.
+"""
+import logging
+
+from typing import Any, Optional, Sequence, Tuple
+
+from parsl.monitoring.types import MonitoringMessage
+from parsl.utils import get_std_fname_mode
+
+logger = logging.getLogger(__name__)
+
+TASK_INFO_FIELDS = ('task_id', 'try_id', 'task_status', 'timestamp',
+                    'task_func_name', 'task_memoize', 'task_hashsum',
+                    'task_fail_count', 'task_fail_cost', 'task_fail_history',
+                    'task_time_invoked', 'task_try_time_launched',
+                    'task_time_returned', 'task_try_time_returned',
+                    'task_executor', 'from_memo', 'task_joins',
+                    'tasks_failed_count', 'tasks_completed_count', 'tasks_memo_completed_count',
+                    'task_submission_info')
+
+# task_submission_info, when present, is a tuple of these fields
+TASK_SUBMISSION_FIELDS = ('task_inputs', 'task_outputs', 'task_stdin', 'task_stdout', 'task_stderr', 'task_depends')
+
+
+def _std_name(fdname: str, spec: Any, task_id: int) -> str:
+    try:
+        name, _ = get_std_fname_mode(fdname, spec)
+    except Exception as e:
+        logger.warning("Incorrect {} format {} for Task {}".format(fdname, spec, task_id))
+        name = str(e)
+    return name
+
+
+def _join_ids(ids: Optional[Sequence[int]]) -> Optional[str]:
+    if ids is None:
+        return None
+    return ",".join(str(i) for i in ids)
+
+
+def task_info_message(run_id: str, info: Tuple[Any, ...]) -> MonitoringMessage:
+    """Expand a task information tuple sent by the DataFlowKernel into the
+    message which is recorded in the database
+    """
+    msg = dict(zip(TASK_INFO_FIELDS, info))
+    msg['run_id'] = run_id
+    msg['task_status_name'] = msg['task_status'].name
+    msg['task_fail_history'] = ",".join(msg['task_fail_history'])
+    msg['task_joins'] = _join_ids(msg['task_joins'])
+
+    submission_info = msg.pop('task_submission_info')
+    if submission_info is None:
+        msg.update(dict.fromkeys(TASK_SUBMISSION_FIELDS))
+    else:
+        inputs, outputs, stdin, stdout_spec, stderr_spec, depends = submission_info
+        msg['task_inputs'] = inputs
+        msg['task_outputs'] = outputs
+        msg['task_stdin'] = stdin
+        msg['task_stdout'] = _std_name('stdout', stdout_spec, msg['task_id'])
+        msg['task_stderr'] = _std_name('stderr', stderr_spec, msg['task_id'])
+        msg['task_depends'] = _join_ids(depends)
+    return msg
@@ -1,6 +1,7 @@
-from parsl.serialize.facade import serialize, deserialize, pack_apply_message, unpack_apply_message
+from parsl.serialize.facade import serialize, deserialize, pack_apply_message, unpack_apply_message, register_method_for_type
 
 __all__ = ['serialize',
            'deserialize',
            'pack_apply_message',
-           'unpack_apply_message']
+           'unpack_apply_message',
+           'register_method_for_type']
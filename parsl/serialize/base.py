@@ -2,7 +2,7 @@ from abc import abstractmethod
 import logging
 import functools
 
-from typing import Any
+from typing import Any, Union
 
 logger = logging.getLogger(__name__)
 
@@ -42,18 +42,17 @@ class SerializerBase:
         """
         return self._identifier
 
-    def chomp(self, payload: bytes) -> bytes:
+    def chomp(self, payload: Union[bytes, memoryview]) -> Union[bytes, memoryview]:
         """ If the payload starts with the identifier, return the remaining block
 
         Parameters
         ----------
-        payload : str
-            Payload blob
+        payload : bytes or memoryview
+            Payload blob. A memoryview is sliced without copying the payload.
         """
-        s_id, payload = payload.split(b'\n', 1)
-        if (s_id + b'\n') != self.identifier:
+        if payload[:len(self.identifier)] != self.identifier:
             raise TypeError("Buffer does not start with parsl.serialize identifier:{!r}".format(self.identifier))
-        return payload
+        return payload[len(self.identifier):]
 
     def enable_caching(self, maxsize: int = 128) -> None:
         """ Add functools.lru_cache onto the serialize, deserialize methods
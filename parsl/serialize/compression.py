@@ -0,0 +1,159 @@
+import logging
+import threading
+import zlib
+from abc import ABCMeta, abstractmethod
+
+from typing import Any, Dict, List, Type, Union
+
+from parsl.errors import OptionalModuleMissing
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lz4.frame
+except ImportError:
+    _lz4_enabled = False
+else:
+    _lz4_enabled = True
+
+try:
+    import zstandard
+except ImportError:
+    _zstd_enabled = False
+else:
+    _zstd_enabled = True
+
+
+# GLOBALS
+COMPRESSORS_BY_NAME: Dict[str, Type['CompressorBase']] = {}
+COMPRESSORS_BY_HEADER: Dict[bytes, Type['CompressorBase']] = {}
+
+
+class CompressorBase(metaclass=ABCMeta):
+    """ Compresses serialized payloads
+
+    A compressed payload starts with the identifier of the compressor which
+    compressed it, in place of a serialization header, followed by the
+    compressed serialized payload.
+    """
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        """ This forces all child classes to register themselves, so that
+        payloads can be decompressed by their identifier
+        """
+        super().__init_subclass__(**kwargs)
+
+        assert len(cls._identifier) == 3
+
+        COMPRESSORS_BY_NAME[cls.name] = cls
+        COMPRESSORS_BY_HEADER[cls._identifier] = cls
+
+    _identifier: bytes
+    name: str
+
+    @property
+    def identifier(self) -> bytes:
+        return self._identifier
+
+    @abstractmethod
+    def compress(self, data: Union[bytes, memoryview]) -> bytes:
+        pass
+
+    @abstractmethod
+    def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+        pass
+
+
+class ZlibCompressor(CompressorBase):
+    """ zlib compression, from the standard library. The default level of 1
+    favours speed over compression ratio.
+    """
+
+    _identifier = b'z1\n'
+    name = 'zlib'
+
+    def __init__(self, level: int = 1) -> None:
+        self.level = level
+
+    def compress(self, data: Union[bytes, memoryview]) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+        return zlib.decompress(data)
+
+
+class LZ4Compressor(CompressorBase):
+    """ LZ4 frame compression, which requires the lz4 module. Much faster
+    than zlib, at a lower compression ratio.
+    """
+
+    _identifier = b'z2\n'
+    name = 'lz4'
+
+    def __init__(self, level: int = 0) -> None:
+        if not _lz4_enabled:
+            raise OptionalModuleMissing(['lz4'], "lz4 compression requires the lz4 module.")
+        self.level = level
+
+    def compress(self, data: Union[bytes, memoryview]) -> bytes:
+        return lz4.frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+        return lz4.frame.decompress(data)
+
+
+class ZstdCompressor(CompressorBase):
+    """ Zstandard compression, which requires the zstandard module
+
+    A zstandard compressor or decompressor must not be used by more than one
+    thread at a time, so each thread using this instance gets its own.
+    """
+
+    _identifier = b'z3\n'
+    name = 'zstd'
+
+    def __init__(self, level: int = 3) -> None:
+        if not _zstd_enabled:
+            raise OptionalModuleMissing(['zstandard'], "zstd compression requires the zstandard module.")
+        self.level = level
+        self._local = threading.local()
+
+    def compress(self, data: Union[bytes, memoryview]) -> bytes:
+        try:
+            compressor = self._local.compressor
+        except AttributeError:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(data)
+
+    def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+        try:
+            decompressor = self._local.decompressor
+        except AttributeError:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        # the content size is written into each frame by compress
+        return decompressor.decompress(data)
+
+
+def available_compressors() -> List[str]:
+    """ Names of the compressors whose modules can be imported """
+    available = ['zlib']
+    if _lz4_enabled:
+        available.append('lz4')
+    if _zstd_enabled:
+        available.append('zstd')
+    return available
+
+
+def get_compressor(name: str) -> CompressorBase:
+    """ Instantiate a compressor by name
+
+    Raises
+    ------
+    ValueError
+        If there is no compressor with that name
+    OptionalModuleMissing
+        If the module the compressor needs cannot be imported
+    """
+    if name not in COMPRESSORS_BY_NAME:
+        raise ValueError("Unknown compression {!r}, expected one of {}".format(name, sorted(COMPRESSORS_BY_NAME)))
+    return COMPRESSORS_BY_NAME[name]()
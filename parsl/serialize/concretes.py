@@ -1,11 +1,12 @@
 import dill
+import io
 import pickle
 import logging
 
 logger = logging.getLogger(__name__)
 from parsl.serialize.base import SerializerBase
 
-from typing import Any
+from typing import Any, Iterator, List, Optional, Union
 
 
 class PickleSerializer(SerializerBase):
@@ -55,3 +56,88 @@ class DillSerializer(SerializerBase):
         chomped = self.chomp(payload)
         data = dill.loads(chomped)
         return data
+
+
+class _OutOfBandBytes:
+    """ Stands in for a large bytes or bytearray object, which pickle would
+    otherwise always copy into the pickle stream, so that it is pickled through
+    a PickleBuffer
+    """
+    __slots__ = ('obj',)
+
+    def __init__(self, obj: Union[bytes, bytearray]) -> None:
+        self.obj = obj
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        return _restore_bytes, (type(self.obj), pickle.PickleBuffer(self.obj))
+
+
+def _restore_bytes(cls: type, buf: Any) -> Union[bytes, bytearray]:
+    if cls is bytearray and isinstance(buf, bytearray):
+        return buf
+    return cls(buf)
+
+
+class PickleOutOfBandSerializer(SerializerBase):
+    """ Pickle serialization using protocol 5, which leaves large contiguous buffers,
+    such as those of NumPy arrays, bytearrays and bytes objects, out of the pickle
+    stream so that they need not be copied into it. Large bytes and bytearray objects
+    are only left out of band when they are the data, or are items of the tuple, list
+    or dict being serialized.
+
+    The out-of-band buffers are appended to the ``buffers`` list passed to ``serialize``,
+    and the same buffers must be passed in the same order to ``deserialize``. Without a
+    ``buffers`` list, or before Python 3.8, everything is pickled in band.
+    """
+
+    _identifier = b'03\n'
+    _for_code = False
+    _for_data = True
+
+    # Buffers smaller than this are cheaper to copy into the pickle stream
+    out_of_band_threshold = 64 * 1024
+
+    def serialize(self, data: Any, buffers: Optional[List[memoryview]] = None) -> bytes:
+        f = io.BytesIO()
+        f.write(self.identifier)
+        if buffers is None or not hasattr(pickle, 'PickleBuffer'):
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            out_of_band = buffers
+
+            def buffer_callback(buf: pickle.PickleBuffer) -> bool:
+                try:
+                    raw = buf.raw()
+                except BufferError:
+                    return True
+                if raw.nbytes < self.out_of_band_threshold:
+                    return True
+                out_of_band.append(raw)
+                return False
+
+            pickle.dump(self._wrap_bytes(data), f, protocol=5, buffer_callback=buffer_callback)
+        return f.getvalue()
+
+    def _wrap_bytes(self, data: Any) -> Any:
+        """ Wrap large bytes and bytearray items of a tuple, list or dict, such as
+        the positional and keyword arguments of a task, for out-of-band pickling
+        """
+        def wrap(item: Any) -> Any:
+            if type(item) in (bytes, bytearray) and len(item) >= self.out_of_band_threshold:
+                return _OutOfBandBytes(item)
+            return item
+
+        if type(data) is tuple:
+            return tuple(wrap(item) for item in data)
+        elif type(data) is list:
+            return [wrap(item) for item in data]
+        elif type(data) is dict:
+            return {key: wrap(value) for key, value in data.items()}
+        return wrap(data)
+
+    def deserialize(self, payload: Union[bytes, memoryview],
+                    buffers: Optional[Iterator[Any]] = None) -> Any:
+        chomped = self.chomp(payload)
+        if buffers is None:
+            return pickle.loads(chomped)
+        return pickle.loads(chomped, buffers=buffers)
@@ -1,12 +1,29 @@
 from parsl.serialize.concretes import *  # noqa: F403,F401
 from parsl.serialize.base import METHODS_MAP_DATA, METHODS_MAP_CODE, SerializerBase
+from parsl.serialize.concretes import PickleOutOfBandSerializer
+from parsl.serialize.compression import COMPRESSORS_BY_HEADER, CompressorBase
+import hashlib
 import logging
+import struct
+import weakref
+from collections import OrderedDict
 
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union, cast
 
 logger = logging.getLogger(__name__)
 
 
+# Packed buffers start with this marker, followed by a little-endian uint32
+# count of buffers, a uint64 length for each buffer, and then the buffers.
+# The marker cannot start a buffer packed in the original format, which
+# starts with the ASCII decimal length of the first buffer.
+PACK_MARKER = b'\x00PB1'
+_COUNT = struct.Struct('<I')
+
+# Header of a payload which refers to a function by the digest of its
+# serialized form, instead of containing it
+FUNCTION_REFERENCE = b'04\n'
+
 """ Instantiate the appropriate classes
 """
 headers = list(METHODS_MAP_CODE.keys()) + list(METHODS_MAP_DATA.keys())
@@ -17,17 +34,106 @@ methods_for_data = {}
 
 for key in METHODS_MAP_CODE:
     methods_for_code[key] = METHODS_MAP_CODE[key]()
-    methods_for_code[key].enable_caching(maxsize=128)
 
 for key in METHODS_MAP_DATA:
     methods_for_data[key] = METHODS_MAP_DATA[key]()
 
+out_of_band_method = cast(PickleOutOfBandSerializer, methods_for_data[PickleOutOfBandSerializer._identifier])
+
+# Methods registered for exact types with register_method_for_type
+registered_methods: Dict[type, SerializerBase] = {}
+
+# The method which last serialized an object with each dispatch key, so that
+# fallback probing happens once per type rather than once per object
+DISPATCH_CACHE_SIZE = 1024
+dispatch_cache: Dict[Tuple[Any, ...], SerializerBase] = {}
+
+# Tuples, lists and dicts longer than this are not cached
+_MAX_KEY_ITEMS = 16
+
+# Compressors for decompressing payloads, instantiated on first use and
+# shared by all threads, so compressors must be safe to use concurrently
+decompressors: Dict[bytes, CompressorBase] = {}
+
+# Serialized functions and their digests. Functions are held weakly, so that
+# caching their serialized form does not keep them alive.
+_function_payloads = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary[Any, Tuple[bytes, bytes]]
+
+
+class FunctionCache:
+    """ Bounded LRU cache of deserialized functions, keyed by the digest of
+    their serialized form, so that a function sent with many tasks is only
+    deserialized once
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize = maxsize
+        self._functions = OrderedDict()  # type: OrderedDict[bytes, Any]
+
+    def __len__(self) -> int:
+        return len(self._functions)
+
+    def get(self, digest: bytes, functions: Optional[Mapping[bytes, Union[bytes, memoryview]]] = None) -> Any:
+        """ Return the function with the given digest, deserializing it from
+        ``functions`` if it is not cached
+        """
+        try:
+            func = self._functions[digest]
+        except KeyError:
+            pass
+        else:
+            self._functions.move_to_end(digest)
+            return func
+
+        if functions is None or digest not in functions:
+            raise TypeError("Function with digest {} is not cached and was not sent".format(digest.hex()))
+
+        func = deserialize(functions[digest])
+        self._functions[digest] = func
+        if len(self._functions) > self.maxsize:
+            self._functions.popitem(last=False)
+        return func
+
+
+function_cache = FunctionCache()
+
+
+def function_digest(payload: Union[bytes, memoryview]) -> bytes:
+    """ Digest identifying a serialized function by its content """
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def serialize_function(func: Any) -> Tuple[bytes, bytes]:
+    """ Serialize a function, returning the digest of the serialized form
+    along with it
+
+    The result is cached for as long as the function is alive, so repeated
+    calls with the same function object are cheap.
+    """
+    try:
+        return _function_payloads[func]
+    except (KeyError, TypeError):
+        pass
+
+    payload = _serialize_by_dispatch(func, None)
+    result = (function_digest(payload), payload)
+    try:
+        _function_payloads[func] = result
+    except TypeError:
+        # not hashable, or cannot be weakly referenced
+        pass
+    return result
+
 
 def _list_methods() -> Tuple[Dict[bytes, SerializerBase], Dict[bytes, SerializerBase]]:
     return methods_for_code, methods_for_data
 
 
-def pack_apply_message(func: Any, args: Any, kwargs: Any, buffer_threshold: int = int(128 * 1e6)) -> bytes:
+def pack_apply_message(func: Any, args: Any, kwargs: Any, buffer_threshold: int = int(128 * 1e6),
+                       buffers: Optional[List[memoryview]] = None,
+                       functions: Optional[Dict[bytes, bytes]] = None,
+                       compressor: Optional[CompressorBase] = None,
+                       compression_threshold: int = 2 ** 14) -> bytes:
     """Serialize and pack function and parameters
 
     Parameters
@@ -45,65 +151,212 @@ def pack_apply_message(func: Any, args: Any, kwargs: Any, buffer_threshold: int
     buffer_threshold: int
         Limits buffer to specified size in bytes. Exceeding this limit would give you
         a warning in the log. Default is 128MB.
+
+    buffers: list
+        If given, large contiguous buffers in args and kwargs, such as those of
+        NumPy arrays and bytes objects, are appended to this list rather than
+        copied into the packed message. They must be passed, in order, to
+        ``unpack_apply_message`` along with the packed message.
+
+    functions: dict
+        If given, the function is packed as a reference to the digest of its
+        serialized form, which is added to this dict keyed by the digest.
+        Receivers which have already seen the function need not be sent it again.
+
+    compressor: CompressorBase
+        If given, serialized args and kwargs of at least ``compression_threshold``
+        bytes are compressed with it. Out-of-band buffers are not compressed.
     """
-    b_func = serialize(func, buffer_threshold=buffer_threshold)
-    b_args = serialize(args, buffer_threshold=buffer_threshold)
-    b_kwargs = serialize(kwargs, buffer_threshold=buffer_threshold)
+    if functions is None:
+        b_func = serialize(func, buffer_threshold=buffer_threshold)
+    else:
+        digest, payload = serialize_function(func)
+        functions[digest] = payload
+        b_func = FUNCTION_REFERENCE + digest
+    b_args = serialize(args, buffer_threshold=buffer_threshold, buffers=buffers)
+    b_kwargs = serialize(kwargs, buffer_threshold=buffer_threshold, buffers=buffers)
+    if compressor is not None:
+        b_args = compress(b_args, compressor, compression_threshold)
+        b_kwargs = compress(b_kwargs, compressor, compression_threshold)
     packed_buffer = pack_buffers([b_func, b_args, b_kwargs])
     return packed_buffer
 
 
-def unpack_apply_message(packed_buffer: bytes, user_ns: Any = None, copy: Any = False) -> List[Any]:
+def unpack_apply_message(packed_buffer: Union[bytes, memoryview], user_ns: Any = None, copy: Any = False,
+                         buffers: Optional[Sequence[Any]] = None,
+                         functions: Optional[Mapping[bytes, Union[bytes, memoryview]]] = None) -> List[Any]:
     """ Unpack and deserialize function and parameters
 
+    buffers: list
+        The out-of-band buffers produced by ``pack_apply_message``. Objects are
+        reconstructed on top of these buffers without copying them, so
+        writable buffers such as bytearrays give writable NumPy arrays.
+
+    functions: dict
+        Serialized functions by digest, for a function packed as a reference.
+        Not needed if the function is in ``function_cache``.
+    """
+    buffer_iter = None if buffers is None else iter(buffers)
+    return [deserialize(buf, buffers=buffer_iter, functions=functions) for buf in unpack_buffers(packed_buffer)]
+
+
+def register_method_for_type(cls: type, method: SerializerBase) -> None:
+    """ Serialize objects of exactly type ``cls`` with ``method`` before
+    trying any other method
+
+    This gives a fast path for common types, such as bytes or NumPy arrays,
+    without probing the default methods. The method is also registered for
+    deserializing payloads with its identifier, so the module which defines
+    it must be imported wherever those payloads are deserialized.
+
+    Parameters
+    ----------
+    cls : type
+        Type of objects to serialize with the method. Subclasses are not included.
+
+    method : SerializerBase
+        Instance of the serializer to use
     """
-    return [deserialize(buf) for buf in unpack_buffers(packed_buffer)]
+    if method._for_code:
+        methods_for_code[method.identifier] = method
+    if method._for_data:
+        methods_for_data[method.identifier] = method
+    registered_methods[cls] = method
+    dispatch_cache.clear()
+
+
+def _dispatch_key(obj: Any, out_of_band: bool) -> Optional[Tuple[Any, ...]]:
+    """ Key for the dispatch cache, or None if obj should not be cached
+
+    Whether tuples, lists and dicts can be pickled depends on their items, and
+    args and kwargs are always tuples and dicts, so the types of their items
+    are part of the key.
+    """
+    cls = type(obj)
+    if cls is tuple or cls is list:
+        if len(obj) > _MAX_KEY_ITEMS:
+            return None
+        return (out_of_band, cls, *map(type, obj))
+    if cls is dict:
+        if len(obj) > _MAX_KEY_ITEMS:
+            return None
+        return (out_of_band, cls, *map(type, obj.values()))
+    return (out_of_band, cls)
+
+
+def _methods_to_try(obj: Any, key: Optional[Tuple[Any, ...]], out_of_band: bool) -> List[SerializerBase]:
+    if callable(obj):
+        methods = list(methods_for_code.values())
+    else:
+        methods = [m for m in methods_for_data.values() if m is not out_of_band_method]
+        if out_of_band:
+            methods.insert(0, out_of_band_method)
 
+    preferred = [registered_methods.get(type(obj)), dispatch_cache.get(key) if key is not None else None]
+    for method in reversed(preferred):
+        if method is not None:
+            if method in methods:
+                methods.remove(method)
+            methods.insert(0, method)
+    return methods
 
-def serialize(obj: Any, buffer_threshold: int = int(1e6)) -> bytes:
+
+def serialize(obj: Any, buffer_threshold: int = int(1e6), buffers: Optional[List[memoryview]] = None) -> bytes:
     """ Try available serialization methods one at a time
 
     Individual serialization methods might raise a TypeError (eg. if objects are non serializable)
     This method will raise the exception from the last method that was tried, if all methods fail.
+
+    The method which succeeds is remembered for the type of the object, so
+    that methods which failed are not tried again for later objects of that
+    type. A method registered with ``register_method_for_type`` is always
+    tried first.
+
+    If a ``buffers`` list is given, data is first serialized with pickle protocol 5,
+    appending large buffers to the list instead of copying them into the result.
+
+    The serialized form of a function is cached for as long as the function is alive.
     """
-    result: Union[bytes, Exception]
+    result: bytes
     if callable(obj):
-        for method in methods_for_code.values():
+        _, result = serialize_function(obj)
+    else:
+        result = _serialize_by_dispatch(obj, buffers)
+
+    if len(result) > buffer_threshold:
+        logger.warning(f"Serialized object exceeds buffer threshold of {buffer_threshold} bytes, this could cause overflows")
+    return result
+
+
+def _serialize_by_dispatch(obj: Any, buffers: Optional[List[memoryview]]) -> bytes:
+    out_of_band = buffers is not None and not callable(obj)
+    key = _dispatch_key(obj, out_of_band)
+
+    result: Union[bytes, Exception] = TypeError("No serialization method for {}".format(type(obj)))
+    for method in _methods_to_try(obj, key, out_of_band):
+        if method is out_of_band_method:
+            assert buffers is not None
+            n_buffers = len(buffers)
             try:
-                result = method.serialize(obj)
+                result = out_of_band_method.serialize(obj, buffers=buffers)
             except Exception as e:
+                del buffers[n_buffers:]
                 result = e
                 continue
-            else:
-                break
-    else:
-        for method in methods_for_data.values():
+        else:
             try:
                 result = method.serialize(obj)
             except Exception as e:
                 result = e
                 continue
-            else:
-                break
+
+        if key is not None and dispatch_cache.get(key) is not method:
+            if len(dispatch_cache) >= DISPATCH_CACHE_SIZE:
+                dispatch_cache.clear()
+            dispatch_cache[key] = method
+        break
 
     if isinstance(result, BaseException):
         raise result
-    else:
-        if len(result) > buffer_threshold:
-            logger.warning(f"Serialized object exceeds buffer threshold of {buffer_threshold} bytes, this could cause overflows")
-        return result
+    return result
 
 
-def deserialize(payload: bytes) -> Any:
+def deserialize(payload: Union[bytes, memoryview], buffers: Optional[Iterator[Any]] = None,
+                functions: Optional[Mapping[bytes, Union[bytes, memoryview]]] = None) -> Any:
     """
     Parameters
     ----------
-    payload : str
+    payload : bytes or memoryview
        Payload object to be deserialized
 
+    buffers : iterator
+       Out-of-band buffers for payloads serialized with a ``buffers`` list.
+       A payload packed together with its buffers by ``pack_buffers`` is
+       also accepted, in which case the buffers are taken from it.
+
+    functions : dict
+       Serialized functions by digest, for payloads which refer to a function
+
     """
-    header = payload[0:header_size]
-    if header in methods_for_code:
+    if payload[:len(PACK_MARKER)] == PACK_MARKER:
+        payload, *packed = unpack_buffers(payload)
+        return deserialize(payload, buffers=iter(packed), functions=functions)
+
+    header = bytes(payload[0:header_size])
+    if header == FUNCTION_REFERENCE:
+        return function_cache.get(bytes(payload[header_size:]), functions)
+
+    if header in COMPRESSORS_BY_HEADER:
+        if header not in decompressors:
+            decompressors[header] = COMPRESSORS_BY_HEADER[header]()
+        return deserialize(decompressors[header].decompress(payload[header_size:]), buffers=buffers, functions=functions)
+
+    if header not in methods_for_code and header not in methods_for_data:
+        _instantiate_method(header)
+
+    if header == out_of_band_method.identifier:
+        result = out_of_band_method.deserialize(payload, buffers=buffers)
+    elif header in methods_for_code:
         result = methods_for_code[header].deserialize(payload)
     elif header in methods_for_data:
         result = methods_for_data[header].deserialize(payload)
@@ -113,50 +366,106 @@ def deserialize(payload: bytes) -> Any:
     return result
 
 
-def pack_buffers(buffers: List[bytes]) -> bytes:
+def compress(payload: bytes, compressor: CompressorBase, threshold: int = 2 ** 14) -> bytes:
+    """ Compress a serialized payload which is at least ``threshold`` bytes
+    long, marking it with the compressor's identifier. Payloads which are
+    shorter, or which compression would not make shorter, are returned as
+    they are. ``deserialize`` decompresses the payload.
     """
+    if len(payload) < threshold:
+        return payload
+    compressed = compressor.identifier + compressor.compress(payload)
+    if len(compressed) >= len(payload):
+        return payload
+    return compressed
+
+
+def _instantiate_method(header: bytes) -> None:
+    """ Instantiate a serializer defined after this module was imported,
+    for example in a module imported by an app
+    """
+    if header in METHODS_MAP_CODE:
+        methods_for_code[header] = METHODS_MAP_CODE[header]()
+    if header in METHODS_MAP_DATA:
+        methods_for_data[header] = METHODS_MAP_DATA[header]()
+
+
+def pack_buffers(buffers: Sequence[Union[bytes, memoryview]]) -> bytes:
+    """ Pack byte sequences into a single byte string, which ``unpack_buffers``
+    will split back into the original sequences
+
     Parameters
     ----------
     buffers: list of byte strings
     """
-    packed = b''
-    for buf in buffers:
-        s_length = bytes(str(len(buf)) + '\n', 'utf-8')
-        packed += s_length + buf
-
-    return packed
+    return b''.join([pack_buffers_header(buffers), *buffers])
 
 
-def unpack_buffers(packed_buffer: bytes) -> List[bytes]:
+def pack_buffers_header(buffers: Sequence[Union[bytes, memoryview]]) -> bytes:
+    """ The header which ``pack_buffers`` puts before the byte sequences, so
+    that a packed buffer can be written out piece by piece
     """
+    lengths = [memoryview(buf).nbytes for buf in buffers]
+    return PACK_MARKER + _COUNT.pack(len(lengths)) + struct.pack('<{}Q'.format(len(lengths)), *lengths)
+
+
+def unpack_buffers(packed_buffer: Union[bytes, memoryview]) -> List[memoryview]:
+    """ Split a packed buffer into the byte sequences it was packed from
+
+    The byte sequences are returned as memoryviews onto the packed buffer,
+    so that large buffers are not copied. Buffers packed by earlier versions
+    of Parsl are also accepted.
+
     Parameters
     ----------
     packed_buffers : packed buffer as byte sequence
     """
+    view = memoryview(packed_buffer)
+    if view[:len(PACK_MARKER)] != PACK_MARKER:
+        return _unpack_legacy_buffers(view)
+
+    offset = len(PACK_MARKER)
+    (count,) = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+    lengths = struct.unpack_from('<{}Q'.format(count), view, offset)
+    offset += 8 * count
+
+    unpacked = []
+    for length in lengths:
+        unpacked.append(view[offset:offset + length])
+        offset += length
+
+    if offset != len(view):
+        raise ValueError("Packed buffer is {} bytes long, but its header describes {} bytes".format(len(view), offset))
+
+    return unpacked
+
+
+def _unpack_legacy_buffers(view: memoryview) -> List[memoryview]:
+    """ Split a buffer packed in the original format, where each byte sequence
+    is preceded by its length in ASCII decimal and a newline
+    """
     unpacked = []
-    while packed_buffer:
-        s_length, buf = packed_buffer.split(b'\n', 1)
+    offset = 0
+    while offset < len(view):
+        # lengths have at most 20 digits, so only look that far for the newline
+        s_length = bytes(view[offset:offset + 21]).split(b'\n', 1)[0]
         i_length = int(s_length.decode('utf-8'))
-        current, packed_buffer = buf[:i_length], buf[i_length:]
-        unpacked.extend([current])
+        offset += len(s_length) + 1
+        unpacked.append(view[offset:offset + i_length])
+        offset += i_length
 
     return unpacked
 
 
-def unpack_and_deserialize(packed_buffer: bytes) -> Any:
+def unpack_and_deserialize(packed_buffer: Union[bytes, memoryview]) -> Any:
     """ Unpacks a packed buffer of 3 byte sequences and returns the
     deserialized contents for use in function application.
     Parameters
     ----------
     packed_buffers : packed buffer of 3 byte sequences
     """
-    unpacked = []
-    while packed_buffer:
-        s_length, buf = packed_buffer.split(b'\n', 1)
-        i_length = int(s_length.decode('utf-8'))
-        current, packed_buffer = buf[:i_length], buf[i_length:]
-        deserialized = deserialize(current)
-        unpacked.extend([deserialized])
+    unpacked = [deserialize(buf) for buf in unpack_buffers(packed_buffer)]
 
     assert len(unpacked) == 3, "Unpack expects 3 buffers, got {}".format(len(unpacked))
 
@@ -0,0 +1,122 @@
+import logging
+import os
+from functools import partial, update_wrapper
+
+from typing import Any, Callable, Dict, List, Sequence, Union
+
+from parsl.serialize.facade import deserialize, pack_buffers, pack_buffers_header, serialize
+
+logger = logging.getLogger(__name__)
+
+
+class ResultProxy:
+    """ Reference to a task result which a worker wrote to shared storage
+    instead of sending it back
+
+    The file is removed once the result has been loaded from it by `resolve`,
+    unless the proxy has been retained, because a copy of it is kept for later
+    use. The file of a retained proxy is removed by whatever retained it.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file holding the serialized result, which must be
+        readable wherever the result is resolved
+    nbytes : int
+        Size of the serialized result
+    """
+
+    def __init__(self, path: str, nbytes: int) -> None:
+        self.path = path
+        self.nbytes = nbytes
+        self.retained = False
+
+    def __repr__(self) -> str:
+        return "ResultProxy({!r}, nbytes={})".format(self.path, self.nbytes)
+
+    def resolve(self) -> Any:
+        """ Load and deserialize the result, then remove its file unless the
+        proxy is retained
+        """
+        with open(self.path, 'rb') as f:
+            data = bytearray(os.fstat(f.fileno()).st_size)
+            f.readinto(data)
+        result = deserialize(memoryview(data))
+        if self.retained:
+            return result
+        try:
+            os.remove(self.path)
+        except OSError:
+            logger.warning("Could not remove result file {}".format(self.path), exc_info=True)
+        return result
+
+
+def serialize_result(result: Any, directory: str, threshold: int, name: str) -> bytes:
+    """ Serialize a result, unless its serialized form is at least
+    ``threshold`` bytes long, in which case it is written to a file in
+    ``directory`` and a `ResultProxy` referring to it is serialized instead
+
+    Large buffers in the result, such as those of NumPy arrays, are written
+    straight from the result to the file without being copied first. A
+    smaller result with such buffers is packed together with them, rather
+    than pickled a second time.
+
+    Parameters
+    ----------
+    result : Any
+        The result to serialize
+    directory : str
+        Directory on storage shared with the submit side
+    threshold : int
+        Size in bytes from which results are written to the directory
+    name : str
+        Name of the file to write the result to
+    """
+    buffers: List[memoryview] = []
+    payload = serialize(result, buffers=buffers)
+    nbytes = len(payload) + sum(buf.nbytes for buf in buffers)
+    if nbytes < threshold:
+        # buffers kept out of band are sent back packed after the payload
+        return pack_buffers([payload, *buffers]) if buffers else payload
+
+    path = os.path.join(directory, name)
+    pieces: List[Union[bytes, memoryview]] = [payload, *buffers]
+    with open(path + '.tmp', 'wb') as f:
+        f.write(pack_buffers_header(pieces))
+        for piece in pieces:
+            f.write(piece)
+    # the file only appears under its name once it is complete
+    os.rename(path + '.tmp', path)
+    logger.debug("Wrote result of {} bytes to {}".format(nbytes, path))
+
+    return serialize(ResultProxy(path, nbytes))
+
+
+def has_proxies(args: Sequence[Any], kwargs: Dict[str, Any]) -> bool:
+    """ Whether any of the args, kwargs or inputs of a task is a `ResultProxy`,
+    left in place of the result of a task it depends on
+    """
+    return (any(isinstance(arg, ResultProxy) for arg in args) or
+            any(isinstance(arg, ResultProxy) for arg in kwargs.values()) or
+            any(isinstance(arg, ResultProxy) for arg in kwargs.get('inputs', ())))
+
+
+def resolving_proxies(func: Callable) -> Callable:
+    """ Wrap a task function so that, where it runs, the `ResultProxy` args,
+    kwargs and inputs it is called with are replaced by their results
+    """
+    # a partial of a module level function, unlike a closure, is serialized
+    # by reference to that function rather than to the one it wraps
+    return update_wrapper(partial(_call_resolving_proxies, func), func)
+
+
+def _call_resolving_proxies(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    args = tuple(_resolved(arg) for arg in args)
+    kwargs = {key: _resolved(arg) for key, arg in kwargs.items()}
+    if 'inputs' in kwargs:
+        kwargs['inputs'] = [_resolved(arg) for arg in kwargs['inputs']]
+    return func(*args, **kwargs)
+
+
+def _resolved(arg: Any) -> Any:
+    return arg.resolve() if isinstance(arg, ResultProxy) else arg
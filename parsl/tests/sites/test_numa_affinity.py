@@ -0,0 +1,89 @@
+"""Tests for assigning workers to cores within NUMA nodes"""
+
+import os
+
+import pytest
+
+from parsl import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.process_worker_pool import (
+    get_numa_nodes, numa_cores_for_worker, parse_cpulist
+)
+from parsl.providers import LocalProvider
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_Local",
+                worker_debug=True,
+                max_workers=1,
+                cpu_affinity='numa',
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def get_worker_info():
+    import os
+    return os.environ['PARSL_NUMA_NODE'], os.sched_getaffinity(0), os.environ['OMP_PLACES']
+
+
+@pytest.mark.local
+@pytest.mark.skipif('sched_getaffinity' not in dir(os), reason='System does not support sched_setaffinity')
+def test_htex_numa():
+    node, affinity, places = get_worker_info().result()
+    nodes = get_numa_nodes(sorted(os.sched_getaffinity(0)))
+    assert sorted(affinity) == nodes[int(node)]
+    assert places == ",".join("{{{}}}".format(c) for c in sorted(affinity))
+
+
+@pytest.mark.local
+def test_parse_cpulist():
+    assert parse_cpulist("0-3,8-11\n") == [0, 1, 2, 3, 8, 9, 10, 11]
+    assert parse_cpulist("5") == [5]
+    assert parse_cpulist("") == []
+
+
+@pytest.mark.local
+def test_get_numa_nodes(tmp_path):
+    for node, cpulist in [(0, "0-3"), (1, "4-7"), (2, "")]:
+        (tmp_path / f"node{node}").mkdir()
+        (tmp_path / f"node{node}" / "cpulist").write_text(cpulist + "\n")
+    (tmp_path / "online").write_text("0-2\n")
+
+    # cores outside of the affinity mask and nodes without cores are dropped
+    nodes = get_numa_nodes([1, 2, 3, 4, 5, 6, 7], sysfs_path=str(tmp_path))
+    assert nodes == {0: [1, 2, 3], 1: [4, 5, 6, 7]}
+
+
+@pytest.mark.local
+def test_get_numa_nodes_without_sysfs(tmp_path):
+    assert get_numa_nodes([3, 1, 2], sysfs_path=str(tmp_path / "missing")) == {0: [1, 2, 3]}
+
+
+@pytest.mark.local
+def test_numa_cores_for_worker():
+    nodes = {0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}
+    assignments = [numa_cores_for_worker(w, 4, nodes) for w in range(4)]
+    assert assignments == [(0, [0, 1]), (1, [4, 5]), (0, [2, 3]), (1, [6, 7])]
+
+    # an odd number of workers leaves the extra worker's node less divided
+    assignments = [numa_cores_for_worker(w, 3, nodes) for w in range(3)]
+    assert assignments == [(0, [0, 1]), (1, [4, 5, 6, 7]), (0, [2, 3])]
+
+
+@pytest.mark.local
+def test_numa_cores_for_worker_oversubscribed():
+    with pytest.raises(AssertionError):
+        numa_cores_for_worker(2, 3, {0: [0], 1: [1]})
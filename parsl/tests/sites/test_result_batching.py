@@ -0,0 +1,88 @@
+"""Tests for batching results in the HTEX manager"""
+
+import pytest
+
+import parsl
+from parsl import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.process_worker_pool import ResultBatcher
+from parsl.providers import LocalProvider
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_Local",
+                max_workers=2,
+                heartbeat_period=1,
+                result_batch_bytes=4096,
+                result_batch_latency=50,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def payload(n):
+    return 'x' * n
+
+
+@pytest.mark.local
+def test_results_batched():
+    fus = [payload(i * 100) for i in range(50)]
+    assert [len(f.result()) for f in fus] == [i * 100 for i in range(50)]
+
+    import time
+    htex = parsl.dfk().executors['htex_Local']
+    time.sleep(2)  # wait for a heartbeat to report the statistics
+    stats = htex.connected_managers()[0]['result_batch_stats']
+    assert stats['results'] == 50
+    assert stats['batches'] == sum(stats['flush_reasons'].values())
+    assert stats['max_batch_results'] <= 2
+
+
+@pytest.mark.local
+def test_batcher_flush_reasons():
+    b = ResultBatcher(max_items=3, max_bytes=100, max_latency=1.0)
+    assert b.flush_reason(0) is None
+    assert b.time_to_flush(0) is None
+
+    # a lone result with no history of arrivals is not worth holding back
+    b.add(b'a', 0)
+    assert b.flush_reason(0) == 'rate'
+    assert b.take('rate') == [b'a']
+
+    # once results arrive quickly, they are held until the batch fills
+    b.add(b'b', 0.1)
+    b.add(b'c', 0.11)
+    assert b.flush_reason(0.11) is None
+    assert b.time_to_flush(0.11) == pytest.approx(0.99)
+    b.add(b'd', 0.12)
+    assert b.flush_reason(0.12) == 'count'
+    assert b.take('count') == [b'b', b'c', b'd']
+
+    b.add(b'e' * 100, 0.13)
+    assert b.flush_reason(0.13) == 'bytes'
+    b.take('bytes')
+
+    b.add(b'f', 0.14)
+    assert b.flush_reason(1.5) == 'latency'
+    b.take('latency')
+
+    # taking an empty batch, as on a heartbeat, is not counted
+    assert b.take('heartbeat') == []
+
+    assert b.stats['batches'] == 4
+    assert b.stats['results'] == 6
+    assert b.stats['bytes'] == 105
+    assert b.stats['max_batch_results'] == 3
+    assert b.stats['flush_reasons'] == {'count': 1, 'bytes': 1, 'latency': 1, 'rate': 1, 'heartbeat': 0}
@@ -0,0 +1,115 @@
+import os
+import threading
+
+import pytest
+
+import parsl
+from parsl import python_app
+from parsl.dataflow.checkpoint_store import CHECKPOINT_DB, SQLiteCheckpointStore
+from parsl.dataflow.checkpoint_writer import CheckpointWriter
+from parsl.tests.configs.local_threads_checkpoint import fresh_config
+
+
+@python_app(cache=True)
+def double(x):
+    return x * 2
+
+
+class SlowWrite:
+    """Records each batch, blocking the first until released"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def __call__(self, batch):
+        self.writing.set()
+        self.release.wait(10)
+        self.batches.append(list(batch))
+
+
+def test_records_queued_during_a_write_are_batched():
+    write = SlowWrite()
+    writer = CheckpointWriter(write)
+    writer.put(('a', 1))
+    assert write.writing.wait(10)
+    for i in range(5):
+        writer.put((str(i), i))
+    write.release.set()
+    writer.close()
+    assert write.batches == [[('a', 1)], [(str(i), i) for i in range(5)]]
+
+
+def test_batch_size():
+    write = SlowWrite()
+    writer = CheckpointWriter(write, batch_size=2)
+    writer.put(('a', 1))
+    assert write.writing.wait(10)
+    for i in range(5):
+        writer.put((str(i), i))
+    write.release.set()
+    writer.flush()
+    assert [len(b) for b in write.batches] == [1, 2, 2, 1]
+    writer.close()
+
+
+def test_flush_interval_collects_records():
+    write = SlowWrite()
+    write.release.set()
+    writer = CheckpointWriter(write, flush_interval=5)
+    for i in range(3):
+        writer.put((str(i), i))
+    # closing writes the records queued so far without waiting out the interval
+    writer.close()
+    assert write.batches == [[(str(i), i) for i in range(3)]]
+
+
+def test_failed_write_does_not_stop_writer():
+    batches = []
+
+    def write(batch):
+        batches.append(batch)
+        if len(batches) == 1:
+            raise OSError("disk full")
+
+    writer = CheckpointWriter(write)
+    writer.put(('a', 1))
+    writer.flush()
+    writer.put(('b', 2))
+    writer.flush()
+    assert batches == [[('a', 1)], [('b', 2)]]
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.put(('c', 3))
+
+
+@pytest.mark.local
+def test_task_exit_checkpoints_written_in_background(tmp_path):
+    config = fresh_config()
+    config.run_dir = str(tmp_path)
+    config.checkpoint_mode = 'task_exit'
+    config.checkpoint_format = 'sqlite'
+    config.checkpoint_fsync = True
+    dfk = parsl.load(config)
+
+    written_in = set()
+    write_checkpoint = dfk._write_checkpoint
+
+    def recording_write_checkpoint(records):
+        written_in.add(threading.current_thread().name)
+        return write_checkpoint(records)
+
+    dfk._checkpoint_writer._write = recording_write_checkpoint
+    try:
+        results = [double(i).result() for i in range(10)]
+        checkpoint_dir = dfk.checkpoint()
+    finally:
+        dfk.cleanup()
+        parsl.clear()
+
+    assert written_in == {"Checkpoint-Writer"}
+    store = SQLiteCheckpointStore(os.path.join(checkpoint_dir, CHECKPOINT_DB), readonly=True)
+    assert len(store) == 10
+    assert sorted(store.get(h).result() for h in [r[0] for r in store._conn.execute("SELECT hash FROM results")]) == results
+    store.close()
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+
+import pytest
+
+import parsl
+from parsl import python_app
+from parsl.dataflow.checkpoint_store import CHECKPOINT_DB, SQLiteCheckpointStore
+from parsl.tests.configs.local_threads_checkpoint import fresh_config
+
+
+@python_app(cache=True)
+def random_app(i):
+    import random
+    return random.randint(i, 100000)
+
+
+def test_store_round_trip(tmp_path):
+    path = str(tmp_path / CHECKPOINT_DB)
+    store = SQLiteCheckpointStore(path)
+    assert store.put([('a', [1, 2]), ('b', None)]) == 2
+    assert store.put([('a', 'replaced')]) == 1
+    assert len(store) == 2
+    store.close()
+
+    reader = SQLiteCheckpointStore(path, readonly=True)
+    assert reader.get('a').result() == 'replaced'
+    assert reader.get('b').result() is None
+    assert reader.get('c') is None
+    with pytest.raises(sqlite3.OperationalError):
+        reader.put([('c', 1)])
+    reader.close()
+
+
+@pytest.mark.parametrize("sync, journal_mode, synchronous", [(True, 'delete', 2), (False, 'wal', 1)])
+def test_store_durability(tmp_path, sync, journal_mode, synchronous):
+    # without sync, writes go through a write-ahead log so that a failure of
+    # the machine cannot corrupt the database
+    store = SQLiteCheckpointStore(str(tmp_path / CHECKPOINT_DB), sync=sync)
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == journal_mode
+    assert store._conn.execute("PRAGMA synchronous").fetchone()[0] == synchronous
+    store.put([('a', 1)])
+    store.close()
+
+    reader = SQLiteCheckpointStore(str(tmp_path / CHECKPOINT_DB), readonly=True)
+    assert reader.get('a').result() == 1
+    reader.close()
+
+
+def test_store_unloadable_result_is_a_miss(tmp_path):
+    path = str(tmp_path / CHECKPOINT_DB)
+    store = SQLiteCheckpointStore(path)
+    store.put([('a', 1)])
+    with store._conn:
+        store._conn.execute("UPDATE results SET result = ? WHERE hash = 'a'", (b'not a pickle',))
+    assert store.get('a') is None
+    store.close()
+
+
+@pytest.mark.local
+def test_sqlite_checkpoint_loaded_lazily(tmp_path):
+    config = fresh_config()
+    config.run_dir = str(tmp_path)
+    config.checkpoint_mode = 'task_exit'
+    config.checkpoint_format = 'sqlite'
+    parsl.load(config)
+    results = [random_app(i).result() for i in range(5)]
+    checkpoint_dir = os.path.join(parsl.dfk().run_dir, 'checkpoint')
+    parsl.dfk().cleanup()
+    parsl.clear()
+
+    assert os.path.exists(os.path.join(checkpoint_dir, CHECKPOINT_DB))
+    assert not os.path.exists(os.path.join(checkpoint_dir, 'tasks.pkl'))
+
+    config = fresh_config()
+    config.run_dir = str(tmp_path)
+    config.checkpoint_files = [checkpoint_dir]
+    dfk = parsl.load(config)
+    try:
+        # nothing is loaded into memory at start
+        assert dfk.memoizer.memo_lookup_table == {}
+        assert len(dfk.memoizer.checkpoint_stores) == 1
+
+        futs = [random_app(i) for i in range(5)]
+        assert [f.result() for f in futs] == results
+        assert all(f.task_def['from_memo'] for f in futs)
+        assert not random_app(5).task_def['from_memo']
+    finally:
+        dfk.cleanup()
+        parsl.clear()
@@ -0,0 +1,159 @@
+import logging
+import threading
+
+import pytest
+
+from parsl.app.app import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.errors import WorkerLost, WorkerOOMKilled
+from parsl.executors.high_throughput import process_worker_pool
+from parsl.executors.high_throughput.process_worker_pool import Manager, find_delegated_cgroup, read_oom_kill_count
+from parsl.providers import LocalProvider
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                poll_period=1,
+                heartbeat_period=1,
+                max_workers=1,
+                mem_per_worker=1,
+                enforce_mem_per_worker=True,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def allocate(gb):
+    b = bytearray(int(gb * 2**30))
+    return len(b)
+
+
+@pytest.mark.local
+def test_allocation_within_limit():
+    assert allocate(0.1).result() == int(0.1 * 2**30)
+
+
+@pytest.mark.local
+def test_allocation_over_limit():
+    # Without a delegated cgroup, the address space limit makes the allocation fail
+    if find_delegated_cgroup() is not None:
+        pytest.skip("Worker memory is limited by a cgroup, which would OOM kill the worker")
+    with pytest.raises(MemoryError):
+        allocate(2).result()
+
+    # ... and the worker carries on
+    assert allocate(0.1).result() == int(0.1 * 2**30)
+
+
+@python_app
+def worker_pid_and_limit():
+    import os
+    import resource
+    with open("/proc/self/cgroup") as f:
+        cgroup = f.read()
+    return os.getpid(), resource.getrlimit(resource.RLIMIT_AS)[0], cgroup
+
+
+@python_app
+def kill_worker():
+    import os
+    import signal
+    os.kill(os.getpid(), signal.SIGKILL)
+
+
+@pytest.mark.local
+def test_killed_worker_restarted_with_limit():
+    pid, limit, cgroup = worker_pid_and_limit().result()
+    with pytest.raises(WorkerLost):
+        kill_worker().result()
+
+    # the single worker has been replaced, and the new one is limited in the same way
+    new_pid, new_limit, new_cgroup = worker_pid_and_limit().result(timeout=60)
+    assert new_pid != pid
+    assert (new_limit, new_cgroup) == (limit, cgroup)
+    if find_delegated_cgroup() is None:
+        assert limit == 2**30
+
+
+class ExitedWorker:
+    exitcode = 0
+
+    def is_alive(self):
+        return False
+
+
+class OnePass:
+    """ A kill event which lets the watchdog loop run once """
+
+    def __init__(self):
+        self.checks = 0
+
+    def is_set(self):
+        self.checks += 1
+        return self.checks > 1
+
+
+@pytest.mark.local
+def test_retired_worker_cgroup_removed(tmpdir, monkeypatch):
+    # the worker pool's logger is only set up by its main function
+    monkeypatch.setattr(process_worker_pool, 'logger', logging.getLogger(__name__), raising=False)
+    manager = Manager.__new__(Manager)
+    manager.uid = "test"
+    manager.worker_cgroup_parent = str(tmpdir)
+    manager.heartbeat_period = 0
+    manager.procs = {0: ExitedWorker()}
+    manager._retiring_workers = 1
+    manager._retiring_lock = threading.Lock()
+    tmpdir.mkdir("parsl-test-worker-0")
+
+    manager.worker_watchdog(OnePass(), threading.Event())
+
+    # the worker is not restarted, and its cgroup does not outlive it
+    assert manager.procs == {}
+    assert manager._retiring_workers == 0
+    assert tmpdir.listdir() == []
+
+
+@pytest.mark.local
+def test_read_oom_kill_count(tmpdir):
+    events = tmpdir.join("memory.events")
+    events.write("low 0\nhigh 0\nmax 12\noom 3\noom_kill 2\n")
+    assert read_oom_kill_count(str(events)) == 2
+    assert read_oom_kill_count(str(tmpdir.join("missing"))) is None
+
+
+@pytest.mark.local
+def test_find_delegated_cgroup(tmpdir):
+    proc_cgroup = tmpdir.join("cgroup")
+    cgroup = tmpdir.mkdir("user.slice").mkdir("job")
+    proc_cgroup.write("0::/user.slice/job\n")
+
+    # the memory controller is not delegated to child cgroups
+    cgroup.join("cgroup.subtree_control").write("cpu pids\n")
+    assert find_delegated_cgroup(str(tmpdir), str(proc_cgroup)) is None
+
+    cgroup.join("cgroup.subtree_control").write("cpu memory pids\n")
+    assert find_delegated_cgroup(str(tmpdir), str(proc_cgroup)) == str(cgroup)
+
+    # cgroup v1 only
+    proc_cgroup.write("4:memory:/user.slice/job\n")
+    assert find_delegated_cgroup(str(tmpdir), str(proc_cgroup)) is None
+
+
+@pytest.mark.local
+def test_oom_killed_is_worker_lost():
+    e = WorkerOOMKilled(1, "node01", 2**30)
+    assert isinstance(e, WorkerLost)
+    assert "memory limit of 1073741824 bytes" in str(e)
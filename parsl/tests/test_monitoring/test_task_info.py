@@ -0,0 +1,74 @@
+import pickle
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.config import Config
+from parsl.dataflow.states import States
+from parsl.executors.threads import ThreadPoolExecutor
+from parsl.monitoring.task_info import TASK_INFO_FIELDS, task_info_message
+
+
+def local_config():
+    return Config(executors=[ThreadPoolExecutor(label='threads')], strategy='none')
+
+
+@parsl.python_app
+def add(x, y, stdout=None):
+    return x + y
+
+
+# the keys of the messages which the database manager records
+MESSAGE_KEYS = {'task_func_name', 'task_memoize', 'task_hashsum', 'task_fail_count', 'task_fail_cost',
+                'task_status', 'task_id', 'task_time_invoked', 'task_try_time_launched', 'task_time_returned',
+                'task_try_time_returned', 'task_executor', 'run_id', 'try_id', 'timestamp', 'task_status_name',
+                'tasks_failed_count', 'tasks_completed_count', 'tasks_memo_completed_count', 'from_memo',
+                'task_inputs', 'task_outputs', 'task_stdin', 'task_stdout', 'task_stderr', 'task_fail_history',
+                'task_depends', 'task_joins'}
+
+
+@pytest.mark.local
+def test_task_info_expanded():
+    dfk = parsl.dfk()
+    up = add(1, 2)
+    dep = Future()
+    fu = add(up, dep, stdout=('add.out', 'w'))
+
+    info = dfk._create_task_log_info(fu.task_def, first=True)
+    assert len(info) == len(TASK_INFO_FIELDS)
+    # the tuple must be cheap to send, so holds no futures
+    pickle.dumps(info)
+
+    msg = task_info_message('run', info)
+    assert set(msg) == MESSAGE_KEYS
+    assert msg['run_id'] == 'run'
+    assert msg['task_id'] == fu.tid
+    assert msg['task_status'] == States.pending
+    assert msg['task_status_name'] == 'pending'
+    assert msg['task_executor'] == 'threads'
+    assert msg['task_depends'] == str(up.tid)
+    assert msg['task_stdout'] == 'add.out'
+    assert msg['task_fail_history'] == ''
+    assert msg['task_joins'] is None
+
+    later = task_info_message('run', dfk._create_task_log_info(fu.task_def))
+    assert set(later) == MESSAGE_KEYS
+    assert later['task_depends'] is None
+    assert later['task_stdout'] is None
+    assert later['task_func_name'] == 'add'
+
+    dep.set_result(3)
+    assert fu.result() == 6
+
+
+@pytest.mark.local
+def test_callback_benchmark():
+    from parsl.benchmark.callbacks import timed_callbacks
+
+    result = timed_callbacks(20)
+    assert result['tasks'] == 20
+    assert result['callback_s_per_task'] > 0
+
+    # the DFK's own handler is restored afterwards
+    assert 'handle_exec_update' not in vars(parsl.dfk())
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.dataflow.completion import CompletionDispatcher
+
+
+@parsl.python_app
+def identity(x):
+    return x
+
+
+def test_handlers_for_a_key_run_in_order():
+    dispatcher = CompletionDispatcher(4)
+    seen = {k: [] for k in range(8)}
+    try:
+        for i in range(100):
+            for k in range(8):
+                dispatcher.dispatch(k, seen[k].append, i)
+    finally:
+        dispatcher.close()
+    assert all(s == list(range(100)) for s in seen.values())
+    assert dispatcher.queue_length == 0
+    assert dispatcher.max_queue_length >= 1
+
+
+def test_queue_length():
+    dispatcher = CompletionDispatcher(1)
+    release = threading.Event()
+    try:
+        dispatcher.dispatch(0, release.wait, 10)
+        for _ in range(3):
+            dispatcher.dispatch(0, lambda: None)
+        assert dispatcher.queue_length == 4
+        assert dispatcher.max_queue_length == 4
+    finally:
+        release.set()
+        dispatcher.close()
+    assert dispatcher.queue_length == 0
+
+
+def test_handler_exceptions_are_contained():
+    dispatcher = CompletionDispatcher(1)
+    seen = []
+    try:
+        dispatcher.dispatch(0, lambda: 1 / 0)
+        dispatcher.dispatch(0, seen.append, 1)
+    finally:
+        dispatcher.close()
+    assert seen == [1]
+
+
+def test_dispatch_after_close_runs_inline():
+    dispatcher = CompletionDispatcher(2)
+    dispatcher.close()
+    threads = []
+    dispatcher.dispatch(1, lambda: threads.append(threading.current_thread()))
+    assert threads == [threading.current_thread()]
+
+
+def test_needs_a_thread():
+    with pytest.raises(ValueError):
+        CompletionDispatcher(0)
+
+
+def test_completions_handled_by_dispatcher():
+    dfk = parsl.dfk()
+    dep = Future()
+    fu = identity(dep)
+    handled_in = []
+    handled = threading.Event()
+
+    def callback(f):
+        handled_in.append(threading.current_thread().name)
+        handled.set()
+
+    fu.add_done_callback(callback)
+    dep.set_result(1)
+    assert fu.result() == 1
+    assert handled.wait(10)
+    if dfk.completion_dispatcher is not None:
+        assert handled_in[0].startswith("Completion-Dispatcher-")
@@ -0,0 +1,38 @@
+import threading
+
+import parsl
+from parsl.benchmark.submit import submit_from_threads
+
+
+@parsl.python_app
+def identity(x):
+    return x
+
+
+def test_task_ids_unique_across_threads():
+    n_threads = 8
+    futures = [[] for _ in range(n_threads)]
+    barrier = threading.Barrier(n_threads)
+
+    def submitter(i):
+        barrier.wait()
+        futures[i] = [identity(j) for j in range(200)]
+
+    count_before = parsl.dfk().task_count
+    threads = [threading.Thread(target=submitter, args=(i,)) for i in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    all_futures = [f for fs in futures for f in fs]
+    assert len({f.tid for f in all_futures}) == n_threads * 200
+    assert parsl.dfk().task_count == count_before + n_threads * 200
+    for fs in futures:
+        assert [f.result() for f in fs] == list(range(200))
+
+
+def test_submit_benchmark():
+    result = submit_from_threads(n_threads=3, n_tasks=20)
+    assert result['params'] == {'threads': 3, 'tasks': 20}
+    assert result['complete_s'] >= result['submit_s'] > 0
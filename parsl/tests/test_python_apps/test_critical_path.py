@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.config import Config
+from parsl.dataflow.critical_path import CriticalPathEstimator
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+class PriorityThreadPoolExecutor(ThreadPoolExecutor):
+    """Records the priorities of submitted tasks, then runs them as a
+    ThreadPoolExecutor does"""
+
+    supports_priority = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.priorities = []
+
+    def submit(self, func, resource_specification, *args, **kwargs):
+        self.priorities.append(resource_specification.get('priority'))
+        return super().submit(func, {}, *args, **kwargs)
+
+
+def local_config():
+    return Config(executors=[PriorityThreadPoolExecutor(label='priority_threads')],
+                  critical_path_priority=True,
+                  strategy='none')
+
+
+@parsl.python_app
+def identity(*args, parsl_resource_specification={}):
+    return args
+
+
+def test_estimator_chain():
+    cp = CriticalPathEstimator()
+    cp.add_task(0, 'f', [])
+    cp.add_task(1, 'f', [0])
+    cp.add_task(2, 'f', [1])
+    cp.add_task(3, 'g', [0])
+
+    # with no runtime history, each task counts as the default runtime
+    assert cp.remaining_path(0) == 3.0
+    assert cp.remaining_path(3) == 1.0
+
+    cp.task_done(0, runtime=5.0)
+    assert cp.estimated_runtime('f') == 5.0
+    # g has no history, so is estimated with the mean over all apps
+    assert cp.estimated_runtime('g') == 5.0
+
+    # the estimate of task 1 was cached before the runtime was recorded,
+    # and is recomputed when the graph grows
+    cp.add_task(4, 'g', [3])
+    assert cp.remaining_path(3) == 10.0
+    assert cp.remaining_path(1) == 10.0
+
+
+def test_estimator_deep_chain():
+    cp = CriticalPathEstimator()
+    n = 5000
+    cp.add_task(0, 'f', [])
+    for i in range(1, n):
+        cp.add_task(i, 'f', [i - 1])
+    assert cp.remaining_path(0) == n
+
+
+def test_estimator_forgets_done_tasks():
+    cp = CriticalPathEstimator()
+    cp.add_task(0, 'f', [])
+    cp.add_task(1, 'f', [0])
+    cp.remaining_path(0)
+    cp.task_done(0)
+    cp.task_done(1)
+    assert cp._func_names == {}
+    assert cp._dependents == {}
+    assert cp._cache == {}
+    # no runtime was recorded for tasks which did not run
+    assert cp._runtimes == {}
+
+
+@pytest.mark.local
+def test_launched_tasks_carry_priority():
+    dfk = parsl.dfk()
+    executor = dfk.executors['priority_threads']
+
+    start = Future()
+    head = identity(start)
+    tail = identity(identity(identity(head)))
+    side = identity(start)
+    start.set_result(0)
+    tail.result()
+    side.result()
+
+    # head is the first task launched, so its estimate uses no runtimes;
+    # later estimates use the runtimes of the tasks completed so far
+    assert head.task_def['priority'] == 4.0
+    assert side.task_def['priority'] < head.task_def['priority']
+    assert tail.task_def['priority'] < head.task_def['priority']
+    assert len(executor.priorities) == 5
+    assert max(executor.priorities) == 4.0
+    assert dfk.critical_path._func_names == {}
+
+
+@pytest.mark.local
+def test_explicit_priority_kept():
+    executor = parsl.dfk().executors['priority_threads']
+    executor.priorities.clear()
+    identity(parsl_resource_specification={'priority': 42}).result()
+    assert executor.priorities == [42]
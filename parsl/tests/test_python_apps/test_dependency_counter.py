@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import Future
+
+import parsl
+
+
+@parsl.python_app
+def total(*args):
+    return sum(args)
+
+
+def test_fan_in_launches_on_last_dependency():
+    futs = [Future() for _ in range(1000)]
+    fu = total(*futs)
+    assert fu.task_def['outstanding_deps'] == 1000
+
+    for i, f in enumerate(futs[:-1]):
+        f.set_result(i)
+    assert fu.task_def['outstanding_deps'] == 1
+    assert not fu.done()
+    assert fu.task_status() == 'pending'
+
+    futs[-1].set_result(999)
+    assert fu.result() == sum(range(1000))
+    assert fu.task_def['outstanding_deps'] == 0
+
+
+def test_repeated_and_completed_dependencies():
+    done = Future()
+    done.set_result(1)
+    pending = Future()
+
+    fu = total(done, pending, pending)
+    assert fu.task_def['outstanding_deps'] == 2
+
+    pending.set_result(2)
+    assert fu.result() == 5
+
+
+def test_dependencies_completing_concurrently():
+    futs = [Future() for _ in range(200)]
+    fu = total(*futs)
+
+    barrier = threading.Barrier(4)
+
+    def complete(some):
+        barrier.wait()
+        for f in some:
+            f.set_result(1)
+
+    threads = [threading.Thread(target=complete, args=(futs[i::4],)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert fu.result() == 200
+    assert fu.task_def['outstanding_deps'] == 0
+    assert fu.task_def['try_id'] == 0
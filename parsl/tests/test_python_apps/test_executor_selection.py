@@ -0,0 +1,123 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.config import Config
+from parsl.data_provider.files import File
+from parsl.dataflow.executor_selection import (LeastOutstandingSelector, RandomSelector,
+                                               RuntimeSelector, WeightedSelector)
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+def local_config():
+    return Config(executors=[ThreadPoolExecutor(label='a'), ThreadPoolExecutor(label='b')],
+                  executor_selector=LeastOutstandingSelector(),
+                  strategy='none')
+
+
+@parsl.python_app
+def wait_for(event, *args, inputs=[]):
+    event.wait(10)
+    return args
+
+
+@parsl.python_app(executors=['a'])
+def wait_on_a(event):
+    event.wait(10)
+
+
+@parsl.python_app(executors=['b'])
+def wait_on_b(event):
+    event.wait(10)
+
+
+def record(func_name='f', executor='a'):
+    return {'func_name': func_name, 'executor': executor}
+
+
+def test_random_selector():
+    assert RandomSelector().select(record(), ['a', 'b'], {}) in ('a', 'b')
+
+
+def test_least_outstanding_selector():
+    s = LeastOutstandingSelector()
+    assert s.select(record(), ['a', 'b', 'c'], {'a': 2, 'b': 1, 'c': 3}) == 'b'
+    assert s.select(record(), ['a', 'b'], {'a': 1}) == 'b'
+
+
+def test_weighted_selector():
+    s = WeightedSelector({'big': 4})
+    # with 3 tasks on the big executor, it still has the least load for its weight
+    assert s.select(record(), ['big', 'small'], {'big': 3}) == 'big'
+    assert s.select(record(), ['big', 'small'], {'big': 4}) == 'small'
+
+    with pytest.raises(ValueError):
+        WeightedSelector({'a': 0})
+
+
+def test_runtime_selector():
+    s = RuntimeSelector()
+    # no history: least outstanding
+    assert s.select(record(), ['a', 'b'], {'a': 1}) == 'b'
+
+    s.task_done(record(executor='a'), 1.0)
+    s.task_done(record(executor='b'), 10.0)
+    s.task_done(record(executor='b'), None)
+    assert s.select(record(), ['a', 'b'], {'a': 5}) == 'a'
+    assert s.select(record(), ['a', 'b'], {'a': 20}) == 'b'
+
+    # an executor which has not run the app is assumed to take its mean runtime
+    assert s.select(record(), ['a', 'c'], {'a': 1}) == 'c'
+
+    # other apps are not affected
+    assert s.select(record(func_name='g'), ['a', 'b'], {'a': 1}) == 'b'
+
+
+@pytest.mark.local
+def test_least_outstanding_spreads_tasks():
+    event = threading.Event()
+    futs = [wait_for(event) for _ in range(4)]
+    try:
+        executors = [f.task_def['executor'] for f in futs]
+        assert sorted(executors) == ['a', 'a', 'b', 'b']
+    finally:
+        event.set()
+    for f in futs:
+        f.result()
+
+
+@pytest.mark.local
+def test_executor_chosen_at_launch():
+    dfk = parsl.dfk()
+    event = threading.Event()
+    dep = Future()
+    fu = wait_for(event, dep)
+    assert fu.task_def['executor_choices'] == ['a', 'b']
+
+    # occupy the executor the task was placed on at submission
+    first = fu.task_def['executor']
+    other = 'b' if first == 'a' else 'a'
+    blocker = wait_on_a(event) if first == 'a' else wait_on_b(event)
+    assert blocker.task_def['executor_choices'] is None
+
+    dep.set_result(1)
+    assert fu.task_def['executor'] == other
+    assert dfk._outstanding_tasks == {first: 1, other: 1}
+
+    event.set()
+    fu.result()
+    blocker.result()
+    parsl.wait_for_current_tasks()
+    assert dfk._outstanding_tasks == {first: 0, other: 0}
+    assert dfk._launched_tasks == {first: 0, other: 0}
+
+
+@pytest.mark.local
+def test_executor_fixed_for_files(tmp_path):
+    event = threading.Event()
+    event.set()
+    fu = wait_for(event, inputs=[File(str(tmp_path / 'in.txt'))])
+    assert fu.task_def['executor_choices'] is None
+    fu.result()
@@ -0,0 +1,155 @@
+import os
+import pickle
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl import python_app
+from parsl.dataflow.futures import AppFuture
+from parsl.dataflow.memoization import MEMO_SPILL_DB, Memoizer, MemoTable
+from parsl.serialize import deserialize
+from parsl.serialize.proxy import ResultProxy, serialize_result
+from parsl.tests.configs.local_threads import fresh_config
+
+
+def done_future(result):
+    fu = Future()
+    fu.set_result(result)
+    return fu
+
+
+@python_app(cache=True)
+def random_uuid(x):
+    import uuid
+    return str(uuid.uuid4())
+
+
+def test_least_recently_used_evicted():
+    evicted = []
+    table = MemoTable(max_entries=2, on_evict=evicted.extend)
+    a, b, c = done_future('a'), done_future('b'), done_future('c')
+    table['a'] = a
+    table['b'] = b
+    assert table['a'] is a
+    table['c'] = c
+    assert evicted == [('b', b)]
+    assert sorted(table) == ['a', 'c']
+    assert table.evictions == 1
+
+
+def test_max_bytes():
+    small = done_future(b'x' * 10)
+    big = done_future(b'x' * 1000)
+    limit = len(pickle.dumps(small.result())) * 2 + 10
+    table = MemoTable(max_bytes=limit)
+    table['s1'] = small
+    table['s2'] = small
+    assert len(table) == 2
+    # a result larger than the limit evicts everything, itself included
+    table['big'] = big
+    assert len(table) == 0
+    assert table.bytes == 0
+
+    table['s1'] = small
+    table['s1'] = small
+    assert table.bytes == len(pickle.dumps(small.result()))
+
+
+def proxy_future(tmp_path, result):
+    proxy = deserialize(serialize_result(result, str(tmp_path), threshold=1, name='result'))
+    fu = AppFuture({'id': 0})
+    fu.set_result(proxy)
+    return fu
+
+
+def test_result_proxy_not_loaded(tmp_path):
+    fu = proxy_future(tmp_path, b'x' * 1000)
+    path = tmp_path / 'result'
+
+    memoizer = Memoizer(None, max_entries=1, max_bytes=10 ** 6, spill_path=str(tmp_path / MEMO_SPILL_DB))
+    try:
+        memoizer.memo_lookup_table['a'] = fu
+        assert memoizer.memo_lookup_table.bytes == path.stat().st_size
+        memoizer.memo_lookup_table['b'] = done_future('b')
+        spilled = memoizer.spill.get('a').result()
+
+        # the proxy is sized from its file and spilled as it is, not resolved
+        assert isinstance(spilled, ResultProxy)
+        assert spilled.path == str(path)
+        assert path.exists()
+
+        # loading the result does not remove the file the spilled proxy needs
+        assert fu.result() == b'x' * 1000
+        assert memoizer._memo_lookup('a').result().resolve() == b'x' * 1000
+    finally:
+        memoizer.close()
+
+    assert not path.exists()
+
+
+def test_loaded_result_proxy_spilled(tmp_path):
+    fu = proxy_future(tmp_path, b'x' * 1000)
+    assert fu.result() == b'x' * 1000
+    assert not (tmp_path / 'result').exists()
+
+    memoizer = Memoizer(None, max_entries=1, spill_path=str(tmp_path / MEMO_SPILL_DB))
+    try:
+        memoizer.memo_lookup_table['a'] = fu
+        memoizer.memo_lookup_table['b'] = done_future('b')
+        # the loaded result is spilled, in place of the proxy to the removed file
+        assert memoizer._memo_lookup('a').result() == b'x' * 1000
+    finally:
+        memoizer.close()
+
+
+@pytest.mark.parametrize("kwargs", [{'max_entries': 0}, {'max_bytes': 0}])
+def test_limits_must_be_positive(kwargs):
+    with pytest.raises(ValueError):
+        MemoTable(**kwargs)
+
+
+@pytest.mark.local
+def test_evicted_results_spilled_and_reloaded(tmp_path):
+    config = fresh_config()
+    config.run_dir = str(tmp_path)
+    config.memo_max_entries = 2
+    config.memo_spill = True
+    dfk = parsl.load(config)
+    try:
+        results = [random_uuid(i).result() for i in range(5)]
+        # results are stored in the cache after the futures complete
+        dfk.wait_for_current_tasks()
+        assert len(dfk.memoizer.memo_lookup_table) == 2
+        assert len(dfk.memoizer.spill) == 3
+
+        futs = [random_uuid(i) for i in range(5)]
+        assert [f.result() for f in futs] == results
+        assert all(f.task_def['from_memo'] for f in futs)
+        spill_path = dfk.memoizer.spill.path
+    finally:
+        dfk.cleanup()
+        parsl.clear()
+
+    assert os.path.basename(spill_path) == MEMO_SPILL_DB
+    assert not os.path.exists(spill_path)
+
+
+@pytest.mark.local
+def test_evicted_results_not_spilled_run_again(tmp_path):
+    config = fresh_config()
+    config.run_dir = str(tmp_path)
+    config.memo_max_entries = 1
+    dfk = parsl.load(config)
+    try:
+        first = random_uuid(0).result()
+        random_uuid(1).result()
+        dfk.wait_for_current_tasks()
+        assert dfk.memoizer.spill is None
+        assert random_uuid(1).task_def['from_memo']
+        again = random_uuid(0)
+        assert not again.task_def['from_memo']
+        assert again.result() != first
+    finally:
+        dfk.cleanup()
+        parsl.clear()
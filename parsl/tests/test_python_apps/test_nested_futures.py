@@ -0,0 +1,127 @@
+from collections import namedtuple
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.config import Config
+from parsl.dataflow.errors import DependencyError
+from parsl.dataflow.nested_futures import find_futures, replace_futures
+from parsl.executors.threads import ThreadPoolExecutor
+
+
+def local_config():
+    return Config(executors=[ThreadPoolExecutor(label='threads')],
+                  find_nested_futures=True,
+                  strategy='none')
+
+
+@parsl.python_app
+def total(xs, weights={}):
+    return sum(xs) + sum(weights.values())
+
+
+@parsl.python_app
+def square(x):
+    return x * x
+
+
+@parsl.python_app
+def size(xs):
+    return len(xs)
+
+
+@parsl.python_app
+def make_list():
+    return [1, 2]
+
+
+@parsl.python_app
+def fail():
+    raise ValueError("failed")
+
+
+def done(value):
+    f = Future()
+    f.set_result(value)
+    return f
+
+
+def test_find_futures():
+    a, b, c = Future(), Future(), Future()
+    assert find_futures(a) == [a]
+    assert find_futures([1, (a, {'k': [b]}), {c}]) == [a, b, c]
+    assert find_futures(list(range(1000)) + ['x', None, 1.5]) == []
+    assert find_futures({a: 1}) == []
+
+
+def test_find_futures_ignores_other_types():
+    Pair = namedtuple('Pair', ['x', 'y'])
+    assert find_futures(Pair(Future(), 1)) == []
+    assert find_futures(object()) == []
+
+
+def test_find_futures_in_cycle():
+    a = Future()
+    cycle = [a]
+    cycle.append(cycle)
+    assert find_futures(cycle) == [a]
+
+
+def test_replace_futures():
+    failures = []
+    shared = [done(1)]
+    value = {'x': [done(2), (3, done(4))], 'shared': [shared, shared], 'n': 5}
+    replaced = replace_futures(value, failures)
+    assert replaced == {'x': [2, (3, 4)], 'shared': [[1], [1]], 'n': 5}
+    assert failures == []
+    # the original containers are not modified
+    assert isinstance(value['x'][0], Future)
+
+
+def test_replace_futures_without_futures_is_unchanged():
+    value = [1, [2, 3], {'a': 'b'}]
+    assert replace_futures(value, []) is value
+
+
+def test_replace_futures_records_failures():
+    bad = Future()
+    e = ValueError()
+    bad.set_exception(e)
+    failures = []
+    replaced = replace_futures([done(1), bad], failures)
+    assert replaced == [1, bad]
+    assert failures == [(e, None)]
+
+
+@pytest.mark.local
+def test_app_waits_for_nested_futures():
+    dep = Future()
+    squares = [square(i) for i in range(5)]
+    fu = total(squares + [dep], weights={'w': square(3)})
+    assert len(fu.task_def['depends']) == 7
+    assert not fu.done()
+    dep.set_result(100)
+    assert fu.result() == sum(i * i for i in range(5)) + 100 + 9
+
+
+@pytest.mark.local
+def test_nested_failure_fails_app():
+    fu = total([1, fail()])
+    with pytest.raises(DependencyError):
+        fu.result()
+
+
+@pytest.mark.local
+def test_unhashable_result_in_set_fails_app():
+    # the set cannot be rebuilt with the list in place of its future
+    fu = size({make_list()})
+    with pytest.raises(TypeError):
+        fu.result(timeout=10)
+    assert fu.task_status() == 'failed'
+
+
+@pytest.mark.local
+def test_map_with_nested_futures():
+    futs = total.map([[square(2), 1], [3]])
+    assert [f.result() for f in futs] == [5, 3]
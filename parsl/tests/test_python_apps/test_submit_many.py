@@ -0,0 +1,101 @@
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl import File
+from parsl.dataflow.dflow import DataFlowKernel
+
+
+@parsl.python_app
+def add(x, y=0):
+    return x + y
+
+
+@parsl.python_app(cache=True)
+def random_uuid(x):
+    import uuid
+    return str(uuid.uuid4())
+
+
+@parsl.python_app
+def first_input(x, inputs=[]):
+    return inputs[0]
+
+
+@parsl.python_app
+def fail(x):
+    raise ValueError(x)
+
+
+def test_map_results_in_order():
+    futs = add.map(range(100), range(100, 200))
+    assert [f.result() for f in futs] == [x + y for x, y in zip(range(100), range(100, 200))]
+    assert len({f.tid for f in futs}) == 100
+
+
+def test_map_shared_kwargs():
+    futs = add.map(range(10), y=5)
+    assert [f.result() for f in futs] == [x + 5 for x in range(10)]
+    assert all(f.task_def['kwargs'] is not futs[0].task_def['kwargs'] for f in futs[1:])
+
+
+def test_map_batches():
+    dfk = parsl.dfk()
+    futs = dfk.submit_many(add.func, [(i,) for i in range(25)], batch_size=7)
+    assert [f.result() for f in futs] == list(range(25))
+
+
+def test_map_falls_back_for_dependencies():
+    dep = Future()
+    futs = add.map([1, dep, 3])
+    assert futs[0].result() == 1
+    assert futs[2].result() == 3
+    assert futs[1].task_def['depends'] == [dep]
+    assert not futs[1].done()
+
+    dep.set_result(2)
+    assert futs[1].result() == 2
+
+
+def test_map_falls_back_for_files():
+    assert DataFlowKernel._needs_dependencies_or_staging((File('a.txt'),), {})
+    assert DataFlowKernel._needs_dependencies_or_staging((), {'inputs': [File('a.txt')]})
+    assert DataFlowKernel._needs_dependencies_or_staging((), {'outputs': [File('a.txt')]})
+    assert not DataFlowKernel._needs_dependencies_or_staging((1, 'a.txt'), {'inputs': [1], 'outputs': []})
+
+    fut = Future()
+    fut.set_result(7)
+    futs = first_input.map([None, None], inputs=[fut])
+    assert [f.result() for f in futs] == [7, 7]
+
+
+def test_map_memoizes():
+    first = [f.result() for f in random_uuid.map([0, 1])]
+    second = random_uuid.map([0, 1])
+    assert [f.result() for f in second] == first
+    assert [f.task_def['from_memo'] for f in second] == [True, True]
+
+
+def test_map_failures_are_per_task():
+    futs = fail.map([1, 2])
+    for f in futs:
+        with pytest.raises(ValueError):
+            f.result()
+
+
+def test_bad_batch_size():
+    with pytest.raises(ValueError):
+        parsl.dfk().submit_many(add.func, [(1,)], batch_size=0)
+
+
+@parsl.python_app
+def length(x):
+    return len(x)
+
+
+def test_map_large_args():
+    # executors may send large args separately from the rest of each task
+    sizes = [10, 2 ** 21, 20, 2 ** 22]
+    futs = length.map([b'x' * n for n in sizes])
+    assert [f.result() for f in futs] == sizes
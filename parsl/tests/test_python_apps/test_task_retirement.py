@@ -0,0 +1,75 @@
+import gc
+import time
+import weakref
+from concurrent.futures import Future
+
+import pytest
+
+import parsl
+from parsl.dataflow.states import States
+
+
+@parsl.python_app
+def add(x, y=0, stdout=None):
+    return x + y
+
+
+@parsl.python_app
+def fail():
+    raise ValueError("fail")
+
+
+def wait_until_retired(fu, timeout=10):
+    """The record is retired after the task's AppFuture is set, in the thread
+    which handles the task's completion, so wait for its dependencies to be
+    released.
+    """
+    deadline = time.monotonic() + timeout
+    while fu.task_def['depends'] != []:
+        assert time.monotonic() < deadline, "task {} was not retired within {}s".format(fu.tid, timeout)
+        time.sleep(0.01)
+
+
+def test_completed_task_releases_inputs():
+    if not parsl.dfk().config.garbage_collect:
+        pytest.skip("task records are only retired when garbage_collect is enabled")
+
+    up = add(1)
+    down = add(up, y=2, stdout='add.out')
+    assert down.result() == 3
+    wait_until_retired(down)
+
+    assert down.task_def['args'] == ()
+    assert down.task_def['kwargs'] == {'stdout': 'add.out'}
+    assert down.task_def['depends'] == []
+    assert down.stdout == 'add.out'
+    assert down.task_status() == 'exec_done'
+
+    # nothing in parsl keeps the upstream task alive once it has completed
+    up_ref = weakref.ref(up)
+    del up
+    gc.collect()
+    assert up_ref() is None
+
+
+def test_pending_task_keeps_dependencies():
+    dep = Future()
+    fu = add(dep)
+    assert fu.task_def['depends'] == [dep]
+    assert fu.task_def['args'] == (dep,)
+
+    dep.set_result(4)
+    assert fu.result() == 4
+
+
+def test_failed_task_retired():
+    if not parsl.dfk().config.garbage_collect:
+        pytest.skip("task records are only retired when garbage_collect is enabled")
+
+    fu = add(fail(), y=2)
+    with pytest.raises(Exception):
+        fu.result()
+    wait_until_retired(fu)
+    assert fu.task_def['status'] == States.dep_fail
+    assert fu.task_def['depends'] == []
+    assert 'y' not in fu.task_def['kwargs']
@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import Future
+
+import parsl
+
+
+@parsl.python_app
+def identity(x):
+    return x
+
+
+@parsl.python_app
+def fail(x):
+    raise ValueError(x)
+
+
+def test_wait_returns_when_last_task_completes():
+    dep = Future()
+    fu = identity(dep)
+
+    waiter = threading.Thread(target=parsl.wait_for_current_tasks)
+    waiter.start()
+    waiter.join(timeout=0.5)
+    assert waiter.is_alive(), "wait_for_current_tasks returned with a task outstanding"
+
+    dep.set_result(1)
+    waiter.join(timeout=10)
+    assert not waiter.is_alive()
+    assert fu.done()
+
+
+def test_wait_counts_failed_tasks():
+    futs = [fail(i) for i in range(5)] + [identity(fail(0))]
+    parsl.wait_for_current_tasks()
+    assert all(f.done() for f in futs)
+
+
+def test_wait_for_executor_subset():
+    dep = Future()
+    fu = identity(dep)
+    label = fu.task_def['executor']
+
+    # no tasks were sent to the internal executor, so this does not wait
+    parsl.wait_for_current_tasks(executors=['_parsl_internal'])
+    assert not fu.done()
+
+    waiter = threading.Thread(target=parsl.wait_for_current_tasks, kwargs={'executors': [label]})
+    waiter.start()
+    waiter.join(timeout=0.5)
+    assert waiter.is_alive()
+
+    dep.set_result(1)
+    waiter.join(timeout=10)
+    assert not waiter.is_alive()
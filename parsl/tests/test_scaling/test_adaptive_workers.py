@@ -0,0 +1,76 @@
+import time
+
+import parsl
+import pytest
+from parsl import python_app
+
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.process_worker_pool import adaptive_worker_target
+from parsl.launchers import SingleNodeLauncher
+from parsl.providers import LocalProvider
+
+GB = 2 ** 30
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                heartbeat_period=2,
+                poll_period=100,
+                cores_per_worker=1,
+                max_workers=2,
+                adaptive_workers=True,
+                min_workers=1,
+                adaptive_period=1,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                    launcher=SingleNodeLauncher(),
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def sleeper(t):
+    import time
+    time.sleep(t)
+    return t
+
+
+@pytest.mark.local
+def test_adaptive_workers_grow_for_idle_cores():
+    htex = parsl.dfk().executors['htex_local']
+
+    fus = [sleeper(3) for _ in range(8)]
+
+    deadline = time.time() + 60
+    while htex.connected_workers < 2 and time.time() < deadline:
+        time.sleep(0.5)
+
+    assert htex.connected_workers == 2, "Expected the manager to grow to max_workers for sleeping tasks"
+    assert [f.result() for f in fus] == [3] * 8
+
+
+@pytest.mark.local
+def test_adaptive_worker_target():
+    # grows when all workers are busy but leave cores idle
+    assert adaptive_worker_target(2, 1, 4, 0.1, 0.5, True, 16 * GB, 1 * GB) == 3
+    # ... but not past the upper bound
+    assert adaptive_worker_target(4, 1, 4, 0.1, 0.5, True, 16 * GB, 1 * GB) == 4
+    # does not grow while some workers are idle, or when workers are using their cores
+    assert adaptive_worker_target(2, 1, 4, 0.1, 0.5, False, 16 * GB, 1 * GB) == 2
+    assert adaptive_worker_target(2, 1, 4, 0.9, 0.5, True, 16 * GB, 1 * GB) == 2
+    assert adaptive_worker_target(2, 1, 4, None, 0.5, True, 16 * GB, 1 * GB) == 2
+    # does not grow when there is no room in memory for another worker
+    assert adaptive_worker_target(2, 1, 4, 0.1, 0.5, True, 1.5 * GB, 1 * GB) == 2
+    # shrinks under memory pressure, down to the lower bound
+    assert adaptive_worker_target(3, 1, 4, 0.1, 0.5, True, 0.1 * GB, 1 * GB) == 2
+    assert adaptive_worker_target(1, 1, 4, 0.1, 0.5, True, 0.1 * GB, 1 * GB) == 1
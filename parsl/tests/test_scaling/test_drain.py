@@ -0,0 +1,75 @@
+import time
+
+import parsl
+import pytest
+from parsl import python_app
+
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.interchange import ManagerLost
+from parsl.launchers import SingleNodeLauncher
+from parsl.providers import LocalProvider
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                heartbeat_period=2,
+                poll_period=100,
+                max_workers=1,
+                drain_timeout=30,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=2,
+                    max_blocks=2,
+                    launcher=SingleNodeLauncher(),
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def sleeper(t):
+    import time
+    time.sleep(t)
+    return t
+
+
+def busy_block(htex):
+    """Wait for a block to be running a task and return its block id"""
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        for m in htex.connected_managers():
+            if m['tasks'] > 0:
+                return m['block_id']
+        time.sleep(0.1)
+    raise RuntimeError("No block started running the task")
+
+
+@pytest.mark.local
+def test_drain_then_scale_in():
+    htex = parsl.dfk().executors['htex_local']
+
+    fu = sleeper(3)
+    block_id = busy_block(htex)
+
+    # scale in waits for the running task to complete, and the task succeeds
+    assert htex.scale_in(block_ids=[block_id]) == [block_id]
+    assert fu.result() == 3
+    assert block_id not in [m['block_id'] for m in htex.connected_managers()]
+
+    # a task which outlives the drain deadline fails so that it can be retried
+    htex.drain_timeout = 1
+    fu = sleeper(60)
+    block_id = busy_block(htex)
+
+    start = time.time()
+    assert htex.scale_in(block_ids=[block_id]) == [block_id]
+    assert time.time() - start < 30
+    with pytest.raises(ManagerLost):
+        fu.result(timeout=30)
@@ -0,0 +1,20 @@
+import json
+
+import pytest
+
+from parsl.benchmark.serialization import cli_run
+
+
+@pytest.mark.local
+def test_benchmark_json_report(tmpdir):
+    output = str(tmpdir.join("report.json"))
+    cli_run(["--suites", "apply_message", "pack", "--sizes", "1024", "--repeat", "1", "--output", output])
+
+    with open(output) as f:
+        report = json.load(f)
+
+    assert report['parsl_version']
+    benchmarks = {r['benchmark'] for r in report['results']}
+    assert benchmarks == {'pack_apply_message', 'unpack_apply_message',
+                          'pack_buffers', 'unpack_buffers', 'unpack_legacy_buffers'}
+    assert all(r['best_s'] > 0 and r['params']['nbytes'] == 1024 for r in report['results'])
@@ -0,0 +1,129 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from parsl import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.errors import OptionalModuleMissing
+from parsl.executors import HighThroughputExecutor
+from parsl.providers import LocalProvider
+from parsl.serialize import deserialize, pack_apply_message, serialize, unpack_apply_message
+from parsl.serialize.compression import CompressorBase, ZlibCompressor, available_compressors, get_compressor
+from parsl.serialize.facade import compress
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                max_workers=1,
+                compression='zlib',
+                compression_threshold=1024,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def count_records(doc):
+    import json
+    records = json.loads(doc)
+    return json.dumps({'n': len(records), 'records': records})
+
+
+def document(n):
+    return json.dumps([{'id': i, 'name': 'record {}'.format(i)} for i in range(n)])
+
+
+@pytest.mark.local
+def test_htex_compressed_round_trip():
+    doc = document(10000)
+    result = json.loads(count_records(doc).result())
+    assert result['n'] == 10000
+    assert json.dumps(result['records']) == doc
+
+    # below the threshold
+    assert json.loads(count_records(document(1)).result())['n'] == 1
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("name", available_compressors())
+def test_compress_round_trip(name):
+    compressor = get_compressor(name)
+    payload = serialize(document(1000))
+    compressed = compress(payload, compressor, threshold=1024)
+    assert compressed[:3] == compressor.identifier
+    assert len(compressed) < len(payload) / 2
+    assert deserialize(compressed) == document(1000)
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("name", available_compressors())
+def test_compress_from_many_threads(name):
+    # as when several threads submit tasks to one executor, and results are
+    # decompressed while they do
+    compressor = get_compressor(name)
+    payloads = [serialize(document(1000 + i)) for i in range(8)]
+
+    def round_trip(i):
+        for _ in range(20):
+            compressed = compress(payloads[i], compressor, threshold=1024)
+            assert compressed[:3] == compressor.identifier
+            assert deserialize(compressed) == document(1000 + i)
+        return i
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(round_trip, range(8))) == list(range(8))
+
+
+@pytest.mark.local
+def test_compress_threshold():
+    payload = serialize(document(10))
+    assert compress(payload, ZlibCompressor(), threshold=len(payload) + 1) is payload
+
+    # incompressible payloads are sent as they are
+    payload = serialize(os.urandom(4096))
+    assert compress(payload, ZlibCompressor(), threshold=1024) is payload
+
+
+@pytest.mark.local
+def test_pack_apply_message_compressed():
+    doc = document(1000)
+    packed = pack_apply_message(len, (doc,), {'small': 1}, compressor=ZlibCompressor(), compression_threshold=1024)
+    assert len(packed) < len(doc) / 2
+
+    f, args, kwargs = unpack_apply_message(packed)
+    assert args == (doc,)
+    assert kwargs == {'small': 1}
+
+
+@pytest.mark.local
+def test_unknown_compression():
+    with pytest.raises(ValueError):
+        get_compressor('rot13')
+    with pytest.raises(ValueError):
+        HighThroughputExecutor(compression='rot13')
+
+
+@pytest.mark.local
+def test_compressor_base_is_abstract():
+    with pytest.raises(TypeError):
+        CompressorBase()
+
+
+@pytest.mark.local
+def test_missing_compression_module():
+    if 'zstd' in available_compressors():
+        pytest.skip("zstandard is installed")
+    with pytest.raises(OptionalModuleMissing):
+        get_compressor('zstd')
@@ -0,0 +1,138 @@
+import pickle
+
+import pytest
+
+from parsl.serialize import deserialize, register_method_for_type, serialize
+from parsl.serialize import facade
+from parsl.serialize.base import SerializerBase
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class PointSerializer(SerializerBase):
+    _identifier = b'P0\n'
+    _for_code = False
+    _for_data = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def serialize(self, data):
+        self.calls += 1
+        return self.identifier + b'%d,%d' % (data.x, data.y)
+
+    def deserialize(self, payload):
+        x, y = bytes(self.chomp(payload)).split(b',')
+        return Point(int(x), int(y))
+
+
+class CountingSerializer:
+    """Wraps a serializer to count calls to it"""
+
+    def __init__(self, method):
+        self.method = method
+        self.calls = 0
+
+    def __enter__(self):
+        self.orig_serialize = self.method.serialize
+
+        def serialize(data):
+            self.calls += 1
+            return self.orig_serialize(data)
+
+        self.method.serialize = serialize
+        return self
+
+    def __exit__(self, *exc):
+        self.method.serialize = self.orig_serialize
+
+
+@pytest.fixture(autouse=True)
+def clean_dispatch():
+    facade.dispatch_cache.clear()
+    yield
+    facade.registered_methods.clear()
+    facade.dispatch_cache.clear()
+    facade.methods_for_data.pop(PointSerializer._identifier, None)
+
+
+@pytest.mark.local
+def test_fallback_probed_once_per_type():
+    pickle_method = facade.methods_for_data[b'01\n']
+
+    with CountingSerializer(pickle_method) as counter:
+        # pickle cannot serialize a lambda in the arguments, so dill is used
+        for i in range(10):
+            payload = serialize((i, lambda: i))
+            assert payload[:3] == b'02\n'
+            n, f = deserialize(payload)
+            assert n == i and f() == i
+
+    assert counter.calls == 1
+
+    # plain arguments are still pickled
+    assert serialize((1, 2))[:3] == b'01\n'
+
+
+@pytest.mark.local
+def test_cached_method_failure_falls_back():
+    class Unpicklable:
+        def __reduce__(self):
+            raise TypeError("not today")
+
+    facade.dispatch_cache[(False, Unpicklable)] = facade.methods_for_data[b'01\n']
+    with pytest.raises(TypeError):
+        serialize(Unpicklable())
+
+    # the cache does not hide methods which do work
+    facade.dispatch_cache[(False, int)] = facade.methods_for_data[b'02\n']
+    assert deserialize(serialize(3)) == 3
+
+
+@pytest.mark.local
+def test_out_of_band_cached_separately():
+    buffers = []
+    data = (b'x' * 2**17,)
+    assert serialize(data, buffers=buffers)[:3] == facade.out_of_band_method.identifier
+    assert len(buffers) == 1
+
+    assert serialize(data)[:3] == b'01\n'
+
+
+@pytest.mark.local
+def test_long_containers_not_cached():
+    serialize(tuple(range(100)))
+    serialize(tuple(range(3)))
+    assert len(facade.dispatch_cache) == 1
+
+
+@pytest.mark.local
+def test_register_method_for_type():
+    method = PointSerializer()
+    register_method_for_type(Point, method)
+
+    payload = serialize(Point(3, 4))
+    assert payload == b'P0\n3,4'
+    p = deserialize(payload)
+    assert (p.x, p.y) == (3, 4)
+
+    # only objects of exactly the registered type use the method
+    assert serialize((Point(1, 2),))[:3] == b'01\n'
+    assert method.calls == 1
+
+
+@pytest.mark.local
+def test_deserialize_late_defined_method():
+    facade.methods_for_data.pop(PointSerializer._identifier, None)
+    p = deserialize(b'P0\n5,6')
+    assert (p.x, p.y) == (5, 6)
+
+
+@pytest.mark.local
+def test_unknown_header():
+    with pytest.raises(TypeError):
+        deserialize(b'ZZ\n' + pickle.dumps(1))
@@ -0,0 +1,137 @@
+import gc
+import pickle
+
+import pytest
+
+from parsl import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.executors.high_throughput.function_store import FunctionStore
+from parsl.executors.high_throughput.interchange import Interchange
+from parsl.providers import LocalProvider
+from parsl.serialize import facade, pack_apply_message, unpack_apply_message
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                max_workers=2,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+    )
+
+
+@python_app
+def double(x):
+    return 2 * x
+
+
+def triple(x):
+    return 3 * x
+
+
+@pytest.mark.local
+def test_htex_function_sent_by_reference():
+    assert [f.result() for f in [double(i) for i in range(100)]] == [2 * i for i in range(100)]
+
+    # a function which is not defined at module level is serialized with dill
+    @python_app
+    def add(x, y):
+        return x + y
+
+    assert add(1, 2).result() == 3
+
+
+@pytest.mark.local
+def test_pack_by_reference():
+    functions = {}
+    packed = pack_apply_message(triple, (2,), {}, functions=functions)
+    (digest, payload), = functions.items()
+    assert digest == facade.function_digest(payload)
+    assert len(packed) < len(pack_apply_message(triple, (2,), {}))
+
+    facade.function_cache._functions.clear()
+    with pytest.raises(TypeError):
+        unpack_apply_message(packed)
+
+    f, args, kwargs = unpack_apply_message(packed, functions=functions)
+    assert f(*args, **kwargs) == 6
+
+    # once cached, the function need not be sent again
+    f, args, kwargs = unpack_apply_message(packed)
+    assert f(*args, **kwargs) == 6
+
+
+@pytest.mark.local
+def test_function_cache_lru():
+    cache = facade.FunctionCache(maxsize=2)
+    payloads = {facade.function_digest(p): p for p in [facade.serialize(f) for f in (min, max, sum)]}
+    digests = list(payloads)
+
+    cache.get(digests[0], payloads)
+    cache.get(digests[1], payloads)
+    cache.get(digests[0])
+    cache.get(digests[2], payloads)
+    assert len(cache) == 2
+
+    assert cache.get(digests[0]) is min
+    with pytest.raises(TypeError):
+        cache.get(digests[1])
+
+
+@pytest.mark.local
+def test_serialized_functions_held_weakly():
+    def make():
+        y = 3
+        return lambda x: x + y
+
+    f = make()
+    digest, payload = facade.serialize_function(f)
+    assert facade.serialize_function(f) == (digest, payload)
+    assert f in facade._function_payloads
+
+    n = len(facade._function_payloads)
+    del f
+    gc.collect()
+    assert len(facade._function_payloads) == n - 1
+
+
+@pytest.mark.local
+def test_interchange_mirrors_manager_store():
+    manager_store = FunctionStore(2)
+    mirror = FunctionStore(2)
+
+    digests = [b'a', b'b', b'a', b'c', b'b', b'b', b'a']
+    sent = []
+    for i, digest in enumerate(digests):
+        tasks = [{'task_id': i, 'buffer': b'', 'function': (digest, b'payload ' + digest)}]
+        (task,) = pickle.loads(Interchange._pack_tasks(None, tasks, mirror)[0])
+
+        # as the manager does
+        digest, payload = task['function']
+        if payload is None:
+            payload = manager_store.get(digest)
+        else:
+            manager_store.put(digest, payload)
+            sent.append(digest)
+        assert payload == b'payload ' + digest
+
+    # 'b' was evicted by 'c', and 'a' by 'b'
+    assert sent == [b'a', b'b', b'c', b'b', b'a']
+
+
+@pytest.mark.local
+def test_empty_store_always_sends():
+    store = FunctionStore(0)
+    for _ in range(3):
+        (task,) = pickle.loads(Interchange._pack_tasks(None, [{'function': (b'a', b'x')}], store)[0])
+        assert task['function'] == (b'a', b'x')
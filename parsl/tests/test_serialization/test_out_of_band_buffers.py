@@ -0,0 +1,54 @@
+import pytest
+
+from parsl import python_app
+from parsl.serialize.facade import pack_apply_message, unpack_apply_message
+from parsl.tests.configs.htex_local import fresh_config
+
+np = pytest.importorskip("numpy")
+
+
+def local_config():
+    return fresh_config()
+
+
+@python_app
+def describe(array, blob, small, **kwargs):
+    # out-of-band arguments arrive as writable arrays of the right type
+    array += 1
+    return float(array.sum()), type(blob).__name__, len(blob), small, type(kwargs['extra']).__name__
+
+
+@pytest.mark.local
+def test_htex_out_of_band_arguments():
+    array = np.zeros(10 ** 6)
+    r = describe(array, b'x' * 10 ** 6, 'small', extra=bytearray(10 ** 6)).result()
+    assert r == (10.0 ** 6, 'bytes', 10 ** 6, 'small', 'bytearray')
+    # the submitted array is not changed by the task
+    assert array.sum() == 0
+
+
+@pytest.mark.local
+def test_buffers_left_out_of_band():
+    array = np.arange(10 ** 5, dtype='float64')
+    blob = b'y' * 10 ** 5
+    buffers = []
+    packed = pack_apply_message(sum, (array, blob, [1, 2]), {'ba': bytearray(10 ** 5), 'tiny': b'z'}, buffers=buffers)
+
+    assert [buf.nbytes for buf in buffers] == [array.nbytes, len(blob), 10 ** 5]
+    assert len(packed) < 10 ** 4
+
+    f, args, kwargs = unpack_apply_message(packed, buffers=[bytearray(buf) for buf in buffers])
+    assert f is sum
+    assert (args[0] == array).all() and args[0].flags.writeable
+    assert args[1:] == (blob, [1, 2])
+    assert kwargs == {'ba': bytearray(10 ** 5), 'tiny': b'z'}
+
+
+@pytest.mark.local
+def test_unpicklable_arguments_fall_back():
+    buffers = []
+    packed = pack_apply_message(sum, (lambda x: x, np.arange(10 ** 5)), {}, buffers=buffers)
+    assert buffers == []
+    f, args, kwargs = unpack_apply_message(packed)
+    assert args[0](3) == 3
+    assert (args[1] == np.arange(10 ** 5)).all()
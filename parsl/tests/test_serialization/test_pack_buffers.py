@@ -0,0 +1,52 @@
+import pytest
+
+from parsl.serialize.facade import (
+    pack_apply_message, pack_buffers, serialize, unpack_and_deserialize, unpack_apply_message, unpack_buffers
+)
+
+
+def legacy_pack_buffers(buffers):
+    return b''.join(bytes(str(len(buf)) + '\n', 'utf-8') + buf for buf in buffers)
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("buffers", [[], [b''], [b'a', b'', b'bc\n12\n'], [b'x' * 100000, b'\x00' * 10]])
+def test_pack_roundtrip(buffers):
+    unpacked = unpack_buffers(pack_buffers(buffers))
+    assert all(isinstance(buf, memoryview) for buf in unpacked)
+    assert [bytes(buf) for buf in unpacked] == buffers
+
+
+@pytest.mark.local
+@pytest.mark.parametrize("buffers", [[b'a', b'', b'bc\n12\n'], [b'x' * 100000, b'\x00' * 10]])
+def test_unpack_legacy_format(buffers):
+    assert [bytes(buf) for buf in unpack_buffers(legacy_pack_buffers(buffers))] == buffers
+
+
+@pytest.mark.local
+def test_unpack_does_not_copy():
+    packed = pack_buffers([b'a' * 10, b'b' * 10])
+    for buf in unpack_buffers(packed):
+        assert buf.obj is packed
+
+
+@pytest.mark.local
+def test_unpack_truncated():
+    packed = pack_buffers([b'a' * 10, b'b' * 10])
+    with pytest.raises(ValueError):
+        unpack_buffers(packed[:-1])
+
+
+@pytest.mark.local
+def test_apply_message_roundtrip():
+    packed = pack_apply_message(max, ([3, 1, 2],), {'default': 0})
+    f, args, kwargs = unpack_apply_message(packed)
+    assert f(*args, **kwargs) == 3
+
+    # buffers may also come from a writable buffer
+    f, args, kwargs = unpack_apply_message(bytearray(packed))
+    assert f(*args, **kwargs) == 3
+
+    legacy = legacy_pack_buffers([serialize(max), serialize(([3, 1, 2],)), serialize({'default': 0})])
+    f, args, kwargs = unpack_and_deserialize(legacy)
+    assert f(*args, **kwargs) == 3
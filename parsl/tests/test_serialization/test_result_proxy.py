@@ -0,0 +1,203 @@
+import os
+import tempfile
+
+import pytest
+
+import parsl
+from parsl import python_app
+from parsl.channels import LocalChannel
+from parsl.config import Config
+from parsl.executors import HighThroughputExecutor
+from parsl.providers import LocalProvider
+from parsl.serialize import deserialize, serialize
+from parsl.dataflow.futures import AppFuture
+from parsl.serialize.proxy import ResultProxy, resolving_proxies, serialize_result
+
+proxy_dir = tempfile.mkdtemp(prefix="parsl-result-proxy-")
+
+
+def local_config():
+    return Config(
+        executors=[
+            HighThroughputExecutor(
+                label="htex_local",
+                max_workers=1,
+                result_proxy_dir=proxy_dir,
+                result_proxy_threshold=2 ** 20,
+                provider=LocalProvider(
+                    channel=LocalChannel(),
+                    init_blocks=1,
+                    max_blocks=1,
+                ),
+            )
+        ],
+        strategy='none',
+        memo_max_bytes=2 ** 30,
+    )
+
+
+@python_app
+def make_bytes(n):
+    return b'x' * n
+
+
+@python_app(cache=True)
+def make_bytes_cached(n):
+    return b'x' * n
+
+
+@python_app
+def make_text(n):
+    return 'x' * n
+
+
+@python_app(cache=True)
+def total_length(data, inputs=()):
+    return len(data) + sum(len(i) for i in inputs)
+
+
+@pytest.mark.local
+def test_htex_large_result_proxied():
+    fu = make_bytes(2 ** 21)
+    assert fu.result() == b'x' * 2 ** 21
+
+    proxy = fu.task_def['exec_fu'].result()
+    assert isinstance(proxy, ResultProxy)
+    assert os.path.dirname(proxy.path) == proxy_dir
+
+    # the result is loaded once, and its file removed
+    assert not os.path.exists(proxy.path)
+    assert fu.result() == b'x' * 2 ** 21
+
+
+@pytest.mark.local
+def test_htex_cached_result_not_loaded():
+    fu = make_bytes_cached(2 ** 21)
+    proxy = fu.task_def['exec_fu'].result()
+    parsl.dfk().wait_for_current_tasks()
+
+    # the app cache sizes the result from its file, without loading it
+    assert isinstance(proxy, ResultProxy)
+    assert os.path.exists(proxy.path)
+    assert parsl.dfk().memoizer.memo_lookup_table.bytes == os.path.getsize(proxy.path)
+
+    assert fu.result() == b'x' * 2 ** 21
+    assert make_bytes_cached(2 ** 21).result() == b'x' * 2 ** 21
+
+
+@pytest.mark.local
+def test_htex_proxied_dependency_not_loaded():
+    fu = make_text(2 ** 21)
+    first = total_length(fu, inputs=[fu])
+    assert first.result() == 2 ** 22
+
+    # the worker running the dependent task loaded the result, not the client
+    proxy = fu.task_def['exec_fu'].result()
+    assert fu._resolved_proxy is None
+    assert os.path.exists(proxy.path)
+
+    # the app cache identifies the result by the content of its file
+    second = total_length(fu, inputs=[fu])
+    assert second.result() == 2 ** 22
+    assert second.task_def['from_memo']
+
+    # the file is kept for other dependent tasks when the result is loaded
+    assert fu.result() == 'x' * 2 ** 21
+    assert os.path.exists(proxy.path)
+    assert total_length(fu).result() == 2 ** 21
+
+
+@pytest.mark.local
+def test_retained_proxy_released(tmpdir):
+    proxy = deserialize(serialize_result(b'y' * 100, str(tmpdir), threshold=1, name='result'))
+    fu = AppFuture({'id': 0})
+    fu.set_result(proxy)
+
+    assert fu._result_or_proxy() is proxy
+    assert fu.result() == b'y' * 100
+    assert os.path.exists(proxy.path)
+    fu._release_proxy()
+    assert not os.path.exists(proxy.path)
+
+
+@pytest.mark.local
+def test_released_proxy_removed_when_loaded(tmpdir):
+    proxy = deserialize(serialize_result(b'y' * 100, str(tmpdir), threshold=1, name='result'))
+    fu = AppFuture({'id': 0})
+    fu.set_result(proxy)
+
+    fu._result_or_proxy()
+    fu._release_proxy()
+    assert os.path.exists(proxy.path)
+    assert fu.result() == b'y' * 100
+    assert not os.path.exists(proxy.path)
+
+
+@pytest.mark.local
+def test_resolving_proxies(tmpdir):
+    proxy = deserialize(serialize_result(b'y' * 100, str(tmpdir), threshold=1, name='result'))
+    proxy.retained = True
+
+    def lengths(a, b=None, inputs=()):
+        return len(a), len(b), [len(i) for i in inputs]
+
+    f = resolving_proxies(lengths)
+    assert f.__name__ == 'lengths'
+    f = deserialize(serialize(f))
+    assert f(proxy, b=proxy, inputs=[proxy, b'z']) == (100, 100, [100, 1])
+    # retained proxies leave their file for other tasks
+    assert os.path.exists(proxy.path)
+
+
+@pytest.mark.local
+def test_htex_small_result_sent():
+    fu = make_bytes(100)
+    assert fu.result() == b'x' * 100
+    assert fu.task_def['exec_fu'].result() == b'x' * 100
+
+
+@pytest.mark.local
+def test_serialize_result(tmpdir):
+    result = {'name': 'small', 'data': b'y' * 2 ** 17}
+    payload = serialize_result(result, str(tmpdir), threshold=2 ** 20, name='small')
+    assert deserialize(payload) == result
+    assert tmpdir.listdir() == []
+
+    payload = serialize_result(result, str(tmpdir), threshold=2 ** 16, name='large')
+    proxy = deserialize(payload)
+    assert isinstance(proxy, ResultProxy)
+    assert proxy.nbytes > 2 ** 17
+    assert len(payload) < 1024
+    assert [p.basename for p in tmpdir.listdir()] == ['large']
+    assert proxy.resolve() == result
+    assert tmpdir.listdir() == []
+
+
+@pytest.mark.local
+def test_serialize_small_result_with_buffers(tmpdir, monkeypatch):
+    import parsl.serialize.proxy
+    calls = []
+    serialize = parsl.serialize.proxy.serialize
+
+    def counting_serialize(*args, **kwargs):
+        calls.append(kwargs)
+        return serialize(*args, **kwargs)
+
+    monkeypatch.setattr(parsl.serialize.proxy, 'serialize', counting_serialize)
+    result = {'data': bytearray(b'y' * 2 ** 17)}
+    payload = serialize_result(result, str(tmpdir), threshold=2 ** 20, name='small')
+
+    # the out-of-band buffer is packed with the payload, not pickled again
+    assert len(calls) == 1
+    assert deserialize(payload) == result
+    assert tmpdir.listdir() == []
+
+
+@pytest.mark.local
+def test_proxied_arrays_writable(tmpdir):
+    np = pytest.importorskip("numpy")
+    a = np.arange(2 ** 16, dtype=np.float64)
+    proxy = deserialize(serialize_result(a, str(tmpdir), threshold=1024, name='array'))
+    b = proxy.resolve()
+    b[0] = 1
+    assert b[0] == 1 and (b[1:] == a[1:]).all()